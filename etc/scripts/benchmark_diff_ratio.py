@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+
+"""
+Benchmark the resources text diff ratio: reading the files and computing the
+``difflib.SequenceMatcher.quick_ratio()`` for each pair of resources, compared with
+the cached lines fingerprints.
+
+Each to/ file is compared with several from/ candidates, and each from/ file is a
+candidate of several to/ files, as in the d2d path mapping.
+
+Usage, from the root of the ScanCode.io codebase::
+
+    $ SECRET_KEY=benchmark python etc/scripts/benchmark_diff_ratio.py --files 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "scancodeio.settings")
+django.setup()
+
+from scanpipe import pipes  # NOQA: E402
+from scanpipe.models import CodebaseResource  # NOQA: E402
+
+
+def write_synthetic_files(directory, count, line_count, seed=42):
+    """
+    Write ``count`` files of about ``line_count`` source-like lines in the
+    ``directory``. Return the list of written file locations.
+    """
+    rnd = random.Random(seed)
+    words = [f"name{index}" for index in range(500)]
+
+    locations = []
+    for index in range(count):
+        lines = [
+            f"    {rnd.choice(words)} = {rnd.choice(words)}({rnd.randint(0, 99)})"
+            for _ in range(rnd.randint(line_count // 2, line_count * 2))
+        ]
+        location = Path(directory) / f"file{index}.py"
+        location.write_text("\n".join(lines))
+        locations.append(str(location))
+
+    return locations
+
+
+def get_pairs(from_locations, to_locations, candidates, seed=42):
+    """Return a list of (to location, from location) pairs to compare."""
+    rnd = random.Random(seed)
+    return [
+        (to_location, from_location)
+        for to_location in to_locations
+        for from_location in rnd.sample(from_locations, k=candidates)
+    ]
+
+
+def quick_ratio_diff_ratio(location_a, location_b):
+    return pipes.get_text_str_diff_ratio(
+        CodebaseResource.read_file_content(location_a),
+        CodebaseResource.read_file_content(location_b),
+    )
+
+
+def fingerprint_diff_ratio(location_a, location_b):
+    return pipes.get_resource_diff_ratio(
+        SimpleNamespace(location=location_a),
+        SimpleNamespace(location=location_b),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=300)
+    parser.add_argument("--candidates", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        from_locations = write_synthetic_files(directory, args.files, args.lines)
+        to_locations = from_locations[: args.files // 2]
+        pairs = get_pairs(from_locations, to_locations, args.candidates)
+        print(f"Comparing {len(pairs):,d} pairs of {args.files:,d} files")
+
+        results = {}
+        for label, diff_ratio_func in [
+            ("quick_ratio", quick_ratio_diff_ratio),
+            ("fingerprint", fingerprint_diff_ratio),
+        ]:
+            pipes.get_location_lines_fingerprint.cache_clear()
+            start = time.perf_counter()
+            results[label] = [diff_ratio_func(a, b) for a, b in pairs]
+            run_time = time.perf_counter() - start
+            print(
+                f"{label:<12} total: {run_time:6.2f}s  "
+                f"per pair: {run_time / len(pairs) * 1000:6.2f}ms"
+            )
+
+        same_results = results["quick_ratio"] == results["fingerprint"]
+        print(f"Same ratios: {same_results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+
+"""
+Benchmark the memory usage and the build and lookup times of the pathmap indexes:
+the Aho-Corasick automaton and the compact SuffixIndex.
+
+The indexes are built from a synthetic corpus of deep Maven-like and
+node_modules-like paths. Each index is built in its own process to measure the
+resident memory used by the index only.
+
+Usage, from the root of the ScanCode.io codebase::
+
+    $ SECRET_KEY=benchmark python etc/scripts/benchmark_pathmap.py --paths 1000000
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "scancodeio.settings")
+django.setup()
+
+from scanpipe.pipes import pathmap  # NOQA: E402
+
+BACKENDS = {
+    "automaton": False,
+    "compact": True,
+}
+
+
+def get_synthetic_paths(count, seed=42):
+    """Return a list of ``count`` tuples of (id, path) of synthetic paths."""
+    rnd = random.Random(seed)
+    words = [f"word{index}" for index in range(2000)]
+    packages = [f"package-{index}" for index in range(5000)]
+
+    paths = []
+    for resource_id in range(1, count + 1):
+        if rnd.random() < 0.5:
+            # Maven-like: module/src/main/java/org/<words...>/ClassName.java
+            package_path = "/".join(rnd.choices(words, k=rnd.randint(2, 8)))
+            path = (
+                f"{rnd.choice(words)}/src/main/java/org/{package_path}/"
+                f"Class{rnd.randint(0, 20000)}.java"
+            )
+        else:
+            # node_modules-like: nested node_modules/<package>/lib/<words...>/file.js
+            nested = "/".join(
+                f"node_modules/{rnd.choice(packages)}" for _ in range(rnd.randint(1, 4))
+            )
+            subpath = "/".join(rnd.choices(words, k=rnd.randint(0, 4)))
+            path = f"{nested}/lib/{subpath}/index{rnd.randint(0, 50)}.js"
+        paths.append((resource_id, path.replace("//", "/")))
+
+    return paths
+
+
+def get_lookup_paths(paths, count, seed=42):
+    """Return a list of ``count`` lookup paths derived from the indexed ``paths``."""
+    rnd = random.Random(seed)
+    lookups = []
+    for _, path in rnd.sample(paths, k=min(count, len(paths))):
+        segments = path.split("/")
+        # Keep a random suffix, under a different root
+        suffix = segments[rnd.randint(0, len(segments) - 1) :]
+        lookups.append("/".join(["to", "deployed"] + suffix))
+    return lookups
+
+
+def get_rss():
+    """Return the current resident memory of this process in bytes."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def run_benchmark(backend, path_count, lookup_count, with_subpaths, results):
+    paths = get_synthetic_paths(path_count)
+    lookups = get_lookup_paths(paths, lookup_count)
+
+    rss_before = get_rss()
+    start = time.perf_counter()
+    index = pathmap.build_index(
+        paths, with_subpaths=with_subpaths, compact=BACKENDS[backend]
+    )
+    build_time = time.perf_counter() - start
+    index_memory = get_rss() - rss_before
+
+    start = time.perf_counter()
+    match_count = sum(1 for path in lookups if pathmap.find_paths(path, index))
+    lookup_time = time.perf_counter() - start
+
+    results[backend] = {
+        "build_time": build_time,
+        "memory": index_memory,
+        "lookup_time": lookup_time,
+        "matches": match_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paths", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--without-subpaths", action="store_true")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    args = parser.parse_args()
+
+    with_subpaths = not args.without_subpaths
+    print(
+        f"Indexing {args.paths:,d} paths (with_subpaths={with_subpaths}), "
+        f"{args.lookups:,d} lookups"
+    )
+
+    results = multiprocessing.Manager().dict()
+    for backend in args.backends:
+        process = multiprocessing.Process(
+            target=run_benchmark,
+            args=(backend, args.paths, args.lookups, with_subpaths, results),
+        )
+        process.start()
+        process.join()
+
+        if backend not in results:
+            print(f"{backend:<10} failed with exit code {process.exitcode}")
+            continue
+
+        result = results[backend]
+        lookup_latency = result["lookup_time"] / args.lookups * 1_000_000
+        print(
+            f"{backend:<10} "
+            f"build: {result['build_time']:6.1f}s  "
+            f"memory: {result['memory'] / 1024 / 1024:8,.0f} MB  "
+            f"lookup: {lookup_latency:6.1f}µs  "
+            f"matches: {result['matches']:,d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+"""
+Benchmark the XLSX output: writing the worksheets from model instances in the
+default xlsxwriter mode, compared with writing them from chunked ``values_list()``
+rows in the xlsxwriter "constant_memory" mode.
+
+The benchmark runs on an existing project, or on a temporary project filled with
+synthetic resources and packages. Each export runs in its own process to measure
+its peak resident memory.
+
+Usage, from the root of the ScanCode.io codebase::
+
+    $ SECRET_KEY=benchmark python etc/scripts/benchmark_xlsx.py --resources 300000
+    $ SECRET_KEY=benchmark python etc/scripts/benchmark_xlsx.py --project "name"
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "scancodeio.settings")
+django.setup()
+
+import openpyxl  # NOQA: E402
+import xlsxwriter  # NOQA: E402
+
+from scanpipe.api.serializers import get_serializer_fields  # NOQA: E402
+from scanpipe.models import CodebaseResource  # NOQA: E402
+from scanpipe.models import DiscoveredPackage  # NOQA: E402
+from scanpipe.models import Project  # NOQA: E402
+from scanpipe.pipes import output  # NOQA: E402
+
+MODEL_NAMES = [
+    "discoveredpackage",
+    "discovereddependency",
+    "codebaseresource",
+    "codebaserelation",
+    "projectmessage",
+]
+
+# The fields excluded from the XLSX output, see ``output.to_xlsx()``.
+EXCLUDE_FIELDS = [
+    "extra_data",
+    "package_data",
+    "license_detections",
+    "other_license_detections",
+    "license_clues",
+    "compliance_alert",
+]
+
+
+def create_synthetic_project(resource_count, seed=42):
+    """Create and return a project with ``resource_count`` synthetic resources."""
+    rnd = random.Random(seed)
+    project = Project.objects.create(name=f"benchmark-xlsx-{time.time()}")
+
+    resources = [
+        CodebaseResource(
+            project=project,
+            path=f"root/dir{index % 1000}/file{index}.py",
+            name=f"file{index}.py",
+            extension=".py",
+            type=CodebaseResource.Type.FILE,
+            size=rnd.randint(0, 100_000),
+            sha1=f"{index:040x}",
+            programming_language="Python",
+            detected_license_expression="apache-2.0",
+            copyrights=[
+                {"copyright": f"Copyright (c) {rnd.randint(1990, 2023)} nexB Inc."}
+            ],
+            holders=[{"holder": "nexB Inc."}],
+            urls=[{"url": f"https://example.com/{index}"}],
+            extra_data={"index": index},
+        )
+        for index in range(resource_count)
+    ]
+    CodebaseResource.objects.bulk_create(resources, batch_size=5000)
+
+    packages = [
+        DiscoveredPackage(
+            project=project,
+            type="pypi",
+            name=f"package{index}",
+            version="1.0",
+            description="\r\n".join(f"line{line}" for line in range(10)),
+            declared_license_expression="apache-2.0",
+        )
+        for index in range(max(resource_count // 100, 1))
+    ]
+    DiscoveredPackage.objects.bulk_create(packages, batch_size=5000)
+
+    return project
+
+
+def write_instances_workbook(project, output_file):
+    """Write the worksheets from model instances, in the xlsxwriter default mode."""
+    with xlsxwriter.Workbook(output_file) as workbook:
+        for model_name in MODEL_NAMES:
+            queryset = output.get_queryset(project, model_name)
+            fields = get_serializer_fields(queryset.model)
+            output._add_xlsx_worksheet(
+                workbook=workbook,
+                worksheet_name=output.model_name_to_worksheet_name[model_name],
+                rows=queryset,
+                fields=[field for field in fields if field not in EXCLUDE_FIELDS],
+            )
+
+
+def write_values_workbook(project, output_file):
+    """Write the worksheets from ``values_list()`` rows, in constant memory mode."""
+    with xlsxwriter.Workbook(output_file, {"constant_memory": True}) as workbook:
+        for model_name in MODEL_NAMES:
+            queryset = output.get_queryset(project, model_name)
+            output.queryset_to_xlsx_worksheet(queryset, workbook, EXCLUDE_FIELDS)
+
+
+def run_benchmark(write_function, project_pk, output_file, results):
+    django.db.connections.close_all()
+    project = Project.objects.get(pk=project_pk)
+
+    start = time.perf_counter()
+    write_function(project, output_file)
+    run_time = time.perf_counter() - start
+    # The ru_maxrss value is in kilobytes on Linux.
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    results[write_function.__name__] = {"time": run_time, "memory": peak_memory}
+
+
+def get_workbook_values(location):
+    """Return a mapping of worksheet name to list of rows values."""
+    workbook = openpyxl.load_workbook(location, read_only=True)
+    return {worksheet.title: list(worksheet.values) for worksheet in workbook}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--resources", type=int, default=300_000)
+    parser.add_argument("--project", help="Name of an existing project to export.")
+    parser.add_argument(
+        "--no-compare", action="store_true", help="Skip the workbooks comparison."
+    )
+    args = parser.parse_args()
+
+    if args.project:
+        project = Project.objects.get(name=args.project)
+    else:
+        print(f"Creating a project with {args.resources:,d} resources")
+        project = create_synthetic_project(args.resources)
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            results = multiprocessing.Manager().dict()
+            locations = {}
+            for write_function in [write_instances_workbook, write_values_workbook]:
+                label = write_function.__name__
+                locations[label] = Path(directory) / f"{label}.xlsx"
+                django.db.connections.close_all()
+                process = multiprocessing.Process(
+                    target=run_benchmark,
+                    args=(write_function, project.pk, locations[label], results),
+                )
+                process.start()
+                process.join()
+
+                if label not in results:
+                    print(f"{label:<24} failed with exit code {process.exitcode}")
+                    continue
+
+                result = results[label]
+                print(
+                    f"{label:<24} "
+                    f"time: {result['time']:8.1f}s  "
+                    f"peak memory: {result['memory'] / 1024 / 1024:8,.0f} MB"
+                )
+
+            if not args.no_compare and len(results) == 2:
+                same_values = get_workbook_values(
+                    locations["write_instances_workbook"]
+                ) == get_workbook_values(locations["write_values_workbook"])
+                print(f"Same workbook values: {same_values}")
+    finally:
+        if not args.project:
+            project.delete()
+
+
+if __name__ == "__main__":
+    main()
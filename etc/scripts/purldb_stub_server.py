@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+
+
+"""
+A PurlDB stub server, to benchmark and profile the PurlDB matching steps of the
+``map_deploy_to_develop`` pipeline without a PurlDB instance.
+
+The SHA1 and directory fingerprint lookups are answered after a configurable
+``--latency``, and a ``--match-rate`` ratio of the SHA1 are matched, always to
+the same packages for a given SHA1.
+
+Usage, from the root of the ScanCode.io codebase::
+
+    $ python etc/scripts/purldb_stub_server.py --port 8001 --latency 0.2
+
+Then run the pipeline with the ``PURLDB_URL=http://localhost:8001/`` setting.
+"""
+
+import argparse
+import hashlib
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlencode
+from urllib.parse import urlparse
+
+PAGE_SIZE = 100
+PACKAGE_COUNT = 50
+
+
+def is_matched(value, match_rate):
+    """Return True if the ``value`` string is matched for the ``match_rate``."""
+    digest = hashlib.sha1(value.encode()).digest()
+    return digest[0] / 256 < match_rate
+
+
+def get_package_id(value):
+    """Return the id of the package matched for the ``value`` string."""
+    digest = hashlib.sha1(value.encode()).digest()
+    return digest[1] % PACKAGE_COUNT
+
+
+def get_package_data(package_id, base_url, sha1=""):
+    return {
+        "url": f"{base_url}/api/packages/{package_id}/",
+        "uuid": f"00000000-0000-0000-0000-{package_id:012d}",
+        "type": "maven",
+        "namespace": "org.example",
+        "name": f"package{package_id}",
+        "version": "1.0",
+        "purl": f"pkg:maven/org.example/package{package_id}@1.0",
+        "sha1": sha1,
+    }
+
+
+class PurlDBStubHandler(BaseHTTPRequestHandler):
+    latency = 0
+    match_rate = 0.5
+
+    @property
+    def base_url(self):
+        return f"http://{self.headers['Host']}"
+
+    def send_json(self, data, status=200):
+        content = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def get_paginated_response(self, path, query, results):
+        page = int(query.get("page", ["1"])[0])
+        start = (page - 1) * PAGE_SIZE
+        response = {
+            "count": len(results),
+            "next": None,
+            "results": results[start : start + PAGE_SIZE],
+        }
+        if start + PAGE_SIZE < len(results):
+            response["next"] = f"{self.base_url}{path}?{urlencode({'page': page + 1})}"
+        return response
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        segments = url.path.strip("/").split("/")
+
+        if url.path == "/api/approximate_directory_content_index/match/":
+            time.sleep(self.latency)
+            fingerprint = query.get("fingerprint", [""])[0]
+            if fingerprint and is_matched(fingerprint, self.match_rate):
+                package_id = get_package_id(fingerprint)
+                package_url = f"{self.base_url}/api/packages/{package_id}/"
+                return self.send_json([{"package": package_url}])
+            return self.send_json([])
+
+        if segments[:2] == ["api", "packages"] and len(segments) == 3:
+            package_id = int(segments[2])
+            return self.send_json(get_package_data(package_id, self.base_url))
+
+        self.send_json({"detail": "Not found."}, status=404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        content_length = int(self.headers.get("Content-Length", 0))
+        data = parse_qs(self.rfile.read(content_length).decode())
+        sha1_list = data.get("sha1", [])
+        matched_sha1_list = [
+            sha1 for sha1 in sha1_list if is_matched(sha1, self.match_rate)
+        ]
+
+        if url.path == "/api/packages/filter_by_checksums/":
+            results = [
+                get_package_data(get_package_id(sha1), self.base_url, sha1)
+                for sha1 in matched_sha1_list
+            ]
+        elif url.path == "/api/resources/filter_by_checksums/":
+            results = [
+                {
+                    "package": f"{self.base_url}/api/packages/{get_package_id(sha1)}/",
+                    "sha1": sha1,
+                }
+                for sha1 in matched_sha1_list
+            ]
+        else:
+            return self.send_json({"detail": "Not found."}, status=404)
+
+        time.sleep(self.latency)
+        self.send_json(self.get_paginated_response(url.path, query, results))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="In seconds.")
+    parser.add_argument("--match-rate", type=float, default=0.5)
+    args = parser.parse_args()
+
+    PurlDBStubHandler.latency = args.latency
+    PurlDBStubHandler.match_rate = args.match_rate
+    server = ThreadingHTTPServer((args.host, args.port), PurlDBStubHandler)
+    print(f"PurlDB stub server listening on http://{args.host}:{args.port}/")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
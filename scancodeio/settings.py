@@ -24,6 +24,8 @@ import sys
 import tempfile
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 import environ
 
 PROJECT_DIR = environ.Path(__file__) - 1
@@ -84,6 +86,10 @@ SCANCODEIO_LOG_LEVEL = env.str("SCANCODEIO_LOG_LEVEL", "INFO")
 # available on the machine.
 SCANCODEIO_PROCESSES = env.int("SCANCODEIO_PROCESSES", default=None)
 
+# Set the number of parallel processes to use for the archives and image layers
+# extraction, which is mostly I/O bound. Defaults to the SCANCODEIO_PROCESSES value.
+SCANCODEIO_EXTRACT_PROCESSES = env.int("SCANCODEIO_EXTRACT_PROCESSES", default=None)
+
 SCANCODEIO_POLICIES_FILE = env.str("SCANCODEIO_POLICIES_FILE", default="policies.yml")
 
 # This setting defines the additional locations ScanCode.io will search for pipelines.
@@ -97,6 +103,12 @@ SCANCODEIO_TASK_TIMEOUT = env.str("SCANCODEIO_TASK_TIMEOUT", default="24h")
 # Default to 2 minutes.
 SCANCODEIO_SCAN_FILE_TIMEOUT = env.int("SCANCODEIO_SCAN_FILE_TIMEOUT", default=120)
 
+# Use the compact SuffixIndex in place of the Aho-Corasick automaton for the d2d
+# path mapping. Lower memory usage on codebases with large and deep trees.
+SCANCODEIO_PATHMAP_COMPACT_INDEX = env.bool(
+    "SCANCODEIO_PATHMAP_COMPACT_INDEX", default=False
+)
+
 # List views pagination, controls the number of items displayed per page.
 # Syntax in .env: SCANCODEIO_PAGINATE_BY=project=10,project_error=10
 SCANCODEIO_PAGINATE_BY = env.dict(
@@ -231,6 +243,112 @@ if IS_TESTS:
     SCANCODEIO_REQUIRE_AUTHENTICATION = True
     SCANCODEIO_SCAN_FILE_TIMEOUT = 120
 
+# Cache
+
+# The Docker image layers cache is opt-in, shared across all projects, and keyed on
+# the layer id. The extracted layers are stored on disk, the least recently used
+# layers are evicted once the cache size, in bytes, exceeds the max size.
+# The scan results of the layers files are only stored in the scan results cache,
+# which is required and enabled by default along the layers cache.
+SCANCODEIO_LAYER_CACHE = env.bool("SCANCODEIO_LAYER_CACHE", default=False)
+SCANCODEIO_LAYER_CACHE_LOCATION = env.str(
+    "SCANCODEIO_LAYER_CACHE_LOCATION",
+    default=f"{SCANCODEIO_WORKSPACE_LOCATION}/cache/layers",
+)
+SCANCODEIO_LAYER_CACHE_MAX_SIZE = env.int(
+    "SCANCODEIO_LAYER_CACHE_MAX_SIZE", default=10 * 1024**3
+)
+
+# The scan results cache is opt-in, shared across all projects, and keyed on the
+# resource sha1, the scanners set, and the ScanCode-toolkit version.
+# The on-disk (filebased) or PostgreSQL table (db) backends are supported.
+# The "db" backend requires to create the cache table first using:
+# $ scanpipe createcachetable
+SCANCODEIO_SCAN_CACHE = env.bool(
+    "SCANCODEIO_SCAN_CACHE", default=SCANCODEIO_LAYER_CACHE
+)
+if SCANCODEIO_LAYER_CACHE and not SCANCODEIO_SCAN_CACHE:
+    raise ImproperlyConfigured(
+        "SCANCODEIO_LAYER_CACHE requires SCANCODEIO_SCAN_CACHE to be enabled."
+    )
+
+SCANCODEIO_SCAN_CACHE_BACKENDS = {
+    "filebased": "scanpipe.cache.ShardedFileBasedCache",
+    "db": "scanpipe.cache.BulkDatabaseCache",
+}
+SCANCODEIO_SCAN_CACHE_BACKEND = env.str(
+    "SCANCODEIO_SCAN_CACHE_BACKEND", default="filebased"
+)
+
+# The PurlDB responses cache is opt-in and shared across all projects.
+# The lookups without matches are cached too, using a shorter timeout.
+PURLDB_CACHE = env.bool("PURLDB_CACHE", default=False)
+PURLDB_CACHE_BACKEND = env.str("PURLDB_CACHE_BACKEND", default="filebased")
+# Cached entries timeouts in seconds.
+PURLDB_CACHE_TIMEOUT = env.int("PURLDB_CACHE_TIMEOUT", default=604800)
+PURLDB_CACHE_MISS_TIMEOUT = env.int("PURLDB_CACHE_MISS_TIMEOUT", default=86400)
+
+# The VulnerableCode cache is opt-in and shared across all projects.
+VULNERABLECODE_CACHE = env.bool("VULNERABLECODE_CACHE", default=False)
+VULNERABLECODE_CACHE_BACKEND = env.str(
+    "VULNERABLECODE_CACHE_BACKEND", default="filebased"
+)
+# Cached entries timeout in seconds.
+VULNERABLECODE_CACHE_TIMEOUT = env.int("VULNERABLECODE_CACHE_TIMEOUT", default=86400)
+
+
+def get_shared_cache_config(name, env_prefix, backend, timeout, max_entries):
+    """
+    Return the configuration of the `name` cache shared across all projects.
+    The location and max entries can be provided using the `env_prefix`_LOCATION
+    and `env_prefix`_MAX_ENTRIES environment variables.
+    """
+    return {
+        "BACKEND": SCANCODEIO_SCAN_CACHE_BACKENDS[backend],
+        # Directory location for "filebased", table name for "db".
+        "LOCATION": env.str(
+            f"{env_prefix}_LOCATION",
+            default=(
+                f"scanpipe_{name}_cache"
+                if backend == "db"
+                else f"{SCANCODEIO_WORKSPACE_LOCATION}/cache/{name}"
+            ),
+        ),
+        "TIMEOUT": timeout,
+        "OPTIONS": {
+            "MAX_ENTRIES": env.int(f"{env_prefix}_MAX_ENTRIES", default=max_entries),
+        },
+    }
+
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Scan results never expire, the cache size is bounded by MAX_ENTRIES.
+    "scan_results": get_shared_cache_config(
+        name="scan_results",
+        env_prefix="SCANCODEIO_SCAN_CACHE",
+        backend=SCANCODEIO_SCAN_CACHE_BACKEND,
+        timeout=None,
+        max_entries=500000,
+    ),
+    "purldb": get_shared_cache_config(
+        name="purldb",
+        env_prefix="PURLDB_CACHE",
+        backend=PURLDB_CACHE_BACKEND,
+        timeout=PURLDB_CACHE_TIMEOUT,
+        max_entries=1000000,
+    ),
+    "vulnerablecode": get_shared_cache_config(
+        name="vulnerablecode",
+        env_prefix="VULNERABLECODE_CACHE",
+        backend=VULNERABLECODE_CACHE_BACKEND,
+        timeout=VULNERABLECODE_CACHE_TIMEOUT,
+        max_entries=1000000,
+    ),
+}
+
 # Debug toolbar
 
 DEBUG_TOOLBAR = env.bool("SCANCODEIO_DEBUG_TOOLBAR", default=False)
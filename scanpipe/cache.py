@@ -0,0 +1,222 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+
+import base64
+import glob
+import os
+import pickle
+from datetime import datetime
+from datetime import timezone
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import DatabaseError
+from django.db import connections
+from django.db import router
+from django.db import transaction
+from django.utils.timezone import now as tz_now
+
+
+class AmortizedCullMixin:
+    """
+    Cull the cache entries once every ``cull_interval`` writes, in place of
+    checking the whole cache size on each write.
+
+    The cache is culled on the first write of each process, then every
+    MAX_ENTRIES / CULL_FREQUENCY writes. The cache size may exceed MAX_ENTRIES by
+    up to this number of entries between two culls.
+
+    The cache backends using this mixin must implement a ``cull()`` method.
+    """
+
+    _writes_until_cull = 0
+
+    @property
+    def cull_interval(self):
+        return max(self._max_entries // (self._cull_frequency or 1), 1)
+
+    def cull_if_due(self, write_count=1):
+        """Cull the cache if due, before writing ``write_count`` entries."""
+        if self._writes_until_cull <= 0:
+            self.cull()
+            self._writes_until_cull = self.cull_interval
+        self._writes_until_cull -= write_count
+
+
+class ShardedFileBasedCache(AmortizedCullMixin, FileBasedCache):
+    """
+    File-based cache storing the entries in 256 sub-directories, named after the
+    first 2 characters of the entry file name.
+
+    The entries modification time is updated on each cache hit, the least recently
+    used entries are evicted first.
+    """
+
+    shard_length = 2
+
+    def _key_to_file(self, key, version=None):
+        fname = super()._key_to_file(key, version)
+        basename = os.path.basename(fname)
+        return os.path.join(self._dir, basename[: self.shard_length], basename)
+
+    def _list_cache_files(self):
+        pattern = os.path.join(self._dir, "*", f"*{self.cache_suffix}")
+        return glob.glob(pattern)
+
+    def _cull(self):
+        """Cull the cache only when due, as this is called by ``set`` on each write."""
+        self.cull_if_due()
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        fname = self._key_to_file(key, version)
+        os.makedirs(os.path.dirname(fname), 0o700, exist_ok=True)
+        super().set(key, value, timeout, version)
+
+    def get(self, key, default=None, version=None):
+        sentinel = object()
+        value = super().get(key, sentinel, version)
+        if value is sentinel:
+            return default
+
+        try:
+            os.utime(self._key_to_file(key, version))
+        except FileNotFoundError:
+            # The file may have been removed by another process.
+            pass
+        return value
+
+    def cull(self):
+        """
+        Remove the least recently used entries when MAX_ENTRIES is reached, making
+        room for the next ``cull_interval`` writes.
+        A value of 0 for CULL_FREQUENCY means that the entire cache is purged.
+        """
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        def get_mtime(fname):
+            try:
+                return os.path.getmtime(fname)
+            except FileNotFoundError:
+                return 0
+
+        cull_count = num_entries - self._max_entries + self.cull_interval
+        for fname in sorted(filelist, key=get_mtime)[:cull_count]:
+            self._delete(fname)
+
+
+class BulkDatabaseCache(AmortizedCullMixin, DatabaseCache):
+    """
+    Database cache writing the entries of ``set_many`` by batches, using one
+    transaction per batch, in place of one transaction per entry.
+    """
+
+    batch_size = 500
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Set the ``data`` mapping of {key: value} in the cache.
+        Return the list of keys that failed insertion.
+        """
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            expires = datetime.max
+        else:
+            tz = timezone.utc if settings.USE_TZ else None
+            expires = datetime.fromtimestamp(timeout, tz=tz)
+        expires = expires.replace(microsecond=0)
+
+        db = router.db_for_write(self.cache_model_class)
+        connection = connections[db]
+        expires = connection.ops.adapt_datetimefield_value(expires)
+
+        rows = []
+        key_map = {}
+        for key, value in data.items():
+            cache_key = self.make_and_validate_key(key, version=version)
+            key_map[cache_key] = key
+            pickled = pickle.dumps(value, self.pickle_protocol)
+            # The value column is expecting a string, not bytes.
+            b64encoded = base64.b64encode(pickled).decode("latin1")
+            rows.append((cache_key, b64encoded, expires))
+
+        if not rows:
+            return []
+
+        self.cull_if_due(len(rows))
+
+        failed_keys = []
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start : start + self.batch_size]
+            if not self._write_rows(connection, batch):
+                failed_keys.extend(key_map[cache_key] for cache_key, _, _ in batch)
+
+        return failed_keys
+
+    def _write_rows(self, connection, rows):
+        """Replace the cache entries of ``rows`` in a single transaction."""
+        quote_name = connection.ops.quote_name
+        table = quote_name(self._table)
+        delete_sql = "DELETE FROM %s WHERE %s IN (%s)" % (
+            table,
+            quote_name("cache_key"),
+            ", ".join(["%s"] * len(rows)),
+        )
+        insert_sql = "INSERT INTO %s (%s, %s, %s) VALUES (%%s, %%s, %%s)" % (
+            table,
+            quote_name("cache_key"),
+            quote_name("value"),
+            quote_name("expires"),
+        )
+
+        try:
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(delete_sql, [cache_key for cache_key, _, _ in rows])
+                    cursor.executemany(insert_sql, rows)
+        except DatabaseError:
+            # Concurrent writes of the same keys are allowed to fail silently.
+            return False
+        return True
+
+    def cull(self):
+        """Remove the expired entries, then cull when MAX_ENTRIES is exceeded."""
+        db = router.db_for_write(self.cache_model_class)
+        connection = connections[db]
+        table = connection.ops.quote_name(self._table)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM %s" % table)
+            num = cursor.fetchone()[0]
+            if num > self._max_entries:
+                now = tz_now().replace(microsecond=0)
+                self._cull(db, cursor, now, num)
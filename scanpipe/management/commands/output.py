@@ -27,7 +27,7 @@ from scanpipe.pipes import output
 
 
 class Command(ProjectCommand):
-    help = "Output project results as JSON, XLSX, SPDX, and CycloneDX."
+    help = "Output project results as JSON, XLSX, SPDX, CycloneDX, and Parquet."
 
     def add_arguments(self, parser):
         super().add_arguments(parser)
@@ -35,7 +35,15 @@ class Command(ProjectCommand):
             "--format",
             default=["json"],
             nargs="+",
-            choices=["json", "csv", "xlsx", "spdx", "cyclonedx", "attribution"],
+            choices=[
+                "json",
+                "csv",
+                "xlsx",
+                "spdx",
+                "cyclonedx",
+                "attribution",
+                "parquet",
+            ],
             help="Specifies the output serialization format for the results.",
         )
         parser.add_argument(
@@ -54,8 +62,12 @@ class Command(ProjectCommand):
                 "--print cannot be used when multiple formats are provided."
             )
 
-        if print_to_stdout and ("xlsx" in formats or "csv" in formats):
-            raise CommandError("--print is not compatible with xlsx and csv formats.")
+        if print_to_stdout and any(
+            format_ in formats for format_ in ["xlsx", "csv", "parquet"]
+        ):
+            raise CommandError(
+                "--print is not compatible with xlsx, csv, and parquet formats."
+            )
 
         for format_ in formats:
             output_function = {
@@ -65,6 +77,7 @@ class Command(ProjectCommand):
                 "spdx": output.to_spdx,
                 "cyclonedx": output.to_cyclonedx,
                 "attribution": output.to_attribution,
+                "parquet": output.to_parquet,
             }.get(format_)
 
             output_file = output_function(self.project)
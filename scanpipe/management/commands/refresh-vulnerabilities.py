@@ -0,0 +1,92 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+
+from django.conf import settings
+from django.core.management import CommandError
+from django.core.management.base import BaseCommand
+
+import django_rq
+
+from scanpipe import tasks
+from scanpipe.pipes import vulnerablecode
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the vulnerabilities of the discovered packages and dependencies "
+        "across projects, looking up each unique PURL once in VulnerableCode."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--project",
+            action="append",
+            dest="project_names",
+            help=(
+                "Limit the refresh to this project. "
+                "Can be used multiple times to provide multiple projects."
+            ),
+        )
+        parser.add_argument(
+            "--include-archived",
+            action="store_true",
+            dest="include_archived",
+            help="Include archived projects.",
+        )
+        parser.add_argument(
+            "--async",
+            action="store_true",
+            dest="async",
+            help=(
+                "Add the refresh to the tasks queue for execution by a worker "
+                "instead of running in the current thread."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if not vulnerablecode.is_configured():
+            raise CommandError("VulnerableCode is not configured.")
+
+        if not vulnerablecode.is_available():
+            raise CommandError("VulnerableCode is not available.")
+
+        task_kwargs = {
+            "project_names": options["project_names"],
+            "include_archived": options["include_archived"],
+        }
+
+        if options["async"]:
+            if not settings.SCANCODEIO_ASYNC:
+                msg = "SCANCODEIO_ASYNC=False is not compatible with --async option."
+                raise CommandError(msg)
+
+            django_rq.enqueue(
+                tasks.refresh_vulnerabilities_task,
+                job_timeout=settings.SCANCODEIO_TASK_TIMEOUT,
+                **task_kwargs,
+            )
+            msg = "Vulnerabilities refresh added to the tasks queue for execution."
+            self.stdout.write(msg, self.style.SUCCESS)
+            return
+
+        tasks.refresh_vulnerabilities_task(logger=self.stdout.write, **task_kwargs)
+        self.stdout.write("Vulnerabilities refreshed.", self.style.SUCCESS)
@@ -1017,11 +1017,12 @@ class Project(UUIDPKModel, ExtraDataFieldMixin, UpdateMixin, models.Model):
         with suppress(ObjectDoesNotExist):
             return self.runs.not_started().earliest("created_date")
 
-    def add_message(
+    def make_message(
         self, severity, description="", model="", details=None, exception=None
     ):
         """
-        Create a ProjectMessage record for this Project.
+        Return a ProjectMessage instance for this Project, without saving it in the
+        database. This is suitable for the creation of records in bulk.
 
         The ``model`` attribute can be provided as a string or as a Model class.
         """
@@ -1035,7 +1036,7 @@ class Project(UUIDPKModel, ExtraDataFieldMixin, UpdateMixin, models.Model):
         if exception and not description:
             description = str(exception)
 
-        return ProjectMessage.objects.create(
+        return ProjectMessage(
             project=self,
             severity=severity,
             description=description,
@@ -1044,6 +1045,18 @@ class Project(UUIDPKModel, ExtraDataFieldMixin, UpdateMixin, models.Model):
             traceback=traceback,
         )
 
+    def add_message(
+        self, severity, description="", model="", details=None, exception=None
+    ):
+        """
+        Create a ProjectMessage record for this Project.
+
+        The ``model`` attribute can be provided as a string or as a Model class.
+        """
+        message = self.make_message(severity, description, model, details, exception)
+        message.save(force_insert=True)
+        return message
+
     def add_info(self, description="", model="", details=None, exception=None):
         """Create an INFO ProjectMessage record for this project."""
         severity = ProjectMessage.Severity.INFO
@@ -1325,6 +1338,18 @@ class SaveProjectMessageMixin:
 
         return []
 
+    def make_error(self, exception):
+        """
+        Return an unsaved ERROR ProjectMessage instance using the provided
+        ``exception`` Exception instance.
+        """
+        return self.project.make_message(
+            severity=ProjectMessage.Severity.ERROR,
+            model=self.__class__,
+            details=model_to_dict(self),
+            exception=exception,
+        )
+
     def add_error(self, exception):
         """
         Create a ProjectMessage record using the provided ``exception`` Exception
@@ -1755,6 +1780,21 @@ class CodebaseResourceQuerySet(ProjectRelatedQuerySet):
         for page in Paginator(self, per_page=per_page):
             yield page.object_list
 
+    def keyset_paginated(self, per_page=5000):
+        """
+        Iterate over a (large) QuerySet by chunks of ``per_page`` items, using
+        keyset pagination on the primary key instead of OFFSET.
+
+        The cost of each chunk query does not grow with the number of iterated
+        items. The items updated while iterating, so they do not match the QuerySet
+        filters anymore, do not shift the following chunks.
+        """
+        queryset = self.order_by("pk")
+        page = list(queryset[:per_page])
+        while page:
+            yield page
+            page = list(queryset.filter(pk__gt=page[-1].pk)[:per_page])
+
 
 class ScanFieldsModelMixin(models.Model):
     """Fields returned by the ScanCode-toolkit scans."""
@@ -1828,13 +1868,17 @@ class ScanFieldsModelMixin(models.Model):
     def scan_fields(cls):
         return [field.name for field in ScanFieldsModelMixin._meta.get_fields()]
 
-    def set_scan_results(self, scan_results, status=None):
+    def set_scan_results(self, scan_results, status=None, save=True):
         """
         Set the values of the current instance's scan-related fields using
         ``scan_results``.
 
         This instance status can be updated along the scan results by providing the
         optional ``status`` argument.
+
+        The instance is not saved when ``save`` is False, this is useful when the
+        updated instances are later saved in bulk.
+        Return the list of updated fields.
         """
         updated_fields = []
         for field_name, value in scan_results.items():
@@ -1846,9 +1890,11 @@ class ScanFieldsModelMixin(models.Model):
             self.status = status
             updated_fields.append("status")
 
-        if updated_fields:
+        if save and updated_fields:
             self.save(update_fields=updated_fields)
 
+        return updated_fields
+
     def copy_scan_results(self, from_instance):
         """
         Copy the scan-related fields values from ``from_instance`` to the current
@@ -1919,16 +1965,30 @@ class ComplianceAlertMixin(models.Model):
         `codebase` is not used in this context but required for compatibility
         with the commoncode.resource.Codebase class API.
         """
-        if scanpipe_app.policies_enabled:
-            loaded_license_expression = getattr(self, "_loaded_license_expression", "")
-            license_expression = getattr(self, self.license_expression_field, "")
-            if license_expression != loaded_license_expression:
-                self.compliance_alert = self.compute_compliance_alert()
-                if "update_fields" in kwargs:
-                    kwargs["update_fields"].append("compliance_alert")
+        if self.set_compliance_alert() and "update_fields" in kwargs:
+            kwargs["update_fields"].append("compliance_alert")
 
         super().save(*args, **kwargs)
 
+    def set_compliance_alert(self):
+        """
+        Set the ``compliance_alert`` value, if the policies feature is enabled and
+        the ``license_expression_field`` field value has changed since loading this
+        instance from the database.
+
+        Return True if the ``compliance_alert`` value was computed.
+        """
+        if not scanpipe_app.policies_enabled:
+            return False
+
+        loaded_license_expression = getattr(self, "_loaded_license_expression", "")
+        license_expression = getattr(self, self.license_expression_field, "")
+        if license_expression == loaded_license_expression:
+            return False
+
+        self.compliance_alert = self.compute_compliance_alert()
+        return True
+
     def compute_compliance_alert(self):
         """Compute and return the compliance_alert value from the licenses policies."""
         license_expression = getattr(self, self.license_expression_field, "")
@@ -2257,10 +2317,18 @@ class CodebaseResource(
         Return the content of the current Resource file using TextCode utilities
         for optimal compatibility.
         """
+        return self.read_file_content(self.location)
+
+    @classmethod
+    def read_file_content(cls, location):
+        """
+        Return the content of the file at ``location`` using TextCode utilities
+        for optimal compatibility.
+        """
         from textcode.analysis import numbered_text_lines
 
-        numbered_lines = numbered_text_lines(self.location)
-        numbered_lines = self._regroup_numbered_lines(numbered_lines)
+        numbered_lines = numbered_text_lines(location)
+        numbered_lines = cls._regroup_numbered_lines(numbered_lines)
 
         # ScanCode-toolkit is not providing the "\n" suffix when reading binary files.
         # The following is a workaround until the issue is fixed in the toolkit.
@@ -2799,6 +2867,10 @@ class DiscoveredPackage(
     def spdx_id(self):
         return f"SPDXRef-scancodeio-{self._meta.model_name}-{self.uuid}"
 
+    @property
+    def cyclonedx_bom_ref(self):
+        return self.package_url or str(self.uuid)
+
     def get_declared_license_expression(self):
         """
         Return this package license expression.
@@ -2919,7 +2991,7 @@ class DiscoveredPackage(
         return cyclonedx_component.Component(
             name=self.name,
             version=self.version,
-            bom_ref=purl or str(self.uuid),
+            bom_ref=self.cyclonedx_bom_ref,
             purl=purl,
             licenses=licenses,
             copyright_=self.copyright,
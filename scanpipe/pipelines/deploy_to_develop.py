@@ -106,6 +106,7 @@ class DeployToDevelop(Pipeline):
         extract_errors = scancode.extract_archives(
             self.project.codebase_path,
             recurse=self.env.get("extract_recursively", True),
+            progress_logger=self.log,
         )
 
         if extract_errors:
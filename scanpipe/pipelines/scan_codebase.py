@@ -63,6 +63,7 @@ class ScanCodebase(Pipeline):
         extract_errors = scancode.extract_archives(
             location=self.project.codebase_path,
             recurse=self.env.get("extract_recursively", True),
+            progress_logger=self.log,
         )
 
         if extract_errors:
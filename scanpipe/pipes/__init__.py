@@ -24,8 +24,12 @@ import difflib
 import logging
 import sys
 import uuid
+from collections import Counter
+from collections import defaultdict
+from collections import deque
 from contextlib import suppress
 from datetime import datetime
+from functools import lru_cache
 from itertools import islice
 from pathlib import Path
 from timeit import default_timer as timer
@@ -42,7 +46,9 @@ from scanpipe.pipes import scancode
 logger = logging.getLogger("scanpipe.pipes")
 
 
-def make_codebase_resource(project, location, save=True, **extra_fields):
+def make_codebase_resource(
+    project, location, save=True, resource_info=None, **extra_fields
+):
     """
     Create a CodebaseResource instance in the database for the given ``project``.
 
@@ -64,12 +70,17 @@ def make_codebase_resource(project, location, save=True, **extra_fields):
 
     All paths use the POSIX separators.
 
+    The ``resource_info`` mapping is computed from the ``location`` when not
+    provided.
+
     If a CodebaseResource already exists in the ``project`` with the same path,
     the error raised on save() is not stored in the database and the creation is
     skipped.
     """
     relative_path = Path(location).relative_to(project.codebase_path)
-    resource_data = scancode.get_resource_info(location=str(location))
+    resource_data = resource_info
+    if resource_data is None:
+        resource_data = scancode.get_resource_info(location=str(location))
 
     if extra_fields:
         resource_data.update(**extra_fields)
@@ -94,17 +105,60 @@ def get_resource_codebase_root(project, resource_path):
     return ""
 
 
-def yield_resources_from_codebase(project):
+def yield_codebase_resources(project, locations_and_extra_fields):
     """
     Yield CodebaseResource instances, including their ``info`` data, ready to be
-    inserted in the database using ``save()`` or ``bulk_create()``.
+    inserted in the database using ``bulk_create()``, for each (location, extra
+    fields mapping) of the ``locations_and_extra_fields`` iterable.
+
+    The ``info`` data are computed in a pool of processes, see
+    ``scancode.get_resources_info``.
     """
-    for resource_path in project.walk_codebase_path():
+    # The resources info are yielded in the locations order, the extra fields of
+    # the locations sent to the pool are queued until their info are available.
+    pending_extra_fields = deque()
+
+    def get_locations():
+        for location, extra_fields in locations_and_extra_fields:
+            pending_extra_fields.append(extra_fields)
+            yield str(location)
+
+    for location, resource_info in scancode.get_resources_info(get_locations()):
         yield make_codebase_resource(
             project=project,
-            location=resource_path,
+            location=location,
             save=False,
-            tag=get_resource_codebase_root(project, resource_path),
+            resource_info=resource_info,
+            **pending_extra_fields.popleft(),
+        )
+
+
+def yield_resources_from_codebase(project):
+    """
+    Yield CodebaseResource instances, including their ``info`` data, ready to be
+    inserted in the database using ``save()`` or ``bulk_create()``.
+
+    The ``info`` data are computed in a pool of processes while the codebase/
+    directory is walked.
+    """
+    locations_and_extra_fields = (
+        (path, {"tag": get_resource_codebase_root(project, path)})
+        for path in project.walk_codebase_path()
+    )
+    return yield_codebase_resources(project, locations_and_extra_fields)
+
+
+def bulk_create_codebase_resources(resources, batch_size=5000, ignore_conflicts=False):
+    """
+    Create the ``resources`` iterable of CodebaseResource instances in the database
+    by batches of ``batch_size``.
+
+    When ``ignore_conflicts`` is True, the resources with a path that already
+    exists in the project are skipped.
+    """
+    while batch := list(islice(resources, batch_size)):
+        CodebaseResource.objects.bulk_create(
+            batch, batch_size, ignore_conflicts=ignore_conflicts
         )
 
 
@@ -116,14 +170,8 @@ def collect_and_create_codebase_resources(project, batch_size=5000):
     The default ``batch_size`` can be overriden, although the benefits of a value
     greater than 5000 objects are usually not significant.
     """
-    model_class = CodebaseResource
     objs = yield_resources_from_codebase(project)
-
-    while True:
-        batch = list(islice(objs, batch_size))
-        if not batch:
-            break
-        model_class.objects.bulk_create(batch, batch_size)
+    bulk_create_codebase_resources(objs, batch_size)
 
 
 def update_or_create_resource(project, resource_data):
@@ -256,6 +304,98 @@ def make_relation(from_resource, to_resource, map_type, **extra_fields):
     )
 
 
+class RelationWriter:
+    """
+    Buffer the CodebaseRelation to create and the CodebaseResource status to update,
+    and write those in the database by batches of ``batch_size``.
+
+    The relations are deduplicated on the fields of the ``unique_relation``
+    constraint and created using ``bulk_create(ignore_conflicts=True)``, the
+    relations already existing in the database are skipped.
+    The status updates are grouped by status value, and applied with a single
+    ``UPDATE ... WHERE id IN (...)`` query for each status.
+
+    The resources can be provided as CodebaseResource instances or as any object
+    with an ``id`` attribute, such as rows from ``values_list(named=True)``.
+
+    Usage:
+        with RelationWriter(project) as relation_writer:
+            relation_writer.add_relation(from_resource, to_resource, "path")
+            relation_writer.set_status(to_resource, flag.MAPPED)
+    """
+
+    def __init__(self, project, batch_size=2000):
+        self.project = project
+        self.batch_size = batch_size
+        self.relations = {}
+        self.statuses = {}
+        self.relation_count = 0
+        self.status_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def add_relation(self, from_resource, to_resource, map_type, **extra_fields):
+        """Add a relation to be created from ``from_resource`` to ``to_resource``."""
+        key = (from_resource.id, to_resource.id, map_type)
+        if key not in self.relations:
+            self.relations[key] = CodebaseRelation(
+                project=self.project,
+                from_resource_id=from_resource.id,
+                to_resource_id=to_resource.id,
+                map_type=map_type,
+                **extra_fields,
+            )
+            self.flush_if_full()
+
+    def set_status(self, resource, status):
+        """Set the ``status`` of ``resource``, the latest status set is kept."""
+        self.statuses[resource.id] = status
+        if isinstance(resource, CodebaseResource):
+            resource.status = status
+        self.flush_if_full()
+
+    def merge(self, relation_writer):
+        """
+        Add the relations and status updates buffered in another ``relation_writer``,
+        such as one returned by a pool process.
+        """
+        for key, relation in relation_writer.relations.items():
+            self.relations.setdefault(key, relation)
+        self.statuses.update(relation_writer.statuses)
+        self.flush_if_full()
+
+    def flush_if_full(self):
+        if max(len(self.relations), len(self.statuses)) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered relations and status updates in the database."""
+        if self.relations:
+            CodebaseRelation.objects.bulk_create(
+                self.relations.values(),
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            self.relation_count += len(self.relations)
+
+        resource_ids_by_status = defaultdict(list)
+        for resource_id, status in self.statuses.items():
+            resource_ids_by_status[status].append(resource_id)
+
+        resources = self.project.codebaseresources
+        for status, resource_ids in resource_ids_by_status.items():
+            resources.filter(id__in=resource_ids).update(status=status)
+        self.status_count += len(self.statuses)
+
+        self.relations = {}
+        self.statuses = {}
+
+
 def normalize_path(path):
     """Return a normalized path from a `path` string."""
     return "/" + path.strip("/")
@@ -392,6 +532,55 @@ def get_text_str_diff_ratio(str_a, str_b):
     return matcher.quick_ratio()
 
 
+def get_text_lines_fingerprint(text):
+    """
+    Return a fingerprint of the ``text`` string lines as a Counter multiset of the
+    lines hashes.
+    """
+    return Counter(hash(line) for line in text.splitlines())
+
+
+# Number of resources lines fingerprints kept in memory.
+LINES_FINGERPRINT_CACHE_SIZE = 2048
+
+
+@lru_cache(maxsize=LINES_FINGERPRINT_CACHE_SIZE)
+def get_location_lines_fingerprint(location):
+    """
+    Return the lines fingerprint of the text content of the file at ``location``.
+    The fingerprints are cached, a file is read only once when compared with
+    multiple other files.
+    """
+    text = CodebaseResource.read_file_content(location)
+    return get_text_lines_fingerprint(text)
+
+
+def get_fingerprint_diff_ratio(fingerprint_a, fingerprint_b):
+    """
+    Return a similarity ratio as a float between 0 and 1 by comparing the
+    ``fingerprint_a`` and ``fingerprint_b`` text lines fingerprints.
+
+    The ratio is the same as the ``difflib.SequenceMatcher.quick_ratio()`` of the
+    text lines: twice the number of lines in common divided by the total number of
+    lines.
+
+    Return None if any of the two fingerprints is empty.
+    """
+    if not (fingerprint_a and fingerprint_b):
+        return
+
+    if len(fingerprint_a) > len(fingerprint_b):
+        fingerprint_a, fingerprint_b = fingerprint_b, fingerprint_a
+
+    matches = sum(
+        min(count, fingerprint_b[line_hash])
+        for line_hash, count in fingerprint_a.items()
+        if line_hash in fingerprint_b
+    )
+    length = sum(fingerprint_a.values()) + sum(fingerprint_b.values())
+    return 2.0 * matches / length
+
+
 def get_resource_diff_ratio(resource_a, resource_b):
     """
     Return a similarity ratio as a float between 0 and 1 by comparing the
@@ -400,7 +589,7 @@ def get_resource_diff_ratio(resource_a, resource_b):
     Return None if any of the two resources are not readable as text.
     """
     with suppress(IOError):
-        return get_text_str_diff_ratio(
-            str_a=resource_a.file_content,
-            str_b=resource_b.file_content,
+        return get_fingerprint_diff_ratio(
+            get_location_lines_fingerprint(resource_a.location),
+            get_location_lines_fingerprint(resource_b.location),
         )
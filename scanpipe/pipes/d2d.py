@@ -20,13 +20,21 @@
 # ScanCode.io is a free software code scanning tool from nexB Inc. and others.
 # Visit https://github.com/nexB/scancode.io for support and download.
 
+import concurrent.futures
+import hashlib
+import math
 from collections import defaultdict
 from contextlib import suppress
+from itertools import islice
 from pathlib import Path
 
+from django.conf import settings
 from django.core.exceptions import MultipleObjectsReturned
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count
+from django.db.models import Max
 from django.db.models import Q
+from django.db.models import Sum
 from django.template.defaultfilters import pluralize
 
 from commoncode.paths import common_prefix
@@ -36,6 +44,7 @@ from packagedcode.npm import NpmPackageJsonHandler
 from scanpipe import pipes
 from scanpipe.models import CodebaseRelation
 from scanpipe.pipes import LoopProgress
+from scanpipe.pipes import RelationWriter
 from scanpipe.pipes import flag
 from scanpipe.pipes import get_resource_diff_ratio
 from scanpipe.pipes import js
@@ -48,6 +57,9 @@ from scanpipe.pipes import scancode
 FROM = "from/"
 TO = "to/"
 
+# Number of to/ resources sent at once to a pool process, see `map_resources`.
+MAP_CHUNK_SIZE = 500
+
 
 def get_inputs(project):
     """Locate the ``from`` and ``to`` input files in project inputs/ directory."""
@@ -99,11 +111,161 @@ def get_from_files_for_scanning(resources):
     return mapped_from_files.filter(~Q(status=flag.ABOUT_MAPPED))
 
 
-def _map_checksum_resource(to_resource, from_resources, checksum_field):
+def get_resources_by_checksum(resources, checksum_field):
+    """
+    Return a mapping of lists of lightweight ``(id, path, <checksum_field>)`` rows,
+    keyed by their ``checksum_field`` value, from the ``resources`` QuerySet.
+    All the resources are loaded at once using a single query.
+    """
+    resources_by_checksum = defaultdict(list)
+    resource_rows = resources.values_list("id", "path", checksum_field, named=True)
+    for resource in resource_rows.iterator(chunk_size=2000):
+        resources_by_checksum[getattr(resource, checksum_field)].append(resource)
+    return resources_by_checksum
+
+
+def get_resources_by_id(resources):
+    """
+    Return a mapping of lightweight CodebaseResource instances keyed by id, from
+    the ``resources`` QuerySet. All the resources are loaded at once using a single
+    query, fetching only the fields required to resolve and compare pathmap matches.
+    """
+    return resources.only("id", "project", "path", "sha1").in_bulk()
+
+
+def get_resources_signature(resources, with_subpaths=True):
+    """
+    Return a signature string for the ``resources`` QuerySet filters and for its
+    current content. Any resource added to or removed from the ``resources`` changes
+    the returned signature.
+    """
+    content = resources.aggregate(count=Count("id"), max=Max("id"), sum=Sum("id"))
+    signature_parts = [str(resources.query), str(with_subpaths), str(content)]
+    return hashlib.sha1("\n".join(signature_parts).encode()).hexdigest()
+
+
+def get_resources_index(project, resources, with_subpaths=True):
+    """
+    Return a pathmap index built from the ``resources`` QuerySet paths.
+
+    The index is cached in the ``project`` tmp/ directory keyed by the
+    ``resources`` signature, so the following steps of the pipeline run reuse it
+    instead of building the same index again. The cached index is not used anymore
+    once the ``resources`` content changes.
+    """
+    compact = settings.SCANCODEIO_PATHMAP_COMPACT_INDEX
+    signature = get_resources_signature(resources, with_subpaths)
+    extension = "sfx" if compact else "idx"
+    index_location = project.tmp_path / f"pathmap-{signature}.{extension}"
+
+    if index_location.exists():
+        return pathmap.load_index(index_location, compact=compact)
+
+    index = pathmap.build_index(
+        resources.values_list("id", "path"),
+        with_subpaths=with_subpaths,
+        compact=compact,
+    )
+    project.tmp_path.mkdir(parents=True, exist_ok=True)
+    pathmap.save_index(index, index_location)
+    return index
+
+
+# The mapping kwargs of the pool processes, set once when the process starts.
+_map_func_kwargs = {}
+
+
+def _init_map_process(map_func_kwargs):
+    """
+    Store the ``map_func_kwargs`` in the pool process. The pool processes are forked
+    so the kwargs, such as large from/ indexes, are shared copy-on-write and are not
+    pickled for each chunk.
+    """
+    global _map_func_kwargs
+    _map_func_kwargs = map_func_kwargs
+
+
+def _map_resources_chunk(project, map_func, to_resources):
+    """
+    Run the ``map_func`` on each of the ``to_resources`` in a pool process.
+    Return a RelationWriter buffering the relations and status updates to be written
+    in the database by the main process.
+    """
+    chunk_writer = RelationWriter(project, batch_size=math.inf)
+    for to_resource in to_resources:
+        map_func(to_resource, relation_writer=chunk_writer, **_map_func_kwargs)
+    return chunk_writer
+
+
+def map_resources(
+    project,
+    to_resources,
+    map_func,
+    map_func_kwargs,
+    relation_writer,
+    progress,
+    chunk_size=MAP_CHUNK_SIZE,
+):
+    """
+    Run the ``map_func`` on each of the ``to_resources`` iterable, providing the
+    ``map_func_kwargs`` and the ``relation_writer`` as keyword arguments.
+
+    Multiprocessing is enabled by default, the ``to_resources`` are sent by chunks of
+    ``chunk_size`` to the pool processes. The number of processes can be controlled
+    through the ``SCANCODEIO_PROCESSES`` setting, and multiprocessing is disabled
+    using ``SCANCODEIO_PROCESSES=0``.
+
+    The ``map_func`` must not run any database query as it is executed in the pool
+    processes. The relations and status updates are returned to the main process and
+    written using the single ``relation_writer``.
+    """
+    max_workers = scancode.get_max_workers(keep_available=1)
+    if max_workers <= 0 or progress.total_iterations <= chunk_size:
+        for to_resource in progress.iter(to_resources):
+            map_func(to_resource, relation_writer=relation_writer, **map_func_kwargs)
+        return
+
+    to_resources = iter(to_resources)
+    max_pending = max_workers * 2
+    # Mapping of {future: number of resources in the chunk}
+    pending = {}
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers,
+        initializer=_init_map_process,
+        initargs=(map_func_kwargs,),
+    ) as executor:
+
+        def submit(count):
+            for _ in range(count):
+                if not (chunk := list(islice(to_resources, chunk_size))):
+                    return
+                future = executor.submit(_map_resources_chunk, project, map_func, chunk)
+                pending[future] = len(chunk)
+
+        submit(max_pending)
+        while pending:
+            done, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                relation_writer.merge(future.result())
+                progress.current_iteration += pending.pop(future)
+                progress.log_progress()
+            submit(len(done))
+
+
+def _map_checksum_resource(
+    to_resource, from_resources_by_checksum, checksum_field, relation_writer
+):
+    """
+    Map the ``to_resource`` to the best path matches among the from/ resources
+    with the same ``checksum_field`` value in ``from_resources_by_checksum``.
+    """
     checksum_value = getattr(to_resource, checksum_field)
-    matches = from_resources.filter(**{checksum_field: checksum_value})
+    matches = from_resources_by_checksum.get(checksum_value, [])
     for match in get_best_path_matches(to_resource, matches):
-        pipes.make_relation(
+        relation_writer.add_relation(
             from_resource=match,
             to_resource=to_resource,
             map_type=checksum_field,
@@ -111,7 +273,12 @@ def _map_checksum_resource(to_resource, from_resources, checksum_field):
 
 
 def map_checksum(project, checksum_field, logger=None):
-    """Map using checksum."""
+    """
+    Map using checksum.
+
+    The from/ resources are loaded once in memory and indexed by checksum, the
+    relations are computed in memory and created in bulk.
+    """
     project_files = project.codebaseresources.files().no_status()
     from_resources = project_files.from_codebase().has_value(checksum_field)
     to_resources = (
@@ -125,18 +292,35 @@ def map_checksum(project, checksum_field, logger=None):
             f"against from/ codebase"
         )
 
-    resource_iterator = to_resources.iterator(chunk_size=2000)
+    from_resources_by_checksum = get_resources_by_checksum(
+        from_resources, checksum_field
+    )
+
+    resource_rows = to_resources.values_list("id", "path", checksum_field, named=True)
+    resource_iterator = resource_rows.iterator(chunk_size=2000)
     progress = LoopProgress(resource_count, logger)
 
-    for to_resource in progress.iter(resource_iterator):
-        _map_checksum_resource(to_resource, from_resources, checksum_field)
+    with RelationWriter(project) as relation_writer:
+        map_resources(
+            project,
+            to_resources=resource_iterator,
+            map_func=_map_checksum_resource,
+            map_func_kwargs={
+                "from_resources_by_checksum": from_resources_by_checksum,
+                "checksum_field": checksum_field,
+            },
+            relation_writer=relation_writer,
+            progress=progress,
+        )
 
 
-def _map_java_to_class_resource(to_resource, from_resources, from_classes_index):
+def _map_java_to_class_resource(
+    to_resource, from_resources_by_id, from_classes_index, relation_writer
+):
     """
     Map the ``to_resource`` .class file Resource with a Resource in
-    ``from_resources`` .java files, using the ``from_classes_index`` index of
-    from/ fully qualified Java class names.
+    ``from_resources_by_id`` .java files, using the ``from_classes_index`` index
+    of from/ fully qualified Java class names.
     """
     normalized_java_path = jvm.get_normalized_java_path(to_resource.path)
     match = pathmap.find_paths(path=normalized_java_path, index=from_classes_index)
@@ -144,13 +328,13 @@ def _map_java_to_class_resource(to_resource, from_resources, from_classes_index)
         return
 
     for resource_id in match.resource_ids:
-        from_resource = from_resources.get(id=resource_id)
+        from_resource = from_resources_by_id[resource_id]
         # compute the root of the packages on the source side
         from_source_root_parts = from_resource.path.strip("/").split("/")
         from_source_root = "/".join(
             from_source_root_parts[: -match.matched_path_length]
         )
-        pipes.make_relation(
+        relation_writer.add_relation(
             from_resource=from_resource,
             to_resource=to_resource,
             map_type="java_to_class",
@@ -183,12 +367,23 @@ def map_java_to_class(project, logger=None):
 
     # we do not index subpath since we want to match only fully qualified names
     from_classes_index = pathmap.build_index(indexables, with_subpaths=False)
+    from_resources_by_id = get_resources_by_id(from_resources_dot_java)
 
     resource_iterator = to_resources_dot_class.iterator(chunk_size=2000)
     progress = LoopProgress(resource_count, logger)
 
-    for to_resource in progress.iter(resource_iterator):
-        _map_java_to_class_resource(to_resource, from_resources, from_classes_index)
+    with RelationWriter(project) as relation_writer:
+        map_resources(
+            project,
+            to_resources=resource_iterator,
+            map_func=_map_java_to_class_resource,
+            map_func_kwargs={
+                "from_resources_by_id": from_resources_by_id,
+                "from_classes_index": from_classes_index,
+            },
+            relation_writer=relation_writer,
+            progress=progress,
+        )
 
 
 def get_indexable_qualified_java_paths_from_values(resource_values):
@@ -345,7 +540,11 @@ def map_jar_to_source(project, logger=None):
 
 
 def _map_path_resource(
-    to_resource, from_resources, from_resources_index, diff_ratio_threshold=0.7
+    to_resource,
+    from_resources_by_id,
+    from_resources_index,
+    relation_writer,
+    diff_ratio_threshold=0.7,
 ):
     match = pathmap.find_paths(to_resource.path, from_resources_index)
     if not match:
@@ -358,11 +557,11 @@ def _map_path_resource(
     # Only create relations when the number of matches if inferior or equal to
     # the current number of path segment matched.
     if len(match.resource_ids) > match.matched_path_length:
-        to_resource.update(status=flag.TOO_MANY_MAPS)
+        relation_writer.set_status(to_resource, flag.TOO_MANY_MAPS)
         return
 
     for resource_id in match.resource_ids:
-        from_resource = from_resources.get(id=resource_id)
+        from_resource = from_resources_by_id[resource_id]
         diff_ratio = get_resource_diff_ratio(to_resource, from_resource)
         if diff_ratio is not None and diff_ratio < diff_ratio_threshold:
             continue
@@ -375,7 +574,7 @@ def _map_path_resource(
         if diff_ratio:
             extra_data["diff_ratio"] = f"{diff_ratio:.1%}"
 
-        pipes.make_relation(
+        relation_writer.add_relation(
             from_resource=from_resource,
             to_resource=to_resource,
             map_type="path",
@@ -400,15 +599,24 @@ def map_path(project, logger=None):
         logger("No from/ resources to map.")
         return
 
-    from_resources_index = pathmap.build_index(
-        from_resources.values_list("id", "path"), with_subpaths=True
-    )
+    from_resources_index = get_resources_index(project, from_resources)
+    from_resources_by_id = get_resources_by_id(from_resources)
 
     resource_iterator = to_resources.iterator(chunk_size=2000)
     progress = LoopProgress(resource_count, logger)
 
-    for to_resource in progress.iter(resource_iterator):
-        _map_path_resource(to_resource, from_resources, from_resources_index)
+    with RelationWriter(project) as relation_writer:
+        map_resources(
+            project,
+            to_resources=resource_iterator,
+            map_func=_map_path_resource,
+            map_func_kwargs={
+                "from_resources_by_id": from_resources_by_id,
+                "from_resources_index": from_resources_index,
+            },
+            relation_writer=relation_writer,
+            progress=progress,
+        )
 
 
 def create_package_from_purldb_data(project, resources, package_data):
@@ -464,6 +672,69 @@ def create_package_from_purldb_data(project, resources, package_data):
     return package, matched_resources_count
 
 
+def fetch_purldb_package_matches(sha1_list, enhance_package_data=True, **kwargs):
+    """
+    Send the ``sha1_list`` values to the purldb packages API endpoint and return a
+    list of (sha1, package data) of the matched Packages.
+    """
+    results = purldb.match_packages(
+        sha1_list=sha1_list,
+        enhance_package_data=enhance_package_data,
+    )
+    return [(package_data["sha1"], package_data) for package_data in results or []]
+
+
+def fetch_purldb_resource_matches(
+    sha1_list, package_data_by_purldb_urls=None, executor=None, **kwargs
+):
+    """
+    Send the ``sha1_list`` values to the purldb resources API endpoint and return
+    a list of (sha1, package data) of the matched Packages.
+
+    `package_data_by_purldb_urls` is a mapping of package data by their purldb
+    package instance URLs. This is intended to be used as a cache, to avoid
+    retrieving package data we retrieved before.
+    The data of the new package URLs are fetched concurrently when an ``executor``
+    is provided.
+    """
+    if package_data_by_purldb_urls is None:
+        package_data_by_purldb_urls = {}
+
+    results = purldb.match_resources(sha1_list=sha1_list) or []
+
+    package_urls = {result["package"] for result in results}
+    new_package_urls = list(package_urls.difference(package_data_by_purldb_urls))
+    map_func = executor.map if executor else map
+    new_package_data = map_func(purldb.request_get, new_package_urls)
+    for package_url, package_data in zip(new_package_urls, new_package_data):
+        if package_data:
+            package_data_by_purldb_urls[package_url] = package_data
+
+    return [
+        (result["sha1"], package_data)
+        for result in results
+        if (package_data := package_data_by_purldb_urls.get(result["package"]))
+    ]
+
+
+def create_packages_from_purldb_matches(project, resources_by_sha1, matches):
+    """
+    Create the packages from the ``matches`` list of (sha1, package data) for the
+    CodebaseResources of the ``resources_by_sha1`` mapping, then return the number
+    of CodebaseResources that were matched to a Package.
+    """
+    match_count = 0
+    for sha1, package_data in matches:
+        resources = resources_by_sha1.get(sha1, [])
+        _, matched_resources_count = create_package_from_purldb_data(
+            project=project,
+            resources=resources,
+            package_data=package_data,
+        )
+        match_count += matched_resources_count
+    return match_count
+
+
 def match_purldb_package(
     project, resources_by_sha1, enhance_package_data=True, **kwargs
 ):
@@ -473,23 +744,11 @@ def match_purldb_package(
     process the matched Package data, then return the number of
     CodebaseResources that were matched to a Package.
     """
-    match_count = 0
-    sha1_list = list(resources_by_sha1.keys())
-    if results := purldb.match_packages(
-        sha1_list=sha1_list,
+    matches = fetch_purldb_package_matches(
+        sha1_list=list(resources_by_sha1.keys()),
         enhance_package_data=enhance_package_data,
-    ):
-        # Process matched Package data
-        for package_data in results:
-            sha1 = package_data["sha1"]
-            resources = resources_by_sha1.get(sha1, [])
-            _, matched_resources_count = create_package_from_purldb_data(
-                project=project,
-                resources=resources,
-                package_data=package_data,
-            )
-            match_count += matched_resources_count
-    return match_count
+    )
+    return create_packages_from_purldb_matches(project, resources_by_sha1, matches)
 
 
 def match_purldb_resource(
@@ -505,44 +764,135 @@ def match_purldb_resource(
     package instance URLs. This is intended to be used as a cache, to avoid
     retrieving package data we retrieved before.
     """
-    package_data_by_purldb_urls = package_data_by_purldb_urls or {}
-    match_count = 0
-    sha1_list = list(resources_by_sha1.keys())
-    if results := purldb.match_resources(sha1_list=sha1_list):
-        # Process match results
-        for result in results:
-            # Get package data
-            package_instance_url = result["package"]
-            if package_instance_url not in package_data_by_purldb_urls:
-                # Get and cache package data if we do not have it
-                if package_data := purldb.request_get(url=package_instance_url):
-                    package_data_by_purldb_urls[package_instance_url] = package_data
-            else:
-                # Use cached package data
-                package_data = package_data_by_purldb_urls[package_instance_url]
-            sha1 = result["sha1"]
-            resources = resources_by_sha1.get(sha1, [])
-            _, matched_resources_count = create_package_from_purldb_data(
-                project=project,
-                resources=resources,
-                package_data=package_data,
-            )
-            match_count += matched_resources_count
-    return match_count
+    matches = fetch_purldb_resource_matches(
+        sha1_list=list(resources_by_sha1.keys()),
+        package_data_by_purldb_urls=package_data_by_purldb_urls,
+    )
+    return create_packages_from_purldb_matches(project, resources_by_sha1, matches)
+
+
+# Mapping of the PurlDB matcher functions to their function sending the requests
+# only, without any database related actions. Used to run the requests in threads
+# in `match_purldb_resources`.
+PURLDB_MATCHER_FETCH_FUNCS = {
+    match_purldb_package: fetch_purldb_package_matches,
+    match_purldb_resource: fetch_purldb_resource_matches,
+}
+
+
+def get_purldb_directory_package_data(fingerprint):
+    """
+    Return the data of the PurlDB package matched for a directory content
+    ``fingerprint``, or None if there is no match.
+    """
+    if results := purldb.match_directory(fingerprint=fingerprint):
+        package_url = results[0]["package"]
+        return purldb.request_get(url=package_url)
 
 
 def match_purldb_directory(project, resource):
     """Match a single directory resource in the PurlDB."""
     fingerprint = resource.extra_data.get("directory_content", "")
 
-    if results := purldb.match_directory(fingerprint=fingerprint):
-        package_url = results[0]["package"]
-        if package_data := purldb.request_get(url=package_url):
-            return create_package_from_purldb_data(project, [resource], package_data)
+    if package_data := get_purldb_directory_package_data(fingerprint):
+        return create_package_from_purldb_data(project, [resource], package_data)
+
+
+def is_in_matched_directory(path, matched_paths):
+    """
+    Return True if any of the parent directories of ``path`` is in the
+    ``matched_paths`` set of directory paths.
+    """
+    segments = path.split("/")
+    return any(
+        "/".join(segments[:parent_length]) in matched_paths
+        for parent_length in range(1, len(segments))
+    )
+
+
+def get_resources_by_sha1_batches(resources, chunk_size, progress):
+    """
+    Yield mappings of lists of CodebaseResources by their sha1 values, for batches
+    of ``chunk_size`` ``resources``.
+    The sha1 of the sources of the .map resources are included.
+    """
+    for resources_batch in resources.keyset_paginated(per_page=chunk_size):
+        resources_by_sha1 = defaultdict(list)
+        for to_resource in progress.iter(resources_batch):
+            resources_by_sha1[to_resource.sha1].append(to_resource)
+            if to_resource.path.endswith(".map"):
+                for js_sha1 in js.source_content_sha1_list(to_resource):
+                    resources_by_sha1[js_sha1].append(to_resource)
+        yield resources_by_sha1
+
+
+def exclude_matched_resources(resources_by_sha1, resources):
+    """
+    Return the ``resources_by_sha1`` mapping without the CodebaseResources that are
+    not part of the ``resources`` QuerySet anymore, such as the resources matched
+    to a Package by a previous batch.
+    """
+    resource_ids = {
+        resource.id
+        for sha1_resources in resources_by_sha1.values()
+        for resource in sha1_resources
+    }
+    unmatched_ids = set(
+        resources.filter(id__in=resource_ids).values_list("id", flat=True)
+    )
+    return {
+        sha1: unmatched
+        for sha1, sha1_resources in resources_by_sha1.items()
+        if (unmatched := [r for r in sha1_resources if r.id in unmatched_ids])
+    }
+
+
+def fetch_purldb_batches_matches(
+    batches, fetch_func, package_data_by_purldb_urls, max_workers
+):
+    """
+    Run the ``fetch_func`` PurlDB requests for each ``batches`` mapping of lists of
+    CodebaseResources by their sha1 values, using up to ``max_workers`` threads.
+    Yield the (resources_by_sha1, matches) tuples as the requests complete.
+
+    Only ``max_workers`` batches are pulled from the ``batches`` iterator ahead of
+    the completed ones.
+    """
+    # The package data requests are run in their own pool to avoid a deadlock
+    # where all the batch threads would wait on requests queued behind them.
+    batch_executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+    request_executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+    with batch_executor, request_executor:
+        # Mapping of {future: resources_by_sha1}
+        pending = {}
+
+        def submit(count):
+            for resources_by_sha1 in islice(batches, count):
+                future = batch_executor.submit(
+                    fetch_func,
+                    sha1_list=list(resources_by_sha1.keys()),
+                    package_data_by_purldb_urls=package_data_by_purldb_urls,
+                    executor=request_executor,
+                )
+                pending[future] = resources_by_sha1
+
+        submit(max_workers)
+        while pending:
+            done, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                yield pending.pop(future), future.result()
+            submit(len(done))
 
 
 def match_purldb_resources(
-    project, extensions, matcher_func, chunk_size=1000, logger=None
+    project,
+    extensions,
+    matcher_func,
+    chunk_size=1000,
+    logger=None,
+    max_workers=purldb.DEFAULT_MAX_WORKERS,
 ):
     """
     Match against PurlDB selecting codebase resources using provided
@@ -550,6 +900,10 @@ def match_purldb_resources(
 
     Match requests are sent off in batches of 1000 SHA1s. This number is set
     using `chunk_size`.
+
+    For the ``match_purldb_package`` and ``match_purldb_resource`` matchers, up to
+    ``max_workers`` batches are sent concurrently using threads, while the matched
+    packages of the completed batches are created in this main thread.
     """
     to_resources = (
         project.codebaseresources.files()
@@ -573,40 +927,55 @@ def match_purldb_resources(
                 f"as there are {resource_count:,d}"
             )
 
-    resource_iterator = to_resources.paginated(per_page=chunk_size)
+    purldb.response_cache.reset_stats()
     progress = LoopProgress(resource_count, logger)
+    batches = get_resources_by_sha1_batches(to_resources, chunk_size, progress)
+    package_data_by_purldb_urls = {}
     matched_count = 0
     sha1_count = 0
-    resources_by_sha1 = defaultdict(list)
-    package_data_by_purldb_urls = {}
-
-    for resources_batch in resource_iterator:
-        for to_resource in progress.iter(resources_batch):
-            resources_by_sha1[to_resource.sha1].append(to_resource)
-            if to_resource.path.endswith(".map"):
-                for js_sha1 in js.source_content_sha1_list(to_resource):
-                    resources_by_sha1[js_sha1].append(to_resource)
 
-        matched_count += matcher_func(
-            project=project,
-            resources_by_sha1=resources_by_sha1,
-            package_data_by_purldb_urls=package_data_by_purldb_urls,
+    if fetch_func := PURLDB_MATCHER_FETCH_FUNCS.get(matcher_func):
+        batches_matches = fetch_purldb_batches_matches(
+            batches, fetch_func, package_data_by_purldb_urls, max_workers
         )
+        for resources_by_sha1, matches in batches_matches:
+            sha1_count += len(resources_by_sha1)
+            if matches:
+                resources_by_sha1 = exclude_matched_resources(
+                    resources_by_sha1, to_resources
+                )
+                matched_count += create_packages_from_purldb_matches(
+                    project, resources_by_sha1, matches
+                )
 
-        # Keep track of the total number of SHA1s we send
-        sha1_count += len(resources_by_sha1)
-        # Clear out resources_by_sha1 when we are done with the current batch of
-        # CodebaseResources
-        resources_by_sha1 = defaultdict(list)
+    else:
+        for resources_by_sha1 in batches:
+            matched_count += matcher_func(
+                project=project,
+                resources_by_sha1=resources_by_sha1,
+                package_data_by_purldb_urls=package_data_by_purldb_urls,
+            )
+            # Keep track of the total number of SHA1s we send
+            sha1_count += len(resources_by_sha1)
 
     logger(
         f"{matched_count:,d} resources matched in PurlDB "
         f"using {sha1_count:,d} SHA1s"
     )
+    if purldb.response_cache.enabled:
+        logger(purldb.response_cache.get_stats_message())
 
 
-def match_purldb_directories(project, logger=None):
-    """Match against PurlDB selecting codebase directories."""
+def match_purldb_directories(
+    project, logger=None, max_workers=purldb.DEFAULT_MAX_WORKERS
+):
+    """
+    Match against PurlDB selecting codebase directories.
+
+    The directories are loaded once and matched level by level, starting from the
+    root to/ directory. The directories of a level are matched using up to
+    ``max_workers`` concurrent requests.
+    """
     # If we are able to get match results for a directory fingerprint, then that
     # means every resource and directory under that directory is part of a
     # Package. By starting from the root to/ directory, we are attempting to
@@ -624,13 +993,43 @@ def match_purldb_directories(project, logger=None):
             f"director{pluralize(directory_count, 'y,ies')} from to/ in PurlDB"
         )
 
-    directory_iterator = to_directories.iterator(chunk_size=2000)
-    progress = LoopProgress(directory_count, logger)
+    # Directories are grouped by depth, the descendants of a matched directory
+    # are skipped without being sent to PurlDB.
+    matched_paths = set()
+    directories_by_depth = defaultdict(list)
+    for directory in to_directories.iterator(chunk_size=2000):
+        if directory.status == flag.MATCHED_TO_PURLDB:
+            matched_paths.add(directory.path)
+        else:
+            depth = directory.path.count("/")
+            directories_by_depth[depth].append(directory)
 
-    for directory in progress.iter(directory_iterator):
-        directory.refresh_from_db()
-        if directory.status != flag.MATCHED_TO_PURLDB:
-            match_purldb_directory(project, directory)
+    progress = LoopProgress(directory_count, logger)
+    progress.current_iteration = len(matched_paths)
+    purldb.response_cache.reset_stats()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        for depth in sorted(directories_by_depth):
+            directories = []
+            for directory in directories_by_depth[depth]:
+                fingerprint = directory.extra_data.get("directory_content")
+                if fingerprint and not is_in_matched_directory(
+                    directory.path, matched_paths
+                ):
+                    directories.append((directory, fingerprint))
+                else:
+                    progress.current_iteration += 1
+
+            # The HTTP requests are run in the threads, while the database
+            # related actions are executed in this main thread.
+            fingerprints = [fingerprint for _, fingerprint in directories]
+            results = executor.map(get_purldb_directory_package_data, fingerprints)
+            for (directory, _), package_data in zip(directories, results):
+                progress.current_iteration += 1
+                progress.log_progress()
+                if package_data:
+                    create_package_from_purldb_data(project, [directory], package_data)
+                    matched_paths.add(directory.path)
 
     matched_count = (
         project.codebaseresources.directories()
@@ -642,6 +1041,8 @@ def match_purldb_directories(project, logger=None):
         f"{matched_count:,d} director{pluralize(matched_count, 'y,ies')} "
         f"matched in PurlDB"
     )
+    if purldb.response_cache.enabled:
+        logger(purldb.response_cache.get_stats_message())
 
 
 def map_javascript(project, logger=None):
@@ -660,21 +1061,24 @@ def map_javascript(project, logger=None):
         )
 
     from_resources = project_files.from_codebase().exclude(path__contains="/test/")
-    from_resources_index = pathmap.build_index(
-        from_resources.values_list("id", "path"), with_subpaths=True
-    )
+    from_resources_index = get_resources_index(project, from_resources)
 
     resource_iterator = to_resources_dot_map.iterator(chunk_size=2000)
     progress = LoopProgress(to_resources_dot_map_count, logger)
 
-    for to_dot_map in progress.iter(resource_iterator):
-        _map_javascript_resource(
-            to_dot_map, to_resources_minified, from_resources_index, from_resources
-        )
+    with RelationWriter(project) as relation_writer:
+        for to_dot_map in progress.iter(resource_iterator):
+            _map_javascript_resource(
+                to_dot_map,
+                to_resources_minified,
+                from_resources_index,
+                from_resources,
+                relation_writer,
+            )
 
 
 def _map_javascript_resource(
-    to_map, to_resources_minified, from_resources_index, from_resources
+    to_map, to_resources_minified, from_resources_index, from_resources, relation_writer
 ):
     matches = js.get_matches_by_sha1(to_map, from_resources)
 
@@ -691,16 +1095,18 @@ def _map_javascript_resource(
 
     for resource in transpiled:
         for match, extra_data in matches:
-            pipes.make_relation(
+            relation_writer.add_relation(
                 from_resource=match,
                 to_resource=resource,
                 map_type="js_compiled",
                 extra_data=extra_data,
             )
-            resource.update(status=flag.MAPPED)
+            relation_writer.set_status(resource, flag.MAPPED)
 
 
-def _map_about_file_resource(project, about_file_resource, to_resources):
+def _map_about_file_resource(
+    project, about_file_resource, to_resources, relation_writer
+):
     about_file_location = str(about_file_resource.location_path)
     package_data = resolve.resolve_about_package(about_file_location)
 
@@ -755,15 +1161,15 @@ def _map_about_file_resource(project, about_file_resource, to_resources):
     pipes.update_or_create_package(project, package_data, codebase_resources)
 
     # Map the .ABOUT file resource to all related resources in the ``to/`` side.
-    for to_resource in codebase_resources:
-        pipes.make_relation(
+    for to_resource in codebase_resources.only("id"):
+        relation_writer.add_relation(
             from_resource=about_file_resource,
             to_resource=to_resource,
             map_type="about_file",
         )
 
     codebase_resources.update(status=flag.ABOUT_MAPPED)
-    about_file_resource.update(status=flag.ABOUT_MAPPED)
+    relation_writer.set_status(about_file_resource, flag.ABOUT_MAPPED)
 
 
 def map_about_files(project, logger=None):
@@ -779,15 +1185,18 @@ def map_about_files(project, logger=None):
             f"codebase."
         )
 
-    for about_file_resource in from_about_files:
-        _map_about_file_resource(project, about_file_resource, to_resources)
+    with RelationWriter(project) as relation_writer:
+        for about_file_resource in from_about_files:
+            _map_about_file_resource(
+                project, about_file_resource, to_resources, relation_writer
+            )
 
-        about_file_companions = (
-            about_file_resource.siblings()
-            .filter(name__startswith=about_file_resource.name_without_extension)
-            .filter(extension__in=[".LICENSE", ".NOTICE"])
-        )
-        about_file_companions.update(status=flag.ABOUT_MAPPED)
+            about_file_companions = (
+                about_file_resource.siblings()
+                .filter(name__startswith=about_file_resource.name_without_extension)
+                .filter(extension__in=[".LICENSE", ".NOTICE"])
+            )
+            about_file_companions.update(status=flag.ABOUT_MAPPED)
 
 
 def map_javascript_post_purldb_match(project, logger=None):
@@ -816,9 +1225,7 @@ def map_javascript_post_purldb_match(project, logger=None):
             f"resources based on existing PurlDB match."
         )
 
-    to_resources_dot_map_index = pathmap.build_index(
-        to_resources_dot_map.values_list("id", "path"), with_subpaths=True
-    )
+    to_resources_dot_map_index = get_resources_index(project, to_resources_dot_map)
 
     resource_iterator = to_resources_minified.iterator(chunk_size=2000)
     progress = LoopProgress(to_resources_minified_count, logger)
@@ -879,9 +1286,8 @@ def map_javascript_path(project, logger=None):
             f"against from/ codebase."
         )
 
-    from_resources_index = pathmap.build_index(
-        from_resources.values_list("id", "path"), with_subpaths=True
-    )
+    from_resources_index = get_resources_index(project, from_resources)
+    from_resources_by_id = get_resources_by_id(from_resources)
 
     resource_iterator = to_resources_key.iterator(chunk_size=2000)
     progress = LoopProgress(resource_count, logger)
@@ -889,14 +1295,18 @@ def map_javascript_path(project, logger=None):
 
     for to_resource in progress.iter(resource_iterator):
         map_count += _map_javascript_path_resource(
-            to_resource, to_resources, from_resources_index, from_resources
+            to_resource, to_resources, from_resources_index, from_resources_by_id
         )
 
     logger(f"{map_count:,d} resources mapped")
 
 
 def _map_javascript_path_resource(
-    to_resource, to_resources, from_resources_index, from_resources, map_type="js_path"
+    to_resource,
+    to_resources,
+    from_resources_index,
+    from_resources_by_id,
+    map_type="js_path",
 ):
     """
     Map JavaScript deployed files using their .map files.
@@ -932,7 +1342,7 @@ def _map_javascript_path_resource(
 
         if match.matched_path_length > max_matched_path:
             max_matched_path = match.matched_path_length
-            from_resource = from_resources.get(id=match.resource_ids[0])
+            from_resource = from_resources_by_id[match.resource_ids[0]]
             extra_data = {"path_score": f"{match.matched_path_length}/{path_parts_len}"}
 
     return js.map_related_files(
@@ -1018,15 +1428,20 @@ def _map_javascript_colocation_resource(
                 {},
             )
 
+    from_neighboring_resources_by_id = get_resources_by_id(from_neighboring_resources)
     from_neighboring_resources_index = pathmap.build_index(
-        from_neighboring_resources.values_list("id", "path"), with_subpaths=True
+        [
+            (resource.id, resource.path)
+            for resource in from_neighboring_resources_by_id.values()
+        ],
+        with_subpaths=True,
     )
 
     return _map_javascript_path_resource(
         to_resource,
         to_resources,
         from_neighboring_resources_index,
-        from_neighboring_resources,
+        from_neighboring_resources_by_id,
         map_type="js_colocation",
     )
 
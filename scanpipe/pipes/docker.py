@@ -20,18 +20,31 @@
 # ScanCode.io is a free software code scanning tool from nexB Inc. and others.
 # Visit https://github.com/nexB/scancode.io for support and download.
 
+import concurrent.futures
+import fcntl
+import json
 import logging
+import os
 import posixpath
+import re
+import shutil
+import tempfile
 from collections import namedtuple
+from contextlib import contextmanager
+from itertools import repeat
 from pathlib import Path
 
+from django.conf import settings
+
 from container_inspector.image import Image
 from container_inspector.utils import extract_tar
 from extractcode import EXTRACT_SUFFIX
 
+from scancodeio import __version__ as scancodeio_version
 from scanpipe import pipes
 from scanpipe.pipes import flag
 from scanpipe.pipes import rootfs
+from scanpipe.pipes import scancode
 
 logger = logging.getLogger(__name__)
 
@@ -60,15 +73,38 @@ def extract_images_from_inputs(project):
     images = []
     errors = []
 
-    for tarball in get_tarballs_from_inputs(project):
-        extract_target = target_path / f"{tarball.name}{EXTRACT_SUFFIX}"
-        imgs, errs = extract_image_from_tarball(tarball, extract_target)
+    tarballs = get_tarballs_from_inputs(project)
+    extract_targets = [
+        target_path / f"{tarball.name}{EXTRACT_SUFFIX}" for tarball in tarballs
+    ]
+    results = map_in_processes(extract_image_from_tarball, tarballs, extract_targets)
+    for imgs, errs in results:
         images.extend(imgs)
         errors.extend(errs)
 
     return images, errors
 
 
+def map_in_processes(func, *iterables):
+    """
+    Return the list of results of ``func`` called with the items of the
+    ``iterables`` as arguments, in the same order.
+
+    The calls are executed in a pool of processes, which size can be limited
+    through the ``SCANCODEIO_EXTRACT_PROCESSES`` setting.
+    Multiprocessing is not used for a single call or when disabled using
+    ``SCANCODEIO_EXTRACT_PROCESSES=0``.
+    """
+    arguments = list(zip(*iterables))
+    max_workers = min(scancode.get_extract_max_workers(), len(arguments))
+
+    if max_workers <= 1:
+        return [func(*args) for args in arguments]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        return list(executor.map(func, *zip(*arguments)))
+
+
 def extract_image_from_tarball(input_tarball, extract_target, verify=True):
     """
     Extract images from an ``input_tarball`` to an ``extract_target`` directory
@@ -90,10 +126,255 @@ def extract_image_from_tarball(input_tarball, extract_target, verify=True):
     return images, errors
 
 
+class LayerCache:
+    """
+    On-disk cache of the extracted Docker image layers, shared across projects and
+    keyed on the layer id.
+
+    Each cache entry is a directory named after the layer id, containing:
+    - the extracted layer files in a "tree/" directory
+    - a "layer.json" file with the entry size and the extraction errors, its
+      modification time is refreshed on each access for the LRU eviction
+    - a "resources.json" file with the layer files info, once computed
+
+    The least recently used entries are evicted once the total size of the cache
+    entries exceeds ``max_size`` bytes.
+    The "layer.json" file of an entry is locked while the entry is copied or
+    evicted: the entries copied by other projects are never evicted.
+    """
+
+    tree_dirname = "tree"
+    layer_filename = "layer.json"
+    resources_filename = "resources.json"
+    layer_id_regex = re.compile(r"^\w[\w.:-]*$")
+
+    def __init__(self, location, max_size):
+        self.location = Path(location)
+        self.max_size = max_size
+
+    def is_cacheable(self, layer_id):
+        return bool(layer_id and self.layer_id_regex.match(layer_id))
+
+    def get_entry_path(self, layer_id):
+        return self.location / layer_id
+
+    def get(self, layer_id):
+        """
+        Return the cache entry path of the ``layer_id``, or None if this layer is
+        not cached. The entry is marked as recently used.
+        """
+        entry_path = self.get_entry_path(layer_id)
+        layer_file = entry_path / self.layer_filename
+        try:
+            layer_file.touch(exist_ok=True)
+        except OSError:
+            return
+
+        if (entry_path / self.tree_dirname).is_dir():
+            return entry_path
+
+    @contextmanager
+    def lock_entry(self, entry_path, exclusive=False):
+        """
+        Lock the ``entry_path`` and yield True when the lock is acquired, or False
+        when the entry does not exist anymore.
+
+        A shared lock is used to copy the entry, and waits for an eviction in
+        progress. An exclusive lock is used to evict the entry, and is not acquired
+        when the entry is in use.
+        """
+        try:
+            layer_file = open(entry_path / self.layer_filename, "rb")
+        except OSError:
+            yield False
+            return
+
+        operation = fcntl.LOCK_EX | fcntl.LOCK_NB if exclusive else fcntl.LOCK_SH
+        # The lock is released when the file is closed.
+        with layer_file:
+            try:
+                fcntl.flock(layer_file, operation)
+            except OSError:
+                yield False
+                return
+            yield True
+
+    def get_errors(self, entry_path):
+        layer_file = entry_path / self.layer_filename
+        return json.loads(layer_file.read_text()).get("errors", [])
+
+    def add(self, layer_id, archive_location):
+        """
+        Extract the layer ``archive_location`` in a new cache entry for ``layer_id``
+        and return the entry path.
+        The layer is extracted in a temporary directory first, and then moved
+        in place, to never expose a partially extracted layer.
+        """
+        self.location.mkdir(parents=True, exist_ok=True)
+        temp_path = Path(tempfile.mkdtemp(dir=self.location, prefix=".tmp-"))
+        errors = extract_tar(
+            location=archive_location,
+            target_dir=temp_path / self.tree_dirname,
+            skip_symlinks=False,
+            as_events=False,
+        )
+        layer_data = {
+            "size": get_directory_size(temp_path),
+            "errors": errors,
+        }
+        (temp_path / self.layer_filename).write_text(json.dumps(layer_data))
+
+        entry_path = self.get_entry_path(layer_id)
+        try:
+            temp_path.rename(entry_path)
+        except OSError:
+            # This layer was concurrently added by another project.
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+        return entry_path
+
+    def extract_layer(self, layer_id, archive_location, target_path):
+        """
+        Copy the ``layer_id`` files from the cache to the ``target_path``, adding
+        the layer ``archive_location`` to the cache first when missing.
+        Return the list of errors of the layer extraction.
+
+        The files are copied, not linked, as the project codebase files can be
+        modified or removed by the pipelines without altering the cache entry.
+        The layer is extracted from its ``archive_location`` when the entry was
+        evicted in the meantime or cannot be copied.
+        """
+        entry_path = self.get(layer_id)
+        if not entry_path:
+            logger.info(f"Adding layer {layer_id} to the layer cache.")
+            entry_path = self.add(layer_id, archive_location)
+
+        tree_path = entry_path / self.tree_dirname
+        with self.lock_entry(entry_path) as locked:
+            # The entry may have been evicted before the lock was acquired.
+            if locked and tree_path.is_dir():
+                try:
+                    shutil.copytree(
+                        src=tree_path,
+                        dst=target_path,
+                        symlinks=True,
+                        dirs_exist_ok=True,
+                    )
+                    return self.get_errors(entry_path)
+                except (OSError, shutil.Error) as error:
+                    logger.info(f"Cannot copy layer {layer_id} from the cache: {error}")
+
+        logger.info(f"Extracting layer {layer_id} without the layer cache.")
+        shutil.rmtree(target_path, ignore_errors=True)
+        return extract_tar(
+            location=archive_location,
+            target_dir=target_path,
+            skip_symlinks=False,
+            as_events=False,
+        )
+
+    def get_resources_info(self, layer_id):
+        """
+        Return the mapping of {rootfs_path: resource info} of the ``layer_id`` files
+        or None if not available.
+        """
+        resources_file = self.get_entry_path(layer_id) / self.resources_filename
+        try:
+            resources_data = json.loads(resources_file.read_text())
+        except (OSError, ValueError):
+            return
+
+        if resources_data.get("version") == scancodeio_version:
+            return resources_data.get("resources")
+
+    def set_resources_info(self, layer_id, resources_info):
+        """Store the ``resources_info`` mapping of a cached ``layer_id``."""
+        entry_path = self.get_entry_path(layer_id)
+        if not entry_path.is_dir():
+            return
+
+        resources_data = {
+            "version": scancodeio_version,
+            "resources": resources_info,
+        }
+        _, temp_location = tempfile.mkstemp(dir=entry_path, prefix=".tmp-")
+        Path(temp_location).write_text(json.dumps(resources_data))
+        os.replace(temp_location, entry_path / self.resources_filename)
+
+    def get_entries(self):
+        """Return a list of (last access time, size, entry path) for all entries."""
+        entries = []
+        for entry_path in self.location.iterdir():
+            layer_file = entry_path / self.layer_filename
+            try:
+                last_access = layer_file.stat().st_mtime
+                size = json.loads(layer_file.read_text())["size"]
+            except (OSError, ValueError, KeyError):
+                continue
+            entries.append((last_access, size, entry_path))
+        return entries
+
+    def evict(self, keep=()):
+        """
+        Remove the least recently used entries until the cache size is below the
+        ``max_size``. The entries of the ``keep`` layer ids are never removed.
+        """
+        entries = sorted(self.get_entries())
+        cache_size = sum(size for _, size, _ in entries)
+
+        for _, size, entry_path in entries:
+            if cache_size <= self.max_size:
+                break
+            if entry_path.name in keep:
+                continue
+
+            with self.lock_entry(entry_path, exclusive=True) as locked:
+                # This entry is being copied by another project.
+                if not locked:
+                    continue
+
+                logger.info(f"Evicting layer {entry_path.name} from the layer cache.")
+                # Move the entry out of the way first as the removal is not atomic.
+                temp_path = self.location / f".tmp-evicted-{entry_path.name}"
+                try:
+                    entry_path.rename(temp_path)
+                except OSError:
+                    continue
+                shutil.rmtree(temp_path, ignore_errors=True)
+
+            cache_size -= size
+
+
+def get_layer_cache():
+    """
+    Return a LayerCache instance if the SCANCODEIO_LAYER_CACHE is enabled.
+    The scan results of the layers files are not stored in the LayerCache, those
+    are reused from the scan results cache, required using SCANCODEIO_SCAN_CACHE.
+    """
+    if settings.SCANCODEIO_LAYER_CACHE and settings.SCANCODEIO_SCAN_CACHE:
+        return LayerCache(
+            location=settings.SCANCODEIO_LAYER_CACHE_LOCATION,
+            max_size=settings.SCANCODEIO_LAYER_CACHE_MAX_SIZE,
+        )
+
+
+def get_directory_size(path):
+    """
+    Return the total size in bytes of the files and directories in the ``path``
+    directory.
+    """
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            size += os.lstat(os.path.join(root, name)).st_size
+    return size
+
+
 def extract_layers_from_images(project, images):
     """
     Extract all layers from the provided `images` into the `project` codebase
     work directory.
+    The layers are extracted through the layer cache when enabled.
 
     Return an `errors` list of error messages that may occur during the
     extraction.
@@ -101,19 +382,43 @@ def extract_layers_from_images(project, images):
     return extract_layers_from_images_to_base_path(
         base_path=project.codebase_path,
         images=images,
+        layer_cache=get_layer_cache(),
+    )
+
+
+def extract_layer(archive_location, extract_target, layer_id=None, layer_cache=None):
+    """
+    Extract the layer ``archive_location`` tarball to the ``extract_target``
+    directory, through the ``layer_cache`` when provided.
+
+    Return an `errors` list of error messages that may occur during the
+    extraction.
+    """
+    if layer_cache and layer_cache.is_cacheable(layer_id):
+        return layer_cache.extract_layer(layer_id, archive_location, extract_target)
+
+    return extract_tar(
+        location=archive_location,
+        target_dir=extract_target,
+        skip_symlinks=False,
+        as_events=False,
     )
 
 
-def extract_layers_from_images_to_base_path(base_path, images):
+def extract_layers_from_images_to_base_path(base_path, images, layer_cache=None):
     """
     Extract all layers from the provided `images` into the `base_path` work
     directory.
+    The layers are extracted in parallel processes, see ``map_in_processes``.
+    When a `layer_cache` is provided, the layers are copied from this cache, and
+    added to it first when missing.
 
     Return an `errors` list of error messages that may occur during the
     extraction.
     """
     errors = []
     base_path = Path(base_path)
+    layers = []
 
     for image in images:
         image_dirname = Path(image.extracted_location).name
@@ -121,15 +426,26 @@ def extract_layers_from_images_to_base_path(base_path, images):
 
         for layer in image.layers:
             extract_target = target_path / layer.layer_id
-            extract_errors = extract_tar(
-                location=layer.archive_location,
-                target_dir=extract_target,
-                skip_symlinks=False,
-                as_events=False,
-            )
-            errors.extend(extract_errors)
+            layers.append((layer.archive_location, extract_target, layer.layer_id))
             layer.extracted_location = str(extract_target)
 
+    if not layers:
+        return errors
+
+    archive_locations, extract_targets, layer_ids = zip(*layers)
+    results = map_in_processes(
+        extract_layer,
+        archive_locations,
+        extract_targets,
+        layer_ids,
+        repeat(layer_cache),
+    )
+    for extract_errors in results:
+        errors.extend(extract_errors)
+
+    if layer_cache:
+        layer_cache.evict(keep=set(layer_ids))
+
     return errors
 
 
@@ -169,21 +485,88 @@ def get_layer_tag(image_id, layer_id, layer_index, id_length=6):
     return f"img-{short_image_id}-layer-{layer_index:02}-{short_layer_id}"
 
 
-def create_codebase_resources(project, image):
-    """Create the CodebaseResource for an `image` in a `project`."""
+def get_layers_resources(image):
+    """
+    Yield a (location, extra fields) tuple for each resource of the `image` layers,
+    with the `rootfs_path` and layer `tag` fields.
+    """
+    for layer_index, layer in enumerate(image.layers, start=1):
+        layer_tag = get_layer_tag(image.image_id, layer.layer_id, layer_index)
+
+        for resource in layer.get_resources(with_dir=True):
+            yield resource.location, {"rootfs_path": resource.path, "tag": layer_tag}
+
+
+def get_cached_layer_resources_info(layer, layer_cache):
+    """
+    Return the mapping of {rootfs_path: resource info} of the `layer` files from
+    the `layer_cache`. The info are computed and stored in the cache when missing.
+    """
+    resources_info = layer_cache.get_resources_info(layer.layer_id)
+    if resources_info is not None:
+        return resources_info
+
+    rootfs_paths_by_location = {
+        resource.location: resource.path
+        for resource in layer.get_resources(with_dir=True)
+    }
+    resources_info = {
+        rootfs_paths_by_location[location]: resource_info
+        for location, resource_info in scancode.get_resources_info(
+            rootfs_paths_by_location.keys()
+        )
+    }
+    layer_cache.set_resources_info(layer.layer_id, resources_info)
+    return resources_info
+
+
+def yield_cached_layers_codebase_resources(project, image, layer_cache):
+    """
+    Yield CodebaseResource instances for the `image` layers, ready to be inserted
+    in the database using ``bulk_create()``, with their info data imported from
+    the `layer_cache`.
+    """
     for layer_index, layer in enumerate(image.layers, start=1):
         layer_tag = get_layer_tag(image.image_id, layer.layer_id, layer_index)
 
+        if not layer_cache.is_cacheable(layer.layer_id):
+            layer_resources = (
+                (resource.location, {"rootfs_path": resource.path, "tag": layer_tag})
+                for resource in layer.get_resources(with_dir=True)
+            )
+            yield from pipes.yield_codebase_resources(project, layer_resources)
+            continue
+
+        resources_info = get_cached_layer_resources_info(layer, layer_cache)
+
         for resource in layer.get_resources(with_dir=True):
-            pipes.make_codebase_resource(
+            resource_info = resources_info.get(resource.path)
+            yield pipes.make_codebase_resource(
                 project=project,
                 location=resource.location,
+                save=False,
+                resource_info=dict(resource_info) if resource_info else None,
                 rootfs_path=resource.path,
                 tag=layer_tag,
             )
 
 
-def _create_system_package(project, purl, package, layer):
+def create_codebase_resources(project, image):
+    """
+    Create the CodebaseResource for an `image` in a `project`.
+    The resources are created in batches, skipping the already existing paths.
+    The layers files info are imported from the layer cache when enabled.
+    """
+    if layer_cache := get_layer_cache():
+        resources = yield_cached_layers_codebase_resources(project, image, layer_cache)
+    else:
+        resources = pipes.yield_codebase_resources(project, get_layers_resources(image))
+    pipes.bulk_create_codebase_resources(resources, ignore_conflicts=True)
+
+
+def _create_system_package(
+    project, purl, package, layer, resources_by_rootfs_path=None
+):
     """Create system package and related resources."""
     created_package = pipes.update_or_create_package(project, package.to_dict())
 
@@ -196,10 +579,12 @@ def _create_system_package(project, purl, package, layer):
         logger.info(f"  No installed_files for: {purl}")
         return
 
+    if resources_by_rootfs_path is None:
+        resources_by_rootfs_path = rootfs.get_resources_by_rootfs_path(project)
+
     missing_resources = created_package.missing_resources[:]
     modified_resources = created_package.modified_resources[:]
-
-    codebase_resources = project.codebaseresources.all()
+    installed_resources = []
 
     for install_file in installed_files:
         install_file_path = install_file.get_path(strip_root=True)
@@ -210,25 +595,25 @@ def _create_system_package(project, purl, package, layer):
         )
         logger.info(f"   installed file rootfs_path: {install_file_path}")
         logger.info(f"   layer rootfs_path: {layer_rootfs_path}")
-        resource_qs = codebase_resources.filter(
-            path__endswith=layer_rootfs_path,
-            rootfs_path=install_file_path,
-        )
-        found_resource = False
-        for resource in resource_qs:
-            found_resource = True
-            if created_package not in resource.discovered_packages.all():
-                resource.discovered_packages.add(created_package)
-                resource.update(status=flag.SYSTEM_PACKAGE)
-                logger.info(f"      added as system-package to: {purl}")
-
+        layer_resources = [
+            resource
+            for resource in resources_by_rootfs_path.get(install_file_path, [])
+            if resource.path.endswith(layer_rootfs_path)
+        ]
+
+        if not layer_resources:
+            if install_file_path not in missing_resources:
+                missing_resources.append(install_file_path)
+                logger.info(f"      installed file is missing: {install_file_path}")
+            continue
+
+        for resource in layer_resources:
+            installed_resources.append(resource)
             if rootfs.has_hash_diff(install_file, resource):
                 if install_file.path not in modified_resources:
                     modified_resources.append(install_file.path)
 
-        if not found_resource and install_file_path not in missing_resources:
-            missing_resources.append(install_file_path)
-            logger.info(f"      installed file is missing: {install_file_path}")
+    rootfs.add_system_package_resources(project, created_package, installed_resources)
 
     created_package.update(
         missing_resources=missing_resources,
@@ -252,10 +637,11 @@ def scan_image_for_system_packages(project, image):
     if distro_id not in rootfs.SUPPORTED_DISTROS:
         raise rootfs.DistroNotSupported(f'Distro "{distro_id}" is not supported.')
 
+    resources_by_rootfs_path = rootfs.get_resources_by_rootfs_path(project)
     installed_packages = image.get_installed_packages(rootfs.package_getter)
     for index, (purl, package, layer) in enumerate(installed_packages):
         logger.info(f"Creating package #{index}: {purl}")
-        _create_system_package(project, purl, package, layer)
+        _create_system_package(project, purl, package, layer, resources_by_rootfs_path)
 
 
 def flag_whiteout_codebase_resources(project):
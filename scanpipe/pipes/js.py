@@ -31,7 +31,9 @@ from django.core.exceptions import ObjectDoesNotExist
 from scanpipe import pipes
 from scanpipe.models import CodebaseResource
 from scanpipe.pipes import flag
-from scanpipe.pipes import get_text_str_diff_ratio
+from scanpipe.pipes import get_fingerprint_diff_ratio
+from scanpipe.pipes import get_location_lines_fingerprint
+from scanpipe.pipes import get_text_lines_fingerprint
 from scanpipe.pipes import pathmap
 
 # `PROSPECTIVE_JAVASCRIPT_MAP` maps transformed JS file to a dict
@@ -150,7 +152,7 @@ def get_matches_by_ratio(
     sources = get_map_sources(to_map)
     sources_content = get_map_sources_content(to_map)
 
-    matches = []
+    prospects = []
     for source, content in zip(sources, sources_content):
         prospect = pathmap.find_paths(source, from_resources_index)
         if not prospect:
@@ -162,11 +164,28 @@ def get_matches_by_ratio(
         if too_many_prospects:
             continue
 
+        prospects.append((content, prospect.resource_ids))
+
+    if not prospects:
+        return []
+
+    # Fetch all the prospect resources at once instead of one query per prospect.
+    prospect_ids = {
+        resource_id for _, resource_ids in prospects for resource_id in resource_ids
+    }
+    from_resources_by_id = from_resources.in_bulk(prospect_ids)
+
+    matches = []
+    for content, resource_ids in prospects:
         match = None
         too_many_match = False
-        for resource_id in prospect.resource_ids:
-            from_source = from_resources.get(id=resource_id)
-            diff_ratio = get_text_str_diff_ratio(content, from_source.file_content)
+        content_fingerprint = get_text_lines_fingerprint(content or "")
+        for resource_id in resource_ids:
+            from_source = from_resources_by_id[resource_id]
+            diff_ratio = get_fingerprint_diff_ratio(
+                content_fingerprint,
+                get_location_lines_fingerprint(from_source.location),
+            )
             if not diff_ratio or diff_ratio < diff_ratio_threshold:
                 continue
 
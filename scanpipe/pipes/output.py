@@ -21,13 +21,23 @@
 # Visit https://github.com/nexB/scancode.io for support and download.
 
 import csv
+import functools
+import itertools
 import json
 import re
+import warnings
+from collections import defaultdict
+from collections.abc import Iterator
 from operator import attrgetter
 from pathlib import Path
 
 from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
 from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Exists
+from django.db.models import OuterRef
+from django.db.models.functions import Collate
 from django.forms.models import model_to_dict
 from django.template import Context
 from django.template import Template
@@ -37,6 +47,7 @@ import xlsxwriter
 from cyclonedx import output as cyclonedx_output
 from cyclonedx.model import bom as cyclonedx_bom
 from cyclonedx.model import component as cyclonedx_component
+from cyclonedx.output.serializer.json import CycloneDxJSONEncoder
 from license_expression import Licensing
 from license_expression import ordered_unique
 from licensedcode.cache import build_spdx_license_expression
@@ -47,6 +58,10 @@ from scancode_config import __version__ as scancode_toolkit_version
 
 from scancodeio import SCAN_NOTICE
 from scancodeio import __version__ as scancodeio_version
+from scanpipe.models import PURL_FIELDS
+from scanpipe.models import CodebaseRelation
+from scanpipe.models import CodebaseResource
+from scanpipe.models import DiscoveredPackage
 from scanpipe.pipes import docker
 from scanpipe.pipes import spdx
 
@@ -289,6 +304,119 @@ model_name_to_worksheet_name = {
 }
 
 
+def _get_package_url(*purl_data):
+    """Return the `package_url` built from the provided purl fields values."""
+    return DiscoveredPackage(**dict(zip(PURL_FIELDS, purl_data))).package_url
+
+
+def _get_relation_score(extra_data):
+    """Return the `CodebaseRelation.score` value computed from its ``extra_data``."""
+    return CodebaseRelation(extra_data=extra_data).score
+
+
+def _get_resources_for_packages(resource_ids):
+    """
+    Return the `CodebaseResource.for_packages` values of the ``resource_ids``
+    resources, as a list ordered as the ``resource_ids``.
+    """
+    through_model = CodebaseResource.discovered_packages.through
+    package_fields = ["package_uid", "uuid", *PURL_FIELDS]
+    relationships = (
+        through_model.objects.filter(codebaseresource_id__in=resource_ids)
+        .select_related("discoveredpackage")
+        .only(
+            "codebaseresource_id",
+            *[f"discoveredpackage__{field_name}" for field_name in package_fields],
+        )
+        .order_by("discoveredpackage__uuid")
+    )
+
+    for_packages = defaultdict(list)
+    for relationship in relationships:
+        package = relationship.discoveredpackage
+        for_packages[relationship.codebaseresource_id].append(
+            package.package_uid or str(package)
+        )
+
+    return [for_packages.get(resource_id, []) for resource_id in resource_ids]
+
+
+# The serializer fields that are not stored in a database column, mapped to the
+# (lookups, function) used to compute their values in the XLSX and Parquet
+# outputs. The function receives the values of the lookups as arguments,
+# no function means that the value of the single lookup is used as-is.
+serializer_computed_fields = {
+    "discoveredpackage": {
+        "purl": (PURL_FIELDS, _get_package_url),
+    },
+    "discovereddependency": {
+        "purl": (PURL_FIELDS, _get_package_url),
+        "for_package_uid": (["for_package__package_uid"], None),
+        "datafile_path": (["datafile_resource__path"], None),
+        "package_type": (["type"], None),
+    },
+    "codebaserelation": {
+        "from_resource": (["from_resource__path"], None),
+        "to_resource": (["to_resource__path"], None),
+        "status": (["to_resource__status"], None),
+        "score": (["extra_data"], _get_relation_score),
+    },
+}
+
+# The serializer fields computed for a whole chunk of entries at once, mapped to
+# a function receiving the list of entries ids and returning the list of values.
+serializer_chunk_computed_fields = {
+    "codebaseresource": {
+        "for_packages": _get_resources_for_packages,
+    },
+}
+
+
+def get_queryset_values(queryset, fields, chunk_size=2000):
+    """
+    Yield the list of values of the ``fields`` for each entry of the ``queryset``.
+    The values are fetched with ``values_list()`` by chunks of ``chunk_size``
+    entries, rather than loading each entry as a model instance.
+    See ``serializer_computed_fields`` and ``serializer_chunk_computed_fields``
+    for the fields that are not database columns.
+    """
+    model_name = queryset.model._meta.model_name
+    computed_fields = serializer_computed_fields.get(model_name, {})
+    chunk_computed_fields = serializer_chunk_computed_fields.get(model_name, {})
+
+    lookups = []
+    getters = []
+    chunk_getters = []
+    for index, field in enumerate(fields):
+        if field in chunk_computed_fields:
+            # The entry id is stored in place of the value until the chunk is full
+            chunk_getters.append((index, chunk_computed_fields[field]))
+            field_lookups, function = ["pk"], None
+        else:
+            field_lookups, function = computed_fields.get(field, ([field], None))
+        getters.append((len(lookups), len(lookups) + len(field_lookups), function))
+        lookups.extend(field_lookups)
+
+    queryset = queryset.prefetch_related(None)
+    rows = queryset.values_list(*lookups).iterator(chunk_size=chunk_size)
+
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        chunk_values = [
+            [
+                function(*row[start:end]) if function else row[start]
+                for start, end, function in getters
+            ]
+            for row in chunk
+        ]
+
+        for index, get_values in chunk_getters:
+            ids = [values[index] for values in chunk_values]
+            for values, value in zip(chunk_values, get_values(ids)):
+                values[index] = value
+
+        yield from chunk_values
+
+
 def queryset_to_xlsx_worksheet(queryset, workbook, exclude_fields=()):
     """
     Add a new worksheet to the ``workbook`` ``xlsxwriter.Workbook`` using the
@@ -309,10 +437,10 @@ def queryset_to_xlsx_worksheet(queryset, workbook, exclude_fields=()):
     exclude_fields = exclude_fields or []
     fields = [field for field in fields if field not in exclude_fields]
 
-    return _add_xlsx_worksheet(
+    return _add_xlsx_worksheet_values(
         workbook=workbook,
         worksheet_name=worksheet_name,
-        rows=queryset,
+        rows_values=get_queryset_values(queryset, fields),
         fields=fields,
     )
 
@@ -325,6 +453,18 @@ def _add_xlsx_worksheet(workbook, worksheet_name, rows, fields):
     Add a "xlsx_errors" column with conversion error messages if any.
     Return a number of conversion errors.
     """
+    rows_values = ([getattr(record, field) for field in fields] for record in rows)
+    return _add_xlsx_worksheet_values(workbook, worksheet_name, rows_values, fields)
+
+
+def _add_xlsx_worksheet_values(workbook, worksheet_name, rows_values, fields):
+    """
+    Add a new ``worksheet_name`` worksheet to the ``workbook``
+    ``xlsxwriter.Workbook``. Write the iterable of ``rows_values`` lists of values,
+    ordered as the ``fields`` sequence of field names.
+    Add a "xlsx_errors" column with conversion error messages if any.
+    Return a number of conversion errors.
+    """
     worksheet = workbook.add_worksheet(worksheet_name)
     worksheet.set_default_row(height=14)
 
@@ -333,16 +473,15 @@ def _add_xlsx_worksheet(workbook, worksheet_name, rows, fields):
 
     errors_count = 0
     errors_col_index = len(fields) - 1  # rows and cols are zero-indexed
+    adapters = [_get_xlsx_value_adapter(field) for field in fields]
 
-    for row_index, record in enumerate(rows, start=1):
+    for row_index, values in enumerate(rows_values, start=1):
         row_errors = []
-        for col_index, field in enumerate(fields):
-            value = getattr(record, field)
-
+        for col_index, (value, adapter) in enumerate(zip(values, adapters)):
             if not value:
                 continue
 
-            value, error = _adapt_value_for_xlsx(field, value)
+            value, error = adapter(value)
 
             if error:
                 row_errors.append(error)
@@ -433,6 +572,27 @@ def _adapt_value_for_xlsx(fieldname, value, maximum_length=32767, _adapt=True):
     return value, error
 
 
+def _get_xlsx_value_adapter(fieldname, maximum_length=32767):
+    """
+    Return a function adapting a value of the ``fieldname`` field for use in an
+    XLSX cell, with the same results as ``_adapt_value_for_xlsx``.
+    The plain string values of the fields that do not require a specific
+    adaptation only get their line endings normalized.
+    """
+    adapt_value = functools.partial(
+        _adapt_value_for_xlsx, fieldname, maximum_length=maximum_length
+    )
+    if fieldname == "description" or fieldname in mappings_key_by_fieldname:
+        return adapt_value
+
+    def adapt_string_value(value):
+        if type(value) is not str or len(value) > maximum_length:
+            return adapt_value(value)
+        return value.replace("\r\n", "\n"), None
+
+    return adapt_string_value
+
+
 def to_xlsx(project):
     """
     Generate output for the provided ``project`` in XLSX format.
@@ -463,7 +623,8 @@ def to_xlsx(project):
         "projectmessage",
     ]
 
-    with xlsxwriter.Workbook(output_file) as workbook:
+    # The constant memory mode flushes each row to the disk once written.
+    with xlsxwriter.Workbook(output_file, {"constant_memory": True}) as workbook:
         for model_name in model_names:
             queryset = get_queryset(project, model_name)
             queryset_to_xlsx_worksheet(queryset, workbook, exclude_fields)
@@ -474,6 +635,206 @@ def to_xlsx(project):
     return output_file
 
 
+def get_parquet_json_fields_types():
+    """
+    Return a mapping of the JSON fields names to the Arrow nested types used to
+    store their values in the Parquet output.
+    The keys of the JSON objects that are not declared in those types are not
+    included, and the JSON fields not listed are stored as JSON strings.
+    """
+    import pyarrow
+
+    string = pyarrow.string()
+    integer = pyarrow.int64()
+    number = pyarrow.float64()
+
+    def list_of_struct(**fields):
+        return pyarrow.list_(pyarrow.struct(list(fields.items())))
+
+    license_match_fields = {
+        "license_expression": string,
+        "license_expression_spdx": string,
+        "from_file": string,
+        "start_line": integer,
+        "end_line": integer,
+        "matcher": string,
+        "score": number,
+        "matched_length": integer,
+        "match_coverage": number,
+        "rule_relevance": number,
+        "rule_identifier": string,
+        "rule_url": string,
+        "matched_text": string,
+    }
+    license_detections = list_of_struct(
+        license_expression=string,
+        license_expression_spdx=string,
+        identifier=string,
+        matches=list_of_struct(**license_match_fields),
+    )
+
+    json_fields_types = {
+        "license_detections": license_detections,
+        "other_license_detections": license_detections,
+        "license_clues": list_of_struct(**license_match_fields),
+        "parties": list_of_struct(
+            type=string, role=string, name=string, email=string, url=string
+        ),
+        "file_references": list_of_struct(
+            path=string, size=integer, sha1=string, md5=string, sha256=string
+        ),
+        "keywords": pyarrow.list_(string),
+        "source_packages": pyarrow.list_(string),
+        "missing_resources": pyarrow.list_(string),
+        "modified_resources": pyarrow.list_(string),
+        "for_packages": pyarrow.list_(string),
+    }
+
+    # Same structure as the detected "copyrights", "holders", ... values:
+    # [{"copyright": "Copyright (c) nexB", "start_line": 5, "end_line": 5}]
+    for fieldname, mapping_key in mappings_key_by_fieldname.items():
+        json_fields_types[fieldname] = list_of_struct(
+            **{mapping_key: string, "start_line": integer, "end_line": integer}
+        )
+
+    return json_fields_types
+
+
+def get_parquet_schema(model_class, fields, json_string_fields=()):
+    """
+    Return the Arrow schema and the list of values converters for the ``fields``
+    of the ``model_class``.
+    The converter of a field is None when its values are stored as-is.
+    The fields listed in ``json_string_fields`` are stored as JSON strings in
+    place of their nested type.
+    """
+    import pyarrow
+
+    json_fields_types = get_parquet_json_fields_types()
+    types_by_internal_type = {
+        "BooleanField": pyarrow.bool_(),
+        "IntegerField": pyarrow.int64(),
+        "BigIntegerField": pyarrow.int64(),
+        "PositiveIntegerField": pyarrow.int64(),
+        "FloatField": pyarrow.float64(),
+        "DateField": pyarrow.date32(),
+        "DateTimeField": pyarrow.timestamp("us", tz="UTC"),
+    }
+
+    schema_fields = []
+    converters = []
+    for field_name in fields:
+        converter = None
+
+        if field_name in json_string_fields:
+            field_type = pyarrow.string()
+            converter = json.dumps
+        elif field_name in json_fields_types:
+            field_type = json_fields_types[field_name]
+        else:
+            try:
+                internal_type = model_class._meta.get_field(
+                    field_name
+                ).get_internal_type()
+            except FieldDoesNotExist:
+                internal_type = None
+
+            field_type = types_by_internal_type.get(internal_type, pyarrow.string())
+            if internal_type == "JSONField":
+                converter = json.dumps
+            elif internal_type == "UUIDField":
+                converter = str
+
+        schema_fields.append(pyarrow.field(field_name, field_type))
+        converters.append(converter)
+
+    return pyarrow.schema(schema_fields), converters
+
+
+def queryset_to_parquet_file(queryset, fields, output_file, chunk_size=10000):
+    """
+    Write the ``fields`` values of the ``queryset`` in the ``output_file`` using
+    the Parquet format.
+    The values are fetched and written by chunks of ``chunk_size`` entries as
+    Parquet row groups, keeping the memory usage bounded.
+
+    When the values of a JSON field do not match its declared nested type, the
+    file is written again with this field stored as JSON strings.
+    """
+    json_string_fields = []
+    while invalid_field := _write_parquet_file(
+        queryset, fields, output_file, chunk_size, json_string_fields
+    ):
+        json_string_fields.append(invalid_field)
+
+
+def _write_parquet_file(queryset, fields, output_file, chunk_size, json_string_fields):
+    """
+    Write the ``queryset`` Parquet file, see ``queryset_to_parquet_file``.
+    Return the name of the first field with values that cannot be converted to
+    its column type, or None when the file was entirely written.
+    """
+    import pyarrow
+    from pyarrow import parquet
+
+    schema, converters = get_parquet_schema(queryset.model, fields, json_string_fields)
+    rows_values = get_queryset_values(queryset, fields, chunk_size=chunk_size)
+
+    with parquet.ParquetWriter(str(output_file), schema) as writer:
+        while chunk := list(itertools.islice(rows_values, chunk_size)):
+            columns = []
+            for values, converter, schema_field in zip(zip(*chunk), converters, schema):
+                if converter:
+                    values = [
+                        None if value is None else converter(value) for value in values
+                    ]
+                try:
+                    columns.append(pyarrow.array(values, type=schema_field.type))
+                except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+                    return schema_field.name
+            writer.write_batch(pyarrow.record_batch(columns, schema=schema))
+
+
+def to_parquet(project):
+    """
+    Generate output for the provided ``project`` in Parquet format.
+    One file is created per object type, with the JSON list fields such as the
+    "license_detections" or the "copyrights" stored as nested columns.
+    The output files are created in the ``project`` "output/" directory.
+    Return a list of paths of the generated output files.
+    Requires the `pyarrow` library.
+    """
+    from scanpipe.api.serializers import get_serializer_fields
+
+    try:
+        import pyarrow  # NOQA: F401
+    except ModuleNotFoundError:
+        print(
+            "The `pyarrow` library is required to generate the Parquet output.\n"
+            "Install with: `pip install scancodeio[parquet]`"
+        )
+        raise
+
+    model_names = [
+        "discoveredpackage",
+        "discovereddependency",
+        "codebaseresource",
+        "codebaserelation",
+        "projectmessage",
+    ]
+
+    output_files = []
+
+    for model_name in model_names:
+        queryset = get_queryset(project, model_name)
+        fields = get_serializer_fields(queryset.model)
+        output_filename = project.get_output_file_path(f"{model_name}", "parquet")
+        queryset_to_parquet_file(queryset, fields, output_filename)
+        output_files.append(output_filename)
+
+    return output_files
+
+
 def _get_spdx_extracted_licenses(license_expressions):
     """
     Generate and return the SPDX `extracted_licenses` from provided
@@ -524,84 +885,208 @@ def _get_spdx_extracted_licenses(license_expressions):
     return extracted_licenses
 
 
-def to_spdx(project, include_files=False):
+def write_json_stream(output_file, data, indent=2, omit_empty=()):
+    """
+    Write the ``data`` mapping as JSON in the ``output_file``, using the same
+    formatting as ``json.dump(data, output_file, indent=indent)``.
+
+    The ``data`` values can be iterators, at any nesting level: their items are
+    serialized and written one by one, so the whole content never has to be
+    loaded in memory.
+    The keys listed in ``omit_empty`` are not written when their iterator does
+    not yield any items.
+    """
+    for chunk in _iter_json_chunks(data, indent, level=0, omit_empty=omit_empty):
+        output_file.write(chunk)
+
+
+def _iter_json_items(data, omit_empty):
+    """
+    Yield the ``(key, value)`` items of the ``data`` mapping, skipping the keys
+    listed in ``omit_empty`` when their iterator value is empty.
+    """
+    empty = object()
+
+    for key, value in data.items():
+        if key in omit_empty and isinstance(value, Iterator):
+            first_item = next(value, empty)
+            if first_item is empty:
+                continue
+            value = itertools.chain([first_item], value)
+        yield key, value
+
+
+def _iter_json_chunks(value, indent, level, omit_empty):
+    """
+    Yield the JSON serialization of the ``value`` as string chunks.
+    Iterators are serialized as arrays, and the mappings that contain iterators
+    are serialized key by key.
+    """
+    is_mapping = isinstance(value, dict)
+    if is_mapping and any(isinstance(item, Iterator) for item in value.values()):
+        items = _iter_json_items(value, omit_empty)
+        opening, closing = "{", "}"
+    elif isinstance(value, Iterator):
+        items = value
+        opening, closing = "[", "]"
+    else:
+        dumped = json.dumps(value, indent=indent)
+        if indent:
+            dumped = dumped.replace("\n", "\n" + " " * indent * level)
+        yield dumped
+        return
+
+    if indent is None:
+        item_prefix, item_separator, closing_prefix = "", ", ", ""
+    else:
+        item_prefix = "\n" + " " * indent * (level + 1)
+        item_separator = ","
+        closing_prefix = "\n" + " " * indent * level
+
+    yield opening
+    separator = item_prefix
+    for item in items:
+        yield separator
+        if is_mapping:
+            key, item = item
+            yield f"{json.dumps(key)}: "
+        yield from _iter_json_chunks(item, indent, level + 1, omit_empty)
+        separator = item_separator + item_prefix
+
+    if separator != item_prefix:
+        yield closing_prefix
+    yield closing
+
+
+def _get_spdx_packages(packages, dependencies, license_expressions, chunk_size):
+    """
+    Yield the SPDX data of the ``packages`` and ``dependencies`` querysets,
+    collecting the packages declared license expressions in the
+    ``license_expressions`` set.
+    """
+    for package in packages.iterator(chunk_size=chunk_size):
+        if license_expression := package.declared_license_expression:
+            license_expressions.add(license_expression)
+        yield package.as_spdx().as_dict()
+
+    for dependency in dependencies.iterator(chunk_size=chunk_size):
+        yield dependency.as_spdx().as_dict()
+
+
+def _get_spdx_ids(packages, dependencies, chunk_size):
+    """Yield the SPDX ids of the ``packages`` and ``dependencies`` querysets."""
+    for package in packages.only("project", "uuid").iterator(chunk_size=chunk_size):
+        yield package.spdx_id
+
+    dependencies = dependencies.only("project", "dependency_uid")
+    for dependency in dependencies.iterator(chunk_size=chunk_size):
+        yield dependency.spdx_id
+
+
+def _get_spdx_files(resources, chunk_size):
+    """Yield the SPDX data of the ``resources`` queryset."""
+    for resource in resources.iterator(chunk_size=chunk_size):
+        yield resource.as_spdx().as_dict()
+
+
+def _get_spdx_extracted_licenses_data(license_expressions):
+    """
+    Yield the SPDX extracted licenses data of the ``license_expressions``, collected
+    while the packages are written.
+    """
+    for license_info in _get_spdx_extracted_licenses(license_expressions):
+        yield license_info.as_dict()
+
+
+def _get_spdx_relationships(dependencies, chunk_size):
+    """Yield the SPDX relationships data of the ``dependencies`` queryset."""
+    dependencies = (
+        dependencies.filter(for_package__isnull=False)
+        .select_related("for_package")
+        .only("project", "dependency_uid", "for_package__uuid")
+    )
+    for dependency in dependencies.iterator(chunk_size=chunk_size):
+        relationship = spdx.Relationship(
+            spdx_id=dependency.spdx_id,
+            related_spdx_id=dependency.for_package.spdx_id,
+            relationship="DEPENDENCY_OF",
+        )
+        yield relationship.as_dict()
+
+
+def to_spdx(project, include_files=False, chunk_size=2000):
     """
     Generate output for the provided ``project`` in SPDX document format.
     The output file is created in the ``project`` "output/" directory.
     Return the path of the generated output file.
+
+    The packages, files, and relationships are fetched from the database by
+    chunks of ``chunk_size`` and written one by one, so memory usage does not
+    depend on the ``project`` size.
     """
     output_file = project.get_output_file_path("results", "spdx.json")
 
     discoveredpackage_qs = get_queryset(project, "discoveredpackage")
-    discovereddependency_qs = get_queryset(project, "discovereddependency")
-
-    packages_as_spdx = []
-    license_expressions = []
-    relationships = []
-
-    for package in discoveredpackage_qs:
-        packages_as_spdx.append(package.as_spdx())
-        if license_expression := package.declared_license_expression:
-            license_expressions.append(license_expression)
-
-    for dependency in discovereddependency_qs:
-        packages_as_spdx.append(dependency.as_spdx())
-        if dependency.for_package:
-            relationships.append(
-                spdx.Relationship(
-                    spdx_id=dependency.spdx_id,
-                    related_spdx_id=dependency.for_package.spdx_id,
-                    relationship="DEPENDENCY_OF",
-                )
-            )
-
-    files_as_spdx = []
+    # The prefetch for the serializer is not needed, the for_package relation is
+    # selected in the relationships query.
+    discovereddependency_qs = get_queryset(
+        project, "discovereddependency"
+    ).prefetch_related(None)
+    license_expressions = set()
+
+    files = iter([])
     if include_files:
-        files_as_spdx = [
-            resource.as_spdx()
-            for resource in get_queryset(project, "codebaseresource").files()
-        ]
+        resources = get_queryset(project, "codebaseresource").prefetch_related(None)
+        files = _get_spdx_files(resources.files(), chunk_size)
 
     document = spdx.Document(
         name=f"scancodeio_{project.name}",
         namespace=f"https://scancode.io/spdxdocs/{project.uuid}",
         creation_info=spdx.CreationInfo(tool=f"ScanCode.io-{scancodeio_version}"),
-        packages=packages_as_spdx,
-        files=files_as_spdx,
-        extracted_licenses=_get_spdx_extracted_licenses(license_expressions),
-        relationships=relationships,
+        packages=[],
         comment=SCAN_NOTICE,
     )
+    # The lists of the document data are replaced by iterators, keeping the keys
+    # ordering. The extracted licenses are computed once all packages are written.
+    document_data = document.as_dict()
+    comment = document_data.pop("comment")
+    document_data.update(
+        {
+            "packages": _get_spdx_packages(
+                discoveredpackage_qs,
+                discovereddependency_qs,
+                license_expressions,
+                chunk_size,
+            ),
+            "documentDescribes": _get_spdx_ids(
+                discoveredpackage_qs, discovereddependency_qs, chunk_size
+            ),
+            "files": files,
+            "hasExtractedLicensingInfos": _get_spdx_extracted_licenses_data(
+                license_expressions
+            ),
+            "relationships": _get_spdx_relationships(
+                discovereddependency_qs, chunk_size
+            ),
+            "comment": comment,
+        }
+    )
+    omit_empty = ["files", "hasExtractedLicensingInfos", "relationships"]
 
     with output_file.open("w") as file:
-        file.write(document.as_json())
+        write_json_stream(file, document_data, omit_empty=omit_empty)
 
     return output_file
 
 
-def get_cyclonedx_bom(project):
-    """
-    Return a CycloneDX `Bom` object filled with provided `project` data.
-    See https://cyclonedx.org/use-cases/#dependency-graph
-    """
-    components = [
-        *get_queryset(project, "discoveredpackage"),
-    ]
-
-    cyclonedx_components = [component.as_cyclonedx() for component in components]
-
-    bom = cyclonedx_bom.Bom(components=cyclonedx_components)
-
+def get_cyclonedx_bom_metadata(project):
+    """Return a CycloneDX `BomMetaData` object for the provided `project`."""
     project_as_cyclonedx = cyclonedx_component.Component(
         name=project.name,
         bom_ref=str(project.uuid),
     )
 
-    project_as_cyclonedx.dependencies.update(
-        [component.bom_ref for component in cyclonedx_components]
-    )
-
-    bom.metadata = cyclonedx_bom.BomMetaData(
+    return cyclonedx_bom.BomMetaData(
         component=project_as_cyclonedx,
         tools=[
             cyclonedx_bom.Tool(
@@ -617,27 +1102,159 @@ def get_cyclonedx_bom(project):
         ],
     )
 
+
+def get_cyclonedx_bom(project):
+    """
+    Return a CycloneDX `Bom` object filled with provided `project` data.
+    See https://cyclonedx.org/use-cases/#dependency-graph
+    """
+    components = [
+        *get_queryset(project, "discoveredpackage"),
+    ]
+
+    cyclonedx_components = [component.as_cyclonedx() for component in components]
+
+    bom = cyclonedx_bom.Bom(components=cyclonedx_components)
+    bom.metadata = get_cyclonedx_bom_metadata(project)
+
+    bom.metadata.component.dependencies.update(
+        [component.bom_ref for component in cyclonedx_components]
+    )
+
     return bom
 
 
-def to_cyclonedx(project):
+def get_cyclonedx_packages_queryset(project):
+    """
+    Return the ``project`` packages ordered as the components of a CycloneDX
+    `Bom`, where those are sorted by name and version.
+    On PostgreSQL, the "C" collation matches the Python strings ordering, as the
+    SQLite default "BINARY" collation does.
+    """
+    name, version = "name", "version"
+    if connection.vendor == "postgresql":
+        name, version = Collate(name, "C"), Collate(version, "C")
+
+    return project.discoveredpackages.order_by(name, version, *PURL_FIELDS)
+
+
+def _iter_cyclonedx_unique_packages(packages, chunk_size):
+    """
+    Yield the ``packages`` queryset entries, skipping the ones sharing the
+    `bom_ref` of the previous entry, as those are a single component in the BOM.
+    """
+    previous_bom_ref = None
+    for package in packages.iterator(chunk_size=chunk_size):
+        bom_ref = package.cyclonedx_bom_ref
+        if bom_ref != previous_bom_ref:
+            previous_bom_ref = bom_ref
+            yield package
+
+
+def get_cyclonedx_component_data(component, outputter):
+    """
+    Return the JSON data of the CycloneDX ``component``, as serialized in a BOM
+    by the JSON ``outputter``.
+    """
+    component_data = json.loads(json.dumps(component, cls=CycloneDxJSONEncoder))
+    # Private method of the cyclonedx-python-lib 3.1.5 JSON outputter, applied on
+    # each component of the BOM. To be reviewed when upgrading the library.
+    return outputter._specialise_component_data(component_data)
+
+
+def _get_cyclonedx_components(packages, outputter, chunk_size):
+    """Yield the CycloneDX JSON data of the ``packages`` queryset."""
+    for package in _iter_cyclonedx_unique_packages(packages, chunk_size):
+        yield get_cyclonedx_component_data(package.as_cyclonedx(), outputter)
+
+
+def _get_cyclonedx_bom_refs(packages, chunk_size):
+    """Yield the CycloneDX `bom_ref` of the ``packages`` queryset."""
+    packages = packages.only("project", "uuid", *PURL_FIELDS)
+    for package in _iter_cyclonedx_unique_packages(packages, chunk_size):
+        yield package.cyclonedx_bom_ref
+
+
+def get_cyclonedx_depends_on(project, packages):
+    """
+    Return the `bom_ref` of the project components that each of the ``packages``
+    depends on, as a mapping of package id to sorted list of `bom_ref`.
+    Only the dependencies resolved to a package of the ``project`` are included.
+    """
+    matching_packages = project.discoveredpackages.filter(
+        **{field_name: OuterRef(field_name) for field_name in PURL_FIELDS}
+    )
+    dependencies = (
+        project.discovereddependencies.filter(for_package__in=packages)
+        .filter(Exists(matching_packages))
+        .only("project", "for_package", *PURL_FIELDS)
+        .order_by()
+    )
+
+    depends_on = defaultdict(set)
+    for dependency in dependencies:
+        depends_on[dependency.for_package_id].add(dependency.package_url)
+
+    return {package_id: sorted(refs) for package_id, refs in depends_on.items()}
+
+
+def _get_cyclonedx_dependencies(project, packages, chunk_size):
+    """
+    Yield the CycloneDX dependencies entries of the ``packages`` queryset.
+    The `dependsOn` are collected from the `DiscoveredDependency` for each chunk
+    of packages.
+    """
+    packages = packages.only("project", "uuid", *PURL_FIELDS)
+    unique_packages = _iter_cyclonedx_unique_packages(packages, chunk_size)
+
+    while chunk := list(itertools.islice(unique_packages, chunk_size)):
+        depends_on = get_cyclonedx_depends_on(project, chunk)
+        for package in chunk:
+            yield {
+                "ref": package.cyclonedx_bom_ref,
+                "dependsOn": depends_on.get(package.id, []),
+            }
+
+
+def to_cyclonedx(project, chunk_size=2000):
     """
     Generate output for the provided ``project`` in CycloneDX BOM format.
     The output file is created in the ``project`` "output/" directory.
     Return the path of the generated output file.
+
+    The components and their dependencies are streamed from the database in
+    chunks of ``chunk_size`` entries, rather than building the full `Bom` object.
     """
     output_file = project.get_output_file_path("results", "cdx.json")
 
-    cyclonedx_bom = get_cyclonedx_bom(project)
-
+    # The BOM is generated without components to get the document headers and
+    # metadata as serialized by the CycloneDX library.
+    bom = cyclonedx_bom.Bom()
+    bom.metadata = get_cyclonedx_bom_metadata(project)
     outputter = cyclonedx_output.get_instance(
-        bom=cyclonedx_bom,
+        bom=bom,
         output_format=cyclonedx_output.OutputFormat.JSON,
     )
+    with warnings.catch_warnings():
+        # Warning about the project component not having dependencies.
+        warnings.simplefilter("ignore", UserWarning)
+        bom_data = json.loads(outputter.output_as_string())
+
+    packages = get_cyclonedx_packages_queryset(project)
+    project_dependencies = {
+        "ref": str(bom.metadata.component.bom_ref),
+        "dependsOn": _get_cyclonedx_bom_refs(packages, chunk_size),
+    }
+
+    bom_data.pop("dependencies", None)
+    bom_data["components"] = _get_cyclonedx_components(packages, outputter, chunk_size)
+    bom_data["dependencies"] = itertools.chain(
+        [project_dependencies],
+        _get_cyclonedx_dependencies(project, packages, chunk_size),
+    )
 
-    bom_json = outputter.output_as_string()
     with output_file.open("w") as file:
-        file.write(bom_json)
+        write_json_stream(file, bom_data, indent=None, omit_empty=["components"])
 
     return output_file
 
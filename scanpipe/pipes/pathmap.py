@@ -20,6 +20,11 @@
 # ScanCode.io is a free software code scanning tool from nexB Inc. and others.
 # Visit https://github.com/nexB/scancode.io for support and download.
 
+import pickle
+import struct
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
 from typing import NamedTuple
 
 import ahocorasick
@@ -78,6 +83,9 @@ def find_paths(path, index):
     Return None if there is not matching paths found.
     """
     segments = get_reversed_path_segments(path)
+    if isinstance(index, SuffixIndex):
+        return index.find_segments(segments)
+
     reversed_path = convert_segments_to_path(segments)
 
     # We use iter_long() to get the longest matches
@@ -92,7 +100,7 @@ def find_paths(path, index):
     return Match(matched_length, resource_ids)
 
 
-def build_index(resource_id_and_paths, with_subpaths=True):
+def build_index(resource_id_and_paths, with_subpaths=True, compact=False):
     """
     Return an index (an index) built from a ``resource_id_and_paths``
     iterable of tuples of (resource_id int, resource_path string).
@@ -100,6 +108,8 @@ def build_index(resource_id_and_paths, with_subpaths=True):
     If `with_subpaths`` is True, index all suffixes of the paths, other index
     and match only each complete path.
 
+    If ``compact`` is True, return a SuffixIndex instead of an automaton.
+
     For example, for the path "samples/JGroups/src/RouterStub.java", the
     suffixes are:
 
@@ -108,6 +118,9 @@ def build_index(resource_id_and_paths, with_subpaths=True):
                         src/RouterStub.java
                             RouterStub.java
     """
+    if compact:
+        return SuffixIndex.from_paths(resource_id_and_paths, with_subpaths)
+
     # create a new empty automaton.
     index = ahocorasick.Automaton(ahocorasick.STORE_ANY, ahocorasick.KEY_STRING)
 
@@ -123,6 +136,32 @@ def build_index(resource_id_and_paths, with_subpaths=True):
     return index
 
 
+def save_index(index, location):
+    """
+    Save the ``index`` automaton or SuffixIndex to the ``location`` file.
+    The file is written to a temporary location first, and then moved in place, so a
+    partially written index is never loaded.
+    """
+    temp_location = location.with_name(f"{location.name}.tmp")
+    if isinstance(index, SuffixIndex):
+        with open(temp_location, "wb") as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    else:
+        index.save(str(temp_location), pickle.dumps)
+    temp_location.replace(location)
+
+
+def load_index(location, compact=False):
+    """
+    Return an index automaton loaded from the ``location`` file.
+    If ``compact`` is True, return a SuffixIndex instead.
+    """
+    if compact:
+        with open(location, "rb") as f:
+            return pickle.load(f)
+    return ahocorasick.load(str(location), pickle.loads)
+
+
 def add_path(resource_id, segments, segments_count, index):
     """
     Add the ``resource_id`` path represented by its list of reversed path
@@ -187,3 +226,101 @@ def convert_segments_to_path(segments):
     >>> assert convert_segments_to_path(["c.js", "b", "a"]) == "/c.js/b/a/"
     """
     return "/" + "/".join(segments) + "/"
+
+
+# Segment ids are packed as big-endian unsigned 32 bits integers, so the bytes
+# ordering of packed paths is the same as the ordering of their segment ids.
+SEGMENT_ID_SIZE = 4
+MAX_PACKED_SEGMENT_ID = b"\xff" * SEGMENT_ID_SIZE
+
+
+def pack_segment_ids(segment_ids):
+    """Return a bytes string packing the ``segment_ids`` list of integers."""
+    return struct.pack(f">{len(segment_ids)}I", *segment_ids)
+
+
+class SuffixIndex:
+    """
+    A compact path suffixes index, usable in place of the automaton index.
+
+    Each path segment is interned to an integer id, and each path is stored once
+    as its reversed segment ids packed in a bytes string. The packed paths are
+    sorted so that all the paths sharing the same suffix are contiguous and are
+    found using a binary search. A path with k segments costs O(k) bytes instead
+    of the O(k²) characters of all its indexed suffixes.
+
+    Only the suffixes of a looked up path are matched, never a subpath in the
+    middle of it.
+    """
+
+    def __init__(self, with_subpaths=True):
+        self.with_subpaths = with_subpaths
+        # Mapping of {segment string: segment id}
+        self.segment_ids = {}
+        # Sorted list of packed reversed paths
+        self.packed_paths = []
+        # Insertion position of each path of ``packed_paths``
+        self.positions = array("I")
+        # Resource ids in insertion order
+        self.resource_ids = array("q")
+
+    @classmethod
+    def from_paths(cls, resource_id_and_paths, with_subpaths=True):
+        """
+        Return a SuffixIndex built from a ``resource_id_and_paths`` iterable of
+        tuples of (resource_id int, resource_path string).
+        """
+        index = cls(with_subpaths)
+        segment_ids = index.segment_ids
+
+        entries = []
+        for position, (resource_id, resource_path) in enumerate(resource_id_and_paths):
+            segments = get_reversed_path_segments(resource_path)
+            path_segment_ids = [
+                segment_ids.setdefault(segment, len(segment_ids))
+                for segment in segments
+            ]
+            entries.append((pack_segment_ids(path_segment_ids), position))
+            index.resource_ids.append(resource_id)
+
+        # Identical paths are kept in insertion order using the position.
+        entries.sort()
+        index.packed_paths = [packed_path for packed_path, _ in entries]
+        index.positions = array("I", (position for _, position in entries))
+        return index
+
+    def find_segments(self, segments):
+        """
+        Return a Match for the longest paths matched for a list of reversed path
+        ``segments``. Return None if there is not matching paths found.
+        """
+        packed_paths = self.packed_paths
+        low, high = 0, len(packed_paths)
+        prefix = b""
+        longest = None
+
+        for segments_count, segment in enumerate(segments, start=1):
+            segment_id = self.segment_ids.get(segment)
+            if segment_id is None:
+                break
+
+            prefix += pack_segment_ids([segment_id])
+            low = bisect_left(packed_paths, prefix, low, high)
+            high = bisect_left(packed_paths, prefix + MAX_PACKED_SEGMENT_ID, low, high)
+            if low == high:
+                break
+
+            if self.with_subpaths:
+                longest = segments_count, low, high
+            # The complete paths equal to the prefix are sorted first in the range
+            elif (complete_high := bisect_right(packed_paths, prefix, low, high)) > low:
+                longest = segments_count, low, complete_high
+
+        if not longest:
+            return
+
+        matched_length, low, high = longest
+        # Return the resource ids in insertion order, as for the automaton index
+        positions = sorted(self.positions[low:high])
+        resource_ids = list(map(self.resource_ids.__getitem__, positions))
+        return Match(matched_length, resource_ids)
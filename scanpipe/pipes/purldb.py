@@ -20,9 +20,12 @@
 # ScanCode.io is a free software code scanning tool from nexB Inc. and others.
 # Visit https://github.com/nexB/scancode.io for support and download.
 
+import hashlib
 import logging
+import threading
 
 from django.conf import settings
+from django.core.cache import caches
 
 import requests
 
@@ -51,6 +54,85 @@ if PURLDB_API_KEY:
 
 DEFAULT_TIMEOUT = 30
 
+# Maximum number of concurrent requests sent to the PurlDB API.
+DEFAULT_MAX_WORKERS = 8
+
+# Keep enough pooled connections for the batch and package data request threads.
+adapter = requests.adapters.HTTPAdapter(pool_maxsize=DEFAULT_MAX_WORKERS * 2)
+session.mount("http://", adapter)
+session.mount("https://", adapter)
+
+
+class ResponseCache:
+    """
+    Cache of the PurlDB API responses shared across all projects.
+
+    Entries are stored in the "purldb" Django cache, refer to the ``PURLDB_CACHE_*``
+    settings for the backend, expiration, and eviction options.
+    The lookups without matches are cached too, using the
+    ``PURLDB_CACHE_MISS_TIMEOUT`` shorter timeout. The failed requests are not
+    cached.
+    """
+
+    def __init__(self, cache_alias="purldb"):
+        self.cache_alias = cache_alias
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def enabled(self):
+        return settings.PURLDB_CACHE
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @staticmethod
+    def get_key(kind, *values):
+        """Return a cache key for the ``values`` of a ``kind`` of lookup."""
+        digest = hashlib.sha1(":".join(map(str, values)).encode()).hexdigest()
+        return f"{kind}:{digest}"
+
+    def get_many(self, keys):
+        """Return a mapping of the cached values for the ``keys``."""
+        cached = self.cache.get_many(keys)
+        with self.lock:
+            self.hits += len(cached)
+            self.misses += len(keys) - len(cached)
+        return cached
+
+    def set_many(self, values):
+        """
+        Cache the ``values`` mapping of {key: value}.
+        The empty values are cached using the misses timeout.
+        """
+        matches = {key: value for key, value in values.items() if value}
+        misses = {key: value for key, value in values.items() if not value}
+        if matches:
+            self.cache.set_many(matches)
+        if misses:
+            self.cache.set_many(misses, timeout=settings.PURLDB_CACHE_MISS_TIMEOUT)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if lookups:
+            return round(self.hits / lookups * 100, 1)
+        return 0
+
+    def get_stats_message(self):
+        return (
+            f"{label} cache: {self.hits:,d} hits, {self.misses:,d} misses "
+            f"({self.hit_rate}% hit rate)"
+        )
+
+
+response_cache = ResponseCache()
+
 
 def is_configured():
     """Return True if the required PurlDB settings have been set."""
@@ -75,7 +157,10 @@ def is_available():
 
 
 def request_get(url, payload=None, timeout=DEFAULT_TIMEOUT):
-    """Wrap the HTTP request calls on the API."""
+    """
+    Wrap the HTTP request calls on the API.
+    The responses are cached when the ``PURLDB_CACHE`` setting is enabled.
+    """
     if not url:
         return
 
@@ -85,6 +170,20 @@ def request_get(url, payload=None, timeout=DEFAULT_TIMEOUT):
     if payload:
         params.update(payload)
 
+    if not response_cache.enabled:
+        return _request_get(url, params, timeout)
+
+    key = response_cache.get_key("get", url, sorted(params.items()))
+    if cached := response_cache.get_many([key]):
+        return cached[key]
+
+    response = _request_get(url, params, timeout)
+    if response is not None:
+        response_cache.set_many({key: response})
+    return response
+
+
+def _request_get(url, params, timeout=DEFAULT_TIMEOUT):
     logger.debug(f"{label}: url={url} params={params}")
     try:
         response = session.get(url, params=params, timeout=timeout)
@@ -117,6 +216,60 @@ def collect_response_results(response, data, timeout=DEFAULT_TIMEOUT):
     return results
 
 
+def filter_by_checksums(url, data, timeout=DEFAULT_TIMEOUT):
+    """
+    Return all the results of a filter_by_checksums API ``url`` request, or None
+    if the request failed.
+    """
+    response = request_post(url=url, data=data, timeout=timeout)
+    if response is not None:
+        return collect_response_results(response, data=data, timeout=timeout)
+
+
+def match_checksums(url, data, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the results of a filter_by_checksums API ``url`` request for the
+    ``data`` "sha1" list of values.
+
+    When the ``PURLDB_CACHE`` setting is enabled, the results are cached by sha1
+    and only the sha1 values without cached results are sent to the API.
+    """
+    if not response_cache.enabled:
+        return filter_by_checksums(url, data, timeout) or []
+
+    options = sorted((key, value) for key, value in data.items() if key != "sha1")
+    keys_by_sha1 = {
+        sha1: response_cache.get_key("checksums", url, options, sha1)
+        for sha1 in data["sha1"]
+    }
+    cached = response_cache.get_many(list(keys_by_sha1.values()))
+
+    results = []
+    missing_sha1_list = []
+    for sha1, key in keys_by_sha1.items():
+        if key in cached:
+            results.extend(cached[key])
+        else:
+            missing_sha1_list.append(sha1)
+
+    if not missing_sha1_list:
+        return results
+
+    data = {**data, "sha1": missing_sha1_list}
+    missing_results = filter_by_checksums(url, data, timeout)
+    if missing_results is None:
+        return results
+
+    # The sha1 values without results are cached as misses
+    results_by_key = {keys_by_sha1[sha1]: [] for sha1 in missing_sha1_list}
+    for result in missing_results:
+        if key := keys_by_sha1.get(result.get("sha1")):
+            results_by_key[key].append(result)
+    response_cache.set_many(results_by_key)
+
+    return results + missing_results
+
+
 def match_packages(
     sha1_list,
     enhance_package_data=False,
@@ -133,23 +286,15 @@ def match_packages(
         "sha1": sha1_list,
         "enhance_package_data": enhance_package_data,
     }
-    response = request_post(
-        url=f"{api_url}packages/filter_by_checksums/", data=data, timeout=timeout
-    )
-
-    packages = collect_response_results(response, data=data, timeout=timeout)
-    return packages
+    url = f"{api_url}packages/filter_by_checksums/"
+    return match_checksums(url, data=data, timeout=timeout)
 
 
 def match_resources(sha1_list, timeout=DEFAULT_TIMEOUT, api_url=PURLDB_API_URL):
     """Match a list of SHA1 in the PurlDB for resource files."""
     data = {"sha1": sha1_list}
-    response = request_post(
-        url=f"{api_url}resources/filter_by_checksums/", data=data, timeout=timeout
-    )
-
-    resources = collect_response_results(response, data=data, timeout=timeout)
-    return resources
+    url = f"{api_url}resources/filter_by_checksums/"
+    return match_checksums(url, data=data, timeout=timeout)
 
 
 def match_directory(fingerprint, timeout=DEFAULT_TIMEOUT, api_url=PURLDB_API_URL):
@@ -23,8 +23,8 @@
 import fnmatch
 import logging
 import os
+from collections import defaultdict
 
-from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Q
 
 import attr
@@ -146,13 +146,16 @@ def get_resources(location, with_dir=False):
 
 
 def create_codebase_resources(project, rootfs):
-    """Create the CodebaseResource for a `rootfs` in `project`."""
-    for resource in rootfs.get_resources(with_dir=True):
-        pipes.make_codebase_resource(
-            project=project,
-            location=resource.location,
-            rootfs_path=resource.rootfs_path,
-        )
+    """
+    Create the CodebaseResource for a `rootfs` in `project`.
+    The resources are created in batches, skipping the already existing paths.
+    """
+    locations_and_extra_fields = (
+        (resource.location, {"rootfs_path": resource.rootfs_path})
+        for resource in rootfs.get_resources(with_dir=True)
+    )
+    resources = pipes.yield_codebase_resources(project, locations_and_extra_fields)
+    pipes.bulk_create_codebase_resources(resources, ignore_conflicts=True)
 
 
 def has_hash_diff(install_file, codebase_resource):
@@ -196,8 +199,71 @@ def package_getter(root_dir, **kwargs):
         yield package.purl, package
 
 
-def _create_system_package(project, purl, package):
-    """Create system package and related resources."""
+def get_rootfs_path_prefix(project, rootfs):
+    """
+    Return the path prefix of the `rootfs` CodebaseResource in the `project`
+    codebase.
+    """
+    relative_path = os.path.relpath(rootfs.location, project.codebase_path)
+    return f"{pipes.normalize_path(relative_path).strip('/')}/"
+
+
+def get_resources_by_rootfs_path(project, path_prefix=None):
+    """
+    Return a mapping of the `project` CodebaseResource indexed by their
+    `rootfs_path`, loaded once to resolve the system packages installed files in
+    memory rather than with a query per installed file.
+    Only the fields required to relate and compare resources are loaded.
+
+    The resources are limited to the ones of a rootfs when its `path_prefix` is
+    provided, as the same `rootfs_path` may exist in multiple rootfs.
+    """
+    resources = (
+        project.codebaseresources.has_value("rootfs_path")
+        .only("id", "project", "path", "rootfs_path", "sha512", "sha256", "sha1", "md5")
+        .order_by()
+    )
+    if path_prefix:
+        resources = resources.filter(path__startswith=path_prefix)
+
+    resources_by_rootfs_path = defaultdict(list)
+    for resource in resources.iterator(chunk_size=5000):
+        resources_by_rootfs_path[resource.rootfs_path].append(resource)
+
+    return resources_by_rootfs_path
+
+
+def add_system_package_resources(project, package, resources):
+    """
+    Relate the `resources` to the system `package` and flag the newly related
+    ones as system-package, using bulk queries.
+    """
+    resource_ids = {resource.id for resource in resources}
+    if not resource_ids:
+        return
+
+    related_ids = package.codebase_resources.filter(id__in=resource_ids).values_list(
+        "id", flat=True
+    )
+    new_resource_ids = resource_ids.difference(related_ids)
+    if not new_resource_ids:
+        return
+
+    package.add_resources(new_resource_ids)
+    project.codebaseresources.filter(id__in=new_resource_ids).update(
+        status=flag.SYSTEM_PACKAGE
+    )
+    logger.info(f"      {len(new_resource_ids)} resources added to: {package}")
+
+
+def _create_system_package(
+    project, purl, package, resources_by_rootfs_path=None, path_prefix=None
+):
+    """
+    Create system package and related resources.
+    The installed files are looked up in the `resources_by_rootfs_path` mapping,
+    or in the resources of the rootfs `path_prefix` when not provided.
+    """
     created_package = pipes.update_or_create_package(project, package.to_dict())
 
     installed_files = []
@@ -209,34 +275,32 @@ def _create_system_package(project, purl, package):
         logger.info(f"  No installed_files for: {purl}")
         return
 
+    if resources_by_rootfs_path is None:
+        resources_by_rootfs_path = get_resources_by_rootfs_path(project, path_prefix)
+
     missing_resources = created_package.missing_resources[:]
     modified_resources = created_package.modified_resources[:]
-
-    codebase_resources = project.codebaseresources.all()
+    installed_resources = []
 
     for install_file in installed_files:
         install_file_path = install_file.get_path(strip_root=True)
         rootfs_path = pipes.normalize_path(install_file_path)
         logger.info(f"   installed file rootfs_path: {rootfs_path}")
 
-        try:
-            codebase_resource = codebase_resources.get(
-                rootfs_path=rootfs_path,
-            )
-        except ObjectDoesNotExist:
+        codebase_resources = resources_by_rootfs_path.get(rootfs_path)
+        if not codebase_resources:
             if rootfs_path not in missing_resources:
                 missing_resources.append(rootfs_path)
             logger.info(f"      installed file is missing: {rootfs_path}")
             continue
 
-        if created_package not in codebase_resource.discovered_packages.all():
-            codebase_resource.discovered_packages.add(created_package)
-            codebase_resource.update(status=flag.SYSTEM_PACKAGE)
-            logger.info(f"      added as system-package to: {purl}")
+        for codebase_resource in codebase_resources:
+            installed_resources.append(codebase_resource)
+            if has_hash_diff(install_file, codebase_resource):
+                if install_file.path not in modified_resources:
+                    modified_resources.append(install_file.path)
 
-        if has_hash_diff(install_file, codebase_resource):
-            if install_file.path not in modified_resources:
-                modified_resources.append(install_file.path)
+    add_system_package_resources(project, created_package, installed_resources)
 
     created_package.update(
         missing_resources=missing_resources,
@@ -262,10 +326,12 @@ def scan_rootfs_for_system_packages(project, rootfs):
 
     logger.info(f"rootfs location: {rootfs.location}")
 
+    path_prefix = get_rootfs_path_prefix(project, rootfs)
+    resources_by_rootfs_path = get_resources_by_rootfs_path(project, path_prefix)
     installed_packages = rootfs.get_installed_packages(package_getter)
     for index, (purl, package) in enumerate(installed_packages):
         logger.info(f"Creating package #{index}: {purl}")
-        _create_system_package(project, purl, package)
+        _create_system_package(project, purl, package, resources_by_rootfs_path)
 
 
 def get_resource_with_md5(project, status):
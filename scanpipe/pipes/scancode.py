@@ -21,20 +21,28 @@
 # Visit https://github.com/nexB/scancode.io for support and download.
 
 import concurrent.futures
+import hashlib
 import json
 import logging
 import multiprocessing
 import os
 import shlex
 from collections import defaultdict
+from collections import deque
 from functools import partial
+from itertools import islice
 from pathlib import Path
+from timeit import default_timer as timer
 
 from django.apps import apps
 from django.conf import settings
+from django.core.cache import caches
 from django.db.models import ObjectDoesNotExist
 
+import extractcode
+import extractcode.archive
 from commoncode import fileutils
+from commoncode import ignore
 from commoncode.resource import VirtualCodebase
 from extractcode import api as extractcode_api
 from packagedcode import get_package_handler
@@ -43,9 +51,11 @@ from scancode import Scanner
 from scancode import api as scancode_api
 from scancode import cli as scancode_cli
 from scancode.cli import run_scan as scancode_run_scan
+from scancode_config import __version__ as scancode_toolkit_version
 
 from scanpipe import pipes
 from scanpipe.models import CodebaseResource
+from scanpipe.models import ProjectMessage
 from scanpipe.pipes import flag
 
 logger = logging.getLogger("scanpipe.pipes")
@@ -56,6 +66,9 @@ Utilities to deal with ScanCode toolkit features and objects.
 
 scanpipe_app = apps.get_app_config("scanpipe")
 
+# Number of scans kept in flight for each pool process, see `submit_as_completed`.
+MAX_PENDING_PER_WORKER = 4
+
 
 def get_max_workers(keep_available):
     """
@@ -80,6 +93,17 @@ def get_max_workers(keep_available):
     return max_workers
 
 
+def get_extract_max_workers():
+    """
+    Return the `SCANCODEIO_EXTRACT_PROCESSES` if defined in the setting,
+    or the `get_max_workers` value otherwise.
+    """
+    processes = settings.SCANCODEIO_EXTRACT_PROCESSES
+    if processes is not None:
+        return processes
+    return get_max_workers(keep_available=1)
+
+
 def extract_archive(location, target):
     """
     Extract a single archive or compressed file at `location` to the `target`
@@ -98,7 +122,43 @@ def extract_archive(location, target):
     return errors
 
 
-def extract_archives(location, recurse=False):
+def get_archives_to_extract(location, recurse=False):
+    """
+    Return a list of (archive location, extraction target) for the archives and
+    compressed files found at `location`.
+
+    The `location` is walked the same way as in `extractcode`, the existing
+    "<file_name>-extract" directories are skipped unless `recurse` is True.
+    """
+    ignored = partial(ignore.is_ignored, ignores=ignore.default_ignores, unignores={})
+    archives = []
+
+    for top, dirs, files in fileutils.walk(os.path.abspath(location), ignored):
+        if not recurse:
+            dirs[:] = [d for d in dirs if not extractcode.is_extraction_path(d)]
+
+        for filename in files:
+            archive_location = os.path.join(top, filename)
+            if not recurse and extractcode.is_extraction_path(archive_location):
+                continue
+            should_extract = extractcode.archive.should_extract(
+                location=archive_location, kinds=extractcode.all_kinds
+            )
+            if should_extract:
+                target = extractcode.get_extraction_path(archive_location)
+                archives.append((archive_location, target))
+
+    return archives
+
+
+def _extract_archive_with_timing(location, target):
+    """Return the extraction errors and the duration of `location` extraction."""
+    start_time = timer()
+    errors = extract_archive(location, target)
+    return errors, timer() - start_time
+
+
+def extract_archives(location, recurse=False, progress_logger=None):
     """
     Extract all archives at `location` and return errors.
 
@@ -107,21 +167,61 @@ def extract_archives(location, recurse=False):
     archive.
 
     If `recurse` is True, extract nested archives-in-archives recursively.
+    The archives are extracted level by level: all the archives found at a level
+    are independent and extracted in parallel, then their extraction targets are
+    walked for nested archives to extract at the next level.
 
-    Return a list of extraction errors.
+    Multiprocessing is not used for a level with a single archive or when disabled
+    using SCANCODEIO_EXTRACT_PROCESSES=0 or SCANCODEIO_EXTRACT_PROCESSES=1.
 
-    Wrapper of the `extractcode.api.extract_archives` function.
-    """
-    options = {
-        "recurse": recurse,
-        "replace_originals": False,
-        "all_formats": True,
-    }
+    The extraction duration of each archive is logged to the `progress_logger`,
+    with the archive path relative to the `location`.
 
+    Return a list of extraction errors.
+    """
     errors = []
-    for event in extractcode_api.extract_archives(location, **options):
-        if event.done:
-            errors.extend(event.errors)
+    max_workers = get_extract_max_workers()
+    executor = None
+
+    locations = [location]
+    try:
+        while locations:
+            archives = [
+                archive
+                for path in locations
+                for archive in get_archives_to_extract(path, recurse)
+            ]
+            if not archives:
+                break
+
+            archive_locations, targets = zip(*archives)
+            if max_workers > 1 and len(archives) > 1:
+                # The pool is started on the first level with multiple archives,
+                # and reused for the next levels.
+                if not executor:
+                    executor = concurrent.futures.ProcessPoolExecutor(max_workers)
+                results = executor.map(
+                    _extract_archive_with_timing, archive_locations, targets
+                )
+            else:
+                results = map(_extract_archive_with_timing, archive_locations, targets)
+
+            for archive_location, (extract_errors, duration) in zip(
+                archive_locations, results
+            ):
+                errors.extend(extract_errors)
+                if progress_logger:
+                    archive_path = os.path.relpath(archive_location, location)
+                    progress_logger(
+                        f"Extracted {archive_path} in {duration:.2f} seconds"
+                    )
+
+            locations = []
+            if recurse:
+                locations = [target for target in targets if os.path.isdir(target)]
+    finally:
+        if executor:
+            executor.shutdown()
 
     return errors
 
@@ -175,6 +275,44 @@ def get_resource_info(location):
     return file_info
 
 
+# Number of locations sent at once to a pool process, see `get_resources_info`.
+RESOURCE_INFO_CHUNK_SIZE = 250
+
+
+def _get_resources_info_chunk(locations):
+    """Return a list of (location, resource info) for the ``locations`` list."""
+    return [(location, get_resource_info(location)) for location in locations]
+
+
+def get_resources_info(locations, chunk_size=RESOURCE_INFO_CHUNK_SIZE):
+    """
+    Yield a (location, resource info) tuple for each of the ``locations``, in the
+    same order.
+
+    The resource info are computed by chunks of ``chunk_size`` locations in a pool
+    of processes, keeping only a limited number of chunks in flight. Multiprocessing
+    can be disabled using SCANCODEIO_PROCESSES=0.
+    """
+    locations = iter(locations)
+    max_workers = get_max_workers(keep_available=1)
+
+    if max_workers <= 0:
+        for location in locations:
+            yield location, get_resource_info(location)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        # The futures are consumed in submission order, to keep the locations order.
+        pending = deque()
+        while chunk := list(islice(locations, chunk_size)):
+            pending.append(executor.submit(_get_resources_info_chunk, chunk))
+            if len(pending) >= max_workers * 2:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
 def _scan_resource(
     location,
     scanners,
@@ -261,13 +399,293 @@ def save_scan_package_results(codebase_resource, scan_results, scan_errors):
         codebase_resource.update(status=flag.SCANNED_WITH_ERROR)
 
 
+def set_scan_file_results(codebase_resource, scan_results, scan_errors):
+    """
+    Set the resource scan file results on the `codebase_resource` instance without
+    saving it in the database.
+    Return the list of updated fields.
+    """
+    status = flag.SCANNED_WITH_ERROR if scan_errors else flag.SCANNED
+    return codebase_resource.set_scan_results(scan_results, status, save=False)
+
+
+def set_scan_package_results(codebase_resource, scan_results, scan_errors):
+    """
+    Set the resource scan package results on the `codebase_resource` instance
+    without saving it in the database.
+    Return the list of updated fields.
+    """
+    updated_fields = []
+
+    if package_data := scan_results.get("package_data", []):
+        codebase_resource.package_data = package_data
+        codebase_resource.status = flag.APPLICATION_PACKAGE
+        updated_fields.extend(["package_data", "status"])
+
+    if scan_errors:
+        codebase_resource.status = flag.SCANNED_WITH_ERROR
+        updated_fields.append("status")
+
+    return updated_fields
+
+
+class ScanResultsWriter:
+    """
+    Buffer the scan results of codebase resources and write those in the database
+    by batches: resources are saved using ``bulk_update`` and scan errors are
+    saved as ProjectMessage using ``bulk_create``.
+
+    The `set_func` is called to set the scan results on each resource instance,
+    it must not save the instance and must return the list of updated fields.
+
+    The buffer is flushed every `batch_size` results, or when `flush_interval`
+    seconds have elapsed since the latest flush, whichever comes first.
+
+    Usage:
+        writer = ScanResultsWriter(set_scan_file_results, batch_size=1000)
+        for resource, scan_results, scan_errors in results:
+            writer.add(resource, scan_results, scan_errors)
+        writer.flush()
+    """
+
+    def __init__(self, set_func, batch_size=1000, flush_interval=10):
+        self.set_func = set_func
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.resources = []
+        self.messages = []
+        self.update_fields = set()
+        self.last_flush_time = timer()
+        self.flush_count = 0
+
+    def add(self, codebase_resource, scan_results, scan_errors):
+        """Add the `scan_results` and `scan_errors` of `codebase_resource`."""
+        # The errors are created first to capture the resource data before the
+        # scan results are set, as done in the `save_scan_*_results` functions.
+        for scan_error in scan_errors or []:
+            self.messages.append(codebase_resource.make_error(scan_error))
+
+        updated_fields = self.set_func(codebase_resource, scan_results, scan_errors)
+        if updated_fields:
+            self.update_fields.update(updated_fields)
+            self.resources.append(codebase_resource)
+
+        buffer_size = max(len(self.resources), len(self.messages))
+        if buffer_size >= self.batch_size:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        """Flush the buffer if the `flush_interval` has elapsed."""
+        if timer() - self.last_flush_time >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered resources and messages in the database."""
+        if self.resources:
+            update_fields = self.update_fields
+            for resource in self.resources:
+                if resource.set_compliance_alert():
+                    update_fields.add("compliance_alert")
+
+            CodebaseResource.objects.bulk_update(
+                objs=self.resources,
+                fields=sorted(update_fields),
+                batch_size=self.batch_size,
+            )
+
+        if self.messages:
+            ProjectMessage.objects.bulk_create(self.messages, self.batch_size)
+
+        if self.resources or self.messages:
+            self.flush_count += 1
+
+        self.resources = []
+        self.messages = []
+        self.update_fields = set()
+        self.last_flush_time = timer()
+
+
+def get_scan_results_writer(project, set_func):
+    """
+    Return a ScanResultsWriter when the batched results persistence is enabled
+    on the `project` using the ``scan_results_batch_size`` setting.
+    The flush interval, in seconds, can be set with ``scan_results_flush_interval``.
+    """
+    batch_size = project.get_env("scan_results_batch_size")
+    if not batch_size:
+        return
+
+    writer_kwargs = {"batch_size": int(batch_size)}
+    if flush_interval := project.get_env("scan_results_flush_interval"):
+        writer_kwargs["flush_interval"] = float(flush_interval)
+
+    return ScanResultsWriter(set_func, **writer_kwargs)
+
+
+class ScanResultsCache:
+    """
+    Content-addressed cache of scan results shared across all projects.
+
+    The results are keyed on the resource sha1, the scan function and its arguments
+    defining the set of scanners, and the ScanCode-toolkit version.
+    When `with_path` is True, the results are keyed on the resource path too, for
+    the scans depending on the file name and path, such as the package scan where
+    the datafile handlers are selected using path patterns. The `rootfs_path` is
+    used when available, as it is the same for a file across the projects.
+    Entries are stored in the "scan_results" Django cache, refer to the
+    ``SCANCODEIO_SCAN_CACHE_*`` settings for the backend and eviction options.
+
+    Only the results of scans completed without errors are cached.
+    The results to cache are buffered and written every `write_batch_size` entries
+    using a single ``set_many`` call, the remaining entries are written on `flush`.
+    """
+
+    lookup_batch_size = 500
+    write_batch_size = 500
+
+    def __init__(self, scan_func, scan_func_kwargs=None, cache=None, with_path=False):
+        self.cache = cache or caches["scan_results"]
+        self.with_path = with_path
+        scan_func_kwargs = scan_func_kwargs or {}
+        kwargs = ",".join(
+            f"{key}={scan_func_kwargs[key]}" for key in sorted(scan_func_kwargs)
+        )
+        self.key_prefix = f"{scan_func.__name__}:{kwargs}:{scancode_toolkit_version}"
+        self.hits = 0
+        self.misses = 0
+        self.pending = {}
+
+    def get_key(self, resource):
+        """Return the cache key of `resource`, or None when it has no sha1."""
+        if not resource.sha1:
+            return
+
+        key = f"{self.key_prefix}:{resource.sha1}"
+        if self.with_path:
+            path = resource.rootfs_path or resource.path
+            key += f":{hashlib.sha1(path.encode()).hexdigest()}"
+        return key
+
+    def iter_misses(self, resources, on_hit):
+        """
+        Yield the `resources` without cached scan results.
+        The `on_hit` callable is called with the resource and its cached scan results
+        for each cache hit.
+
+        The cache is looked up by batches of `lookup_batch_size` resources.
+        """
+        resources = iter(resources)
+        while batch := list(islice(resources, self.lookup_batch_size)):
+            keys = [self.get_key(resource) for resource in batch]
+            cached = self.cache.get_many([key for key in keys if key])
+
+            for resource, key in zip(batch, keys):
+                if key and key in cached:
+                    self.hits += 1
+                    on_hit(resource, cached[key])
+                else:
+                    self.misses += 1
+                    yield resource
+
+    def set(self, resource, scan_results, scan_errors):
+        """Cache the `scan_results` of `resource` when completed without errors."""
+        key = self.get_key(resource)
+        if key and not scan_errors:
+            self.pending[key] = scan_results
+            if len(self.pending) >= self.write_batch_size:
+                self.flush()
+
+    def flush(self):
+        """Write the buffered scan results in the cache."""
+        if self.pending:
+            self.cache.set_many(self.pending)
+        self.pending = {}
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if lookups:
+            return round(self.hits / lookups * 100, 1)
+        return 0
+
+    def get_stats_message(self):
+        return (
+            f"Scan results cache: {self.hits:,d} hits, {self.misses:,d} misses "
+            f"({self.hit_rate}% hit rate)"
+        )
+
+
+def get_scan_results_cache(scan_func, scan_func_kwargs=None, with_path=False):
+    """
+    Return a ScanResultsCache for the `scan_func` when the scan results cache is
+    enabled using the ``SCANCODEIO_SCAN_CACHE`` setting.
+    """
+    if settings.SCANCODEIO_SCAN_CACHE:
+        return ScanResultsCache(scan_func, scan_func_kwargs, with_path=with_path)
+
+
+def submit_as_completed(
+    executor, scan_func, resources, max_pending, timeout=None, on_timeout=None
+):
+    """
+    Submit the `scan_func` on the location of each of the `resources` to the
+    `executor` and yield the (resource, future) tuples as they complete (finished or
+    cancelled).
+
+    The `resources` are consumed lazily, keeping at most `max_pending` submitted
+    futures in flight at once. New work is submitted as results complete, this
+    keeps the memory usage flat regardless of the number of resources.
+
+    The `on_timeout` callable is called each time no futures completed in
+    `timeout` seconds, allowing some work to be done while waiting.
+    """
+    resources = iter(resources)
+    future_to_resource = {}
+
+    def submit(count):
+        for resource in islice(resources, count):
+            # Only the location is sent to the pool processes, not the instance.
+            future = executor.submit(scan_func, resource.location)
+            future_to_resource[future] = resource
+
+    submit(max_pending)
+    while future_to_resource:
+        done, _ = concurrent.futures.wait(
+            future_to_resource,
+            timeout=timeout,
+            return_when=concurrent.futures.FIRST_COMPLETED,
+        )
+        if not done and on_timeout:
+            on_timeout()
+
+        for future in done:
+            yield future_to_resource.pop(future), future
+
+        submit(len(done))
+
+
 def scan_resources(
-    resource_qs, scan_func, save_func, scan_func_kwargs=None, progress_logger=None
+    resource_qs,
+    scan_func,
+    save_func,
+    scan_func_kwargs=None,
+    progress_logger=None,
+    results_writer=None,
+    scan_cache=None,
 ):
     """
     Run the `scan_func` on the codebase resources of the provided `resource_qs`.
     The `save_func` is called to save the results.
 
+    When a `results_writer` ScanResultsWriter is provided, it is used in place of
+    the `save_func` to buffer the results and save those by batches.
+    The buffer is flushed while the pool processes are still scanning.
+
+    When a `scan_cache` ScanResultsCache is provided, the cached results are saved
+    directly and only the cache misses are scanned.
+
     Multiprocessing is enabled by default on this pipe, the number of processes can be
     controlled through the `SCANCODEIO_PROCESSES` setting.
     Multiprocessing can be disabled using `SCANCODEIO_PROCESSES=0`,
@@ -275,12 +693,16 @@ def scan_resources(
 
     The codebase resources QuerySet is chunked in 2000 results at the time,
     this can result in a significant reduction in memory usage.
+    The resources are submitted to the pool processes as a bounded window of
+    in-flight scans, more work is submitted as the results complete.
 
     Note that all database related actions are executed in this main process as the
     database connection does not always fork nicely in the pool processes.
     """
-    if not scan_func_kwargs:
-        scan_func_kwargs = {}
+    scan_func_kwargs = scan_func_kwargs or {}
+
+    if results_writer:
+        save_func = results_writer.add
 
     resource_count = resource_qs.count()
     logger.info(f"Scan {resource_count} codebase resources with {scan_func.__name__}")
@@ -288,6 +710,21 @@ def scan_resources(
     progress = pipes.LoopProgress(resource_count, logger=progress_logger)
     max_workers = get_max_workers(keep_available=1)
 
+    def save_results(resource, scan_results, scan_errors):
+        if scan_cache:
+            scan_cache.set(resource, scan_results, scan_errors)
+        save_func(resource, scan_results, scan_errors)
+
+    if scan_cache:
+
+        def save_cached_results(resource, scan_results):
+            progress.current_iteration += 1
+            save_func(resource, scan_results, [])
+
+        resource_iterator = scan_cache.iter_misses(
+            resource_iterator, on_hit=save_cached_results
+        )
+
     if max_workers <= 0:
         with_threading = False if max_workers == -1 else True
         for resource in progress.iter(resource_iterator):
@@ -296,26 +733,51 @@ def scan_resources(
             scan_results, scan_errors = scan_func(
                 resource.location, with_threading, **scan_func_kwargs
             )
-            save_func(resource, scan_results, scan_errors)
+            save_results(resource, scan_results, scan_errors)
+
+        finalize_scan_resources(results_writer, scan_cache, progress_logger)
         return
 
     logger.info(f"Starting ProcessPoolExecutor with {max_workers} max_workers")
 
-    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
-        future_to_resource = {
-            executor.submit(scan_func, resource.location): resource
-            for resource in resource_iterator
-        }
+    timeout, on_timeout = None, None
+    if results_writer:
+        timeout = results_writer.flush_interval
+        on_timeout = results_writer.flush_if_due
 
-        # Iterate over the Futures as they complete (finished or cancelled)
-        future_as_completed = concurrent.futures.as_completed(future_to_resource)
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        future_as_completed = submit_as_completed(
+            executor=executor,
+            scan_func=partial(scan_func, **scan_func_kwargs),
+            resources=resource_iterator,
+            max_pending=max_workers * MAX_PENDING_PER_WORKER,
+            timeout=timeout,
+            on_timeout=on_timeout,
+        )
 
-        for future in progress.iter(future_as_completed):
-            resource = future_to_resource[future]
+        for resource, future in progress.iter(future_as_completed):
             progress.log_progress()
             logger.debug(f"{scan_func.__name__} pk={resource.pk}")
             scan_results, scan_errors = future.result()
-            save_func(resource, scan_results, scan_errors)
+            save_results(resource, scan_results, scan_errors)
+
+    finalize_scan_resources(results_writer, scan_cache, progress_logger)
+
+
+def finalize_scan_resources(results_writer=None, scan_cache=None, progress_logger=None):
+    """
+    Flush the `results_writer` and `scan_cache` remaining results and log the
+    `scan_cache` statistics, in the Run log when a `progress_logger` is provided.
+    """
+    if results_writer:
+        results_writer.flush()
+
+    if scan_cache:
+        scan_cache.flush()
+        stats_message = scan_cache.get_stats_message()
+        logger.info(stats_message)
+        if progress_logger:
+            progress_logger(stats_message)
 
 
 def scan_for_files(project, resource_qs=None, progress_logger=None):
@@ -340,6 +802,8 @@ def scan_for_files(project, resource_qs=None, progress_logger=None):
         save_func=save_scan_file_results,
         scan_func_kwargs=scan_func_kwargs,
         progress_logger=progress_logger,
+        results_writer=get_scan_results_writer(project, set_scan_file_results),
+        scan_cache=get_scan_results_cache(scan_file, scan_func_kwargs),
     )
 
 
@@ -366,6 +830,9 @@ def scan_for_application_packages(project, assemble=True, progress_logger=None):
         scan_func=scan_for_package_data,
         save_func=save_scan_package_results,
         progress_logger=progress_logger,
+        results_writer=get_scan_results_writer(project, set_scan_package_results),
+        # The package data depend on the file name and path, not only its content.
+        scan_cache=get_scan_results_cache(scan_for_package_data, with_path=True),
     )
 
     # Iterate through CodebaseResources with Package data and handle them using
@@ -20,9 +20,13 @@
 # ScanCode.io is a free software code scanning tool from nexB Inc. and others.
 # Visit https://github.com/nexB/scancode.io for support and download.
 
+import hashlib
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from django.conf import settings
+from django.core.cache import caches
 
 import requests
 
@@ -49,6 +53,17 @@ VULNERABLECODE_API_KEY = settings.VULNERABLECODE_API_KEY
 if VULNERABLECODE_API_KEY:
     session.headers.update({"Authorization": f"Token {VULNERABLECODE_API_KEY}"})
 
+# Maximum number of concurrent bulk search requests sent to the VulnerableCode API.
+DEFAULT_MAX_WORKERS = 4
+# Number of times a failed bulk search request is retried, waiting
+# ``DEFAULT_BACKOFF_FACTOR * 2 ** retry`` seconds before each retry.
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 1
+
+adapter = requests.adapters.HTTPAdapter(pool_maxsize=DEFAULT_MAX_WORKERS)
+session.mount("http://", adapter)
+session.mount("https://", adapter)
+
 
 def is_configured():
     """Return True if the required VulnerableCode settings have been set."""
@@ -202,17 +217,96 @@ def bulk_search_by_cpes(
     return request_post(url, data, timeout)
 
 
+def bulk_search_by_purl_with_retries(
+    purls,
+    max_retries=DEFAULT_MAX_RETRIES,
+    backoff_factor=DEFAULT_BACKOFF_FACTOR,
+):
+    """
+    Bulk search of vulnerabilities using the provided list of `purls`.
+    The failed requests are retried up to `max_retries` times with an exponential
+    backoff. Raise an Exception if all the attempts failed.
+    """
+    for retry in range(max_retries + 1):
+        if retry:
+            time.sleep(backoff_factor * 2 ** (retry - 1))
+        response_data = bulk_search_by_purl(purls)
+        if response_data is not None:
+            return response_data
+
+    raise Exception(
+        f"{label} bulk search failed for {len(purls)} PURLs after "
+        f"{max_retries} retries."
+    )
+
+
+def get_cache():
+    """
+    Return the "vulnerablecode" Django cache when the vulnerabilities cache is
+    enabled using the ``VULNERABLECODE_CACHE`` setting.
+    """
+    if settings.VULNERABLECODE_CACHE:
+        return caches["vulnerablecode"]
+
+
+def get_cache_key(purl):
+    return f"purl:{hashlib.sha1(purl.encode()).hexdigest()}"
+
+
+def lookup_vulnerabilities(
+    purls,
+    chunk_size=1000,
+    max_workers=DEFAULT_MAX_WORKERS,
+    logger=logger.info,
+):
+    """
+    Return a mapping of vulnerability data by PURL for the provided `purls`.
+
+    The cached data are used first when the vulnerabilities cache is enabled.
+    The other PURLs are looked up in batch of ``chunk_size`` per request, using up
+    to ``max_workers`` concurrent requests. Their vulnerability data are cached,
+    including an empty data for the PURLs without vulnerabilities.
+    """
+    purls = list(dict.fromkeys(purls))
+    vulnerabilities_by_purl = {}
+
+    if cache := get_cache():
+        keys_by_purl = {purl: get_cache_key(purl) for purl in purls}
+        cached = cache.get_many(list(keys_by_purl.values()))
+        for purl, key in keys_by_purl.items():
+            if vulnerability_data := cached.get(key):
+                vulnerabilities_by_purl[purl] = vulnerability_data
+        purls = [purl for purl, key in keys_by_purl.items() if key not in cached]
+        logger(f"{label} cache: {len(cached):,d} hits, {len(purls):,d} misses")
+
+    purls_batches = list(chunked(purls, chunk_size))
+    with ThreadPoolExecutor(max_workers) as executor:
+        results = executor.map(bulk_search_by_purl_with_retries, purls_batches)
+        for purls_batch, response_data in zip(purls_batches, results):
+            batch_vulnerabilities = {
+                vulnerability_data["purl"]: vulnerability_data
+                for vulnerability_data in response_data
+            }
+            vulnerabilities_by_purl.update(batch_vulnerabilities)
+            if cache:
+                cache.set_many(
+                    {
+                        keys_by_purl[purl]: batch_vulnerabilities.get(purl, {})
+                        for purl in purls_batch
+                    }
+                )
+
+    return vulnerabilities_by_purl
+
+
 def fetch_vulnerabilities(packages, chunk_size=1000, logger=logger.info):
     """
     Fetch and store vulnerabilities for each provided ``packages``.
     The PURLs are used for the lookups in batch of ``chunk_size`` per request.
     """
-    vulnerabilities_by_purl = {}
-
-    for purls_batch in chunked(get_purls(packages), chunk_size):
-        response_data = bulk_search_by_purl(purls_batch)
-        for vulnerability_data in response_data:
-            vulnerabilities_by_purl[vulnerability_data["purl"]] = vulnerability_data
+    vulnerabilities_by_purl = lookup_vulnerabilities(
+        get_purls(packages), chunk_size=chunk_size, logger=logger
+    )
 
     unsaved_objects = []
     for package in packages:
@@ -232,3 +326,57 @@ def fetch_vulnerabilities(packages, chunk_size=1000, logger=logger.info):
             f"{len(unsaved_objects)} {model_class._meta.verbose_name_plural} updated "
             f"with vulnerability data."
         )
+
+
+def update_vulnerabilities(queryset, vulnerabilities_by_purl, logger=logger.info):
+    """
+    Update the vulnerabilities of the ``queryset`` packages or dependencies from the
+    ``vulnerabilities_by_purl`` mapping, for all the looked up PURLs.
+    Only the objects with changed vulnerabilities are saved, using ``bulk_update``.
+    """
+    unsaved_objects = []
+    updated_count = 0
+
+    for obj in queryset.iterator(chunk_size=2000):
+        if not (package_url := obj.package_url):
+            continue
+        vulnerability_data = vulnerabilities_by_purl.get(package_url) or {}
+        affected_by = vulnerability_data.get("affected_by_vulnerabilities", [])
+        if obj.affected_by_vulnerabilities != affected_by:
+            obj.affected_by_vulnerabilities = affected_by
+            unsaved_objects.append(obj)
+
+        if len(unsaved_objects) >= 1000:
+            queryset.bulk_update(unsaved_objects, ["affected_by_vulnerabilities"])
+            updated_count += len(unsaved_objects)
+            unsaved_objects = []
+
+    if unsaved_objects:
+        queryset.bulk_update(unsaved_objects, ["affected_by_vulnerabilities"])
+        updated_count += len(unsaved_objects)
+
+    logger(
+        f"{updated_count:,d} {queryset.model._meta.verbose_name_plural} updated "
+        f"with vulnerability data."
+    )
+
+
+def refresh_vulnerabilities(querysets, chunk_size=1000, logger=logger.info):
+    """
+    Refresh the vulnerabilities of the packages and dependencies of the provided
+    ``querysets``, across any number of projects.
+
+    Each unique PURL is looked up once, then the vulnerability data are set on all
+    the objects sharing that PURL.
+    """
+    purls = set()
+    for queryset in querysets:
+        purls.update(get_purls(queryset.iterator(chunk_size=2000)))
+
+    logger(f"Looking up vulnerabilities for {len(purls):,d} unique PURLs.")
+    vulnerabilities_by_purl = lookup_vulnerabilities(
+        sorted(purls), chunk_size=chunk_size, logger=logger
+    )
+
+    for queryset in querysets:
+        update_vulnerabilities(queryset, vulnerabilities_by_purl, logger=logger)
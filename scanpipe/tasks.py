@@ -70,3 +70,34 @@ def execute_pipeline_task(run_pk):
         project.clear_tmp_directory()
         if next_run := project.get_next_run():
             next_run.start()
+
+
+def refresh_vulnerabilities_task(
+    project_names=None, include_archived=False, logger=logger.info
+):
+    """
+    Refresh the vulnerabilities of the packages and resolved dependencies of all
+    projects, or of the projects named in ``project_names``.
+    Archived projects are excluded unless ``include_archived`` is True.
+    """
+    # Imported here to avoid a circular import, as the models import this module.
+    from scanpipe.pipes import vulnerablecode
+
+    package_model = apps.get_model("scanpipe", "DiscoveredPackage")
+    dependency_model = apps.get_model("scanpipe", "DiscoveredDependency")
+
+    filters = {}
+    if project_names is not None:
+        filters["project__name__in"] = project_names
+    if not include_archived:
+        filters["project__is_archived"] = False
+
+    packages = package_model.objects.filter(**filters)
+    dependencies = dependency_model.objects.filter(is_resolved=True, **filters)
+    purl_fields = ["type", "namespace", "name", "version", "qualifiers", "subpath"]
+    querysets = [
+        queryset.only("id", "affected_by_vulnerabilities", *purl_fields)
+        for queryset in [packages, dependencies]
+    ]
+
+    vulnerablecode.refresh_vulnerabilities(querysets, logger=logger)
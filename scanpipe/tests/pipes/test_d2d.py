@@ -27,12 +27,14 @@ from pathlib import Path
 from unittest import mock
 
 from django.test import TestCase
+from django.test import override_settings
 
 from scanpipe import pipes
 from scanpipe.models import CodebaseResource
 from scanpipe.models import Project
 from scanpipe.pipes import d2d
 from scanpipe.pipes import flag
+from scanpipe.pipes import pathmap
 from scanpipe.pipes.input import copy_input
 from scanpipe.pipes.input import copy_inputs
 from scanpipe.tests import make_resource_directory
@@ -132,6 +134,52 @@ class ScanPipeD2DPipesTest(TestCase):
             self.assertEqual(flag.MATCHED_TO_PURLDB, resource.status)
             self.assertEqual(package, resource.discovered_packages.get())
 
+    @mock.patch("scanpipe.pipes.purldb.match_resources")
+    @mock.patch("scanpipe.pipes.purldb.request_get")
+    def test_scanpipe_pipes_d2d_match_purldb_resources_concurrent_batches(
+        self, mock_request_get, mock_match_resources
+    ):
+        package_url = "http://example.com/api/packages/xyz/"
+        sha1_list = [f"{index:040d}" for index in range(5)]
+        for index, sha1 in enumerate(sha1_list):
+            make_resource_file(self.project1, f"to/file{index}.js", sha1=sha1)
+
+        def match_resources(sha1_list):
+            return [{"package": package_url, "sha1": sha1} for sha1 in sha1_list]
+
+        mock_match_resources.side_effect = match_resources
+        mock_request_get.return_value = dict(package_data1, uuid=uuid.uuid4())
+
+        buffer = io.StringIO()
+        d2d.match_purldb_resources(
+            self.project1,
+            extensions=[".js"],
+            matcher_func=d2d.match_purldb_resource,
+            chunk_size=2,
+            logger=buffer.write,
+            max_workers=2,
+        )
+        expected = (
+            "Matching 5 .js resources in PurlDB, using SHA1"
+            "5 resources matched in PurlDB using 5 SHA1s"
+        )
+        self.assertEqual(expected, buffer.getvalue())
+
+        self.assertEqual(3, mock_match_resources.call_count)
+        sent_sha1s = [
+            sha1
+            for call in mock_match_resources.call_args_list
+            for sha1 in call.kwargs["sha1_list"]
+        ]
+        self.assertEqual(sorted(sha1_list), sorted(sent_sha1s))
+        # The package data is fetched once per unique package URL and batch at most
+        self.assertLessEqual(mock_request_get.call_count, 3)
+
+        package = self.project1.discoveredpackages.get()
+        self.assertEqual(5, package.codebase_resources.count())
+        statuses = self.project1.codebaseresources.values_list("status", flat=True)
+        self.assertEqual({flag.MATCHED_TO_PURLDB}, set(statuses))
+
     @mock.patch("scanpipe.pipes.purldb.request_get")
     def test_scanpipe_pipes_d2d_match_purldb_directories(self, mock_request_get):
         to_1 = make_resource_directory(
@@ -175,6 +223,48 @@ class ScanPipeD2DPipesTest(TestCase):
             self.assertEqual("matched-to-purldb", resource.status)
             self.assertEqual(package, resource.discovered_packages.get())
 
+    @mock.patch("scanpipe.pipes.purldb.request_get")
+    @mock.patch("scanpipe.pipes.purldb.match_directory")
+    def test_scanpipe_pipes_d2d_match_purldb_directories_skip_matched_subtrees(
+        self, mock_match_directory, mock_request_get
+    ):
+        directory_paths = [
+            "to/a",
+            "to/a/b",
+            "to/a/b/c",
+            "to/d",
+            "to/d/e",
+            "to/empty",
+        ]
+        for path in directory_paths:
+            fingerprint = path.rpartition("/")[2] if path != "to/empty" else ""
+            make_resource_directory(
+                self.project1, path, extra_data={"directory_content": fingerprint}
+            )
+        make_resource_file(self.project1, "to/a/b/c/file.class")
+
+        def match_directory(fingerprint):
+            if fingerprint in ["a", "e"]:
+                return [{"package": f"http://purldb/api/packages/{fingerprint}/"}]
+
+        mock_match_directory.side_effect = match_directory
+        mock_request_get.side_effect = lambda url: dict(
+            package_data1, version=url, package_uid=url
+        )
+
+        buffer = io.StringIO()
+        d2d.match_purldb_directories(self.project1, logger=buffer.write)
+
+        requested_fingerprints = sorted(
+            call.kwargs["fingerprint"] for call in mock_match_directory.call_args_list
+        )
+        self.assertEqual(["a", "d", "e"], requested_fingerprints)
+        self.assertIn("4 directories matched in PurlDB", buffer.getvalue())
+
+        self.assertEqual(2, self.project1.discoveredpackages.count())
+        resource = self.project1.codebaseresources.get(path="to/a/b/c/file.class")
+        self.assertEqual(flag.MATCHED_TO_PURLDB, resource.status)
+
     def test_scanpipe_pipes_d2d_get_best_path_matches_same_name(self):
         to_1 = CodebaseResource(name="package-1.0.ext", path="to/package-1.0.ext")
         to_2 = CodebaseResource(name="package-2.0.ext", path="to/package-2.0.ext")
@@ -226,6 +316,25 @@ class ScanPipeD2DPipesTest(TestCase):
         self.assertEqual("sha1", relation.map_type)
         self.assertEqual(from_2, relation.from_resource)
 
+    def test_scanpipe_pipes_d2d_map_checksum_multiple_resources(self):
+        for index in range(3):
+            sha1 = f"sha1_{index}"
+            make_resource_file(self.project1, path=f"to/a/{index}/file", sha1=sha1)
+            make_resource_file(self.project1, path=f"from/a/{index}/file", sha1=sha1)
+            make_resource_file(self.project1, path=f"from/b/{index}/file", sha1=sha1)
+        make_resource_file(self.project1, path="to/no_match", sha1="sha1_4")
+
+        # The number of queries does not depend on the number of resources.
+        with self.assertNumQueries(4):
+            d2d.map_checksum(self.project1, "sha1")
+
+        relations = self.project1.codebaserelations.all()
+        self.assertEqual(3, len(relations))
+        for relation in relations:
+            self.assertEqual("sha1", relation.map_type)
+            self.assertEqual(relation.from_resource.sha1, relation.to_resource.sha1)
+            self.assertTrue(relation.from_resource.path.startswith("from/a/"))
+
     def test_scanpipe_pipes_d2d_flag_processed_archives(self):
         to_archive = make_resource_file(
             self.project1, path="to/archive.lpkg", is_archive=True
@@ -457,6 +566,101 @@ class ScanPipeD2DPipesTest(TestCase):
         self.assertEqual({"path_score": "3/3"}, relation.extra_data)
         self.assertNotEqual("too-many-maps", file_name_too_many.status)
 
+    def test_scanpipe_pipes_d2d_map_path_multiple_resources(self):
+        for index in range(3):
+            make_resource_file(self.project1, path=f"from/src/{index}/bar/file.ext")
+            make_resource_file(self.project1, path=f"to/{index}/bar/file.ext")
+
+        # The number of queries does not depend on the number of matches.
+        with self.assertNumQueries(7):
+            d2d.map_path(self.project1)
+
+        relations = self.project1.codebaserelations.all()
+        self.assertEqual(3, len(relations))
+        for relation in relations:
+            self.assertEqual("path", relation.map_type)
+            from_path = relation.from_resource.path
+            self.assertEqual(relation.to_resource.path[3:], from_path[9:])
+
+    @override_settings(SCANCODEIO_PROCESSES=2)
+    def test_scanpipe_pipes_d2d_map_resources_in_pool_processes(self):
+        for index in range(5):
+            make_resource_file(self.project1, path=f"from/src/{index}/bar/file.ext")
+            make_resource_file(self.project1, path=f"to/{index}/bar/file.ext")
+        make_resource_file(self.project1, path="to/other/bar/file.ext")
+
+        from_resources = self.project1.codebaseresources.from_codebase()
+        to_resources = self.project1.codebaseresources.to_codebase()
+        buffer = io.StringIO()
+        progress = pipes.LoopProgress(6, logger=buffer.write, progress_step=1)
+
+        with pipes.RelationWriter(self.project1) as relation_writer:
+            d2d.map_resources(
+                self.project1,
+                to_resources=to_resources.iterator(),
+                map_func=d2d._map_path_resource,
+                map_func_kwargs={
+                    "from_resources_by_id": d2d.get_resources_by_id(from_resources),
+                    "from_resources_index": pathmap.build_index(
+                        from_resources.values_list("id", "path")
+                    ),
+                },
+                relation_writer=relation_writer,
+                progress=progress,
+                chunk_size=2,
+            )
+
+        self.assertEqual(5, self.project1.codebaserelations.count())
+        for relation in self.project1.codebaserelations.all():
+            self.assertEqual(
+                relation.to_resource.path[3:], relation.from_resource.path[9:]
+            )
+        too_many_maps = self.project1.codebaseresources.get(
+            path="to/other/bar/file.ext"
+        )
+        self.assertEqual(flag.TOO_MANY_MAPS, too_many_maps.status)
+        self.assertEqual(6, progress.current_iteration)
+        self.assertIn("Progress: 100% (6/6)", buffer.getvalue())
+
+    def test_scanpipe_pipes_d2d_get_resources_by_id(self):
+        resource = make_resource_file(self.project1, path="from/a/file.ext")
+        resources = self.project1.codebaseresources.all()
+
+        with self.assertNumQueries(1):
+            resources_by_id = d2d.get_resources_by_id(resources)
+            self.assertEqual(resource.location, resources_by_id[resource.id].location)
+
+    @override_settings(SCANCODEIO_PATHMAP_COMPACT_INDEX=True)
+    def test_scanpipe_pipes_d2d_map_path_compact_index(self):
+        from1 = make_resource_file(self.project1, path="from/src/apache/bar/file.ext")
+        to1 = make_resource_file(self.project1, path="to/apache/bar/file.ext")
+
+        d2d.map_path(self.project1)
+        relation = self.project1.codebaserelations.get()
+        self.assertEqual(from1, relation.from_resource)
+        self.assertEqual(to1, relation.to_resource)
+        self.assertEqual({"path_score": "3/3"}, relation.extra_data)
+        self.assertEqual(1, len(list(self.project1.tmp_path.glob("pathmap-*.sfx"))))
+
+    def test_scanpipe_pipes_d2d_get_resources_index(self):
+        make_resource_file(self.project1, path="from/a/b/file.ext")
+        from_resources = self.project1.codebaseresources.from_codebase()
+
+        index = d2d.get_resources_index(self.project1, from_resources)
+        self.assertEqual(1, len(list(self.project1.tmp_path.glob("pathmap-*.idx"))))
+
+        with mock.patch("scanpipe.pipes.pathmap.build_index") as build_index:
+            cached_index = d2d.get_resources_index(self.project1, from_resources)
+        build_index.assert_not_called()
+        self.assertEqual(list(index.items()), list(cached_index.items()))
+
+        # A change in the from/ resources invalidates the cached index.
+        resource = make_resource_file(self.project1, path="from/c/file.ext")
+        index = d2d.get_resources_index(self.project1, from_resources)
+        match = pathmap.find_paths("c/file.ext", index)
+        self.assertEqual([resource.id], match.resource_ids)
+        self.assertEqual(2, len(list(self.project1.tmp_path.glob("pathmap-*.idx"))))
+
     def test_scanpipe_pipes_d2d_find_java_packages(self):
         input_locations = [
             self.data_location / "d2d" / "find_java_packages" / "Foo.java",
@@ -21,11 +21,14 @@
 # Visit https://github.com/nexB/scancode.io for support and download.
 
 import json
+import shutil
 import tempfile
 from pathlib import Path
+from unittest import mock
 
 from django.apps import apps
 from django.test import TestCase
+from django.test import override_settings
 
 from scanpipe.models import CodebaseResource
 from scanpipe.models import Project
@@ -125,6 +128,165 @@ class ScanPipeDockerPipesTest(TestCase):
         )
         self.assertResultsEqual(expected_location, results)
 
+    def test_pipes_docker_extract_layers_from_images_in_processes(self):
+        input_tarball = str(self.data_path / "docker-images.tar.gz")
+        extract_target = str(Path(tempfile.mkdtemp()) / "tempdir")
+        images, _ = docker.extract_image_from_tarball(
+            input_tarball, extract_target, verify=False
+        )
+
+        def get_extracted_files(processes):
+            base_path = Path(tempfile.mkdtemp())
+            with override_settings(SCANCODEIO_EXTRACT_PROCESSES=processes):
+                errors = docker.extract_layers_from_images_to_base_path(
+                    base_path=base_path, images=images
+                )
+            self.assertEqual([], errors)
+            return sorted(p.relative_to(base_path) for p in base_path.rglob("*"))
+
+        serial_files = get_extracted_files(processes=0)
+        self.assertTrue(serial_files)
+        self.assertEqual(serial_files, get_extracted_files(processes=2))
+
+    @override_settings(SCANCODEIO_EXTRACT_PROCESSES=2)
+    def test_pipes_docker_map_in_processes(self):
+        results = docker.map_in_processes(divmod, [7, 9, 11], [2, 3, 4])
+        self.assertEqual([(3, 1), (3, 0), (2, 3)], results)
+        self.assertEqual([], docker.map_in_processes(divmod, [], []))
+
+    def test_pipes_docker_extract_layers_from_images_with_layer_cache(self):
+        cache_location = Path(tempfile.mkdtemp())
+        layer_cache = docker.LayerCache(location=cache_location, max_size=10**9)
+        input_tarball = str(self.data_path / "docker-images.tar.gz")
+        extract_target = str(Path(tempfile.mkdtemp()) / "tempdir")
+        images, _ = docker.extract_image_from_tarball(
+            input_tarball, extract_target, verify=False
+        )
+        layer_ids = sorted(
+            {layer.layer_id for image in images for layer in image.layers}
+        )
+
+        base_path1 = Path(tempfile.mkdtemp())
+        errors = docker.extract_layers_from_images_to_base_path(
+            base_path=base_path1, images=images, layer_cache=layer_cache
+        )
+        self.assertEqual([], errors)
+        cached_layer_ids = [path.name for path in cache_location.iterdir()]
+        self.assertEqual(layer_ids, sorted(cached_layer_ids))
+        for layer_id in layer_ids:
+            self.assertTrue(layer_cache.get(layer_id))
+
+        base_path2 = Path(tempfile.mkdtemp())
+        with mock.patch("scanpipe.pipes.docker.extract_tar") as extract_tar:
+            errors = docker.extract_layers_from_images_to_base_path(
+                base_path=base_path2, images=images, layer_cache=layer_cache
+            )
+        self.assertEqual([], errors)
+        extract_tar.assert_not_called()
+        files1 = sorted(p.relative_to(base_path1) for p in base_path1.rglob("*"))
+        files2 = sorted(p.relative_to(base_path2) for p in base_path2.rglob("*"))
+        self.assertTrue(files1)
+        self.assertEqual(files1, files2)
+
+        # The files are copied from the cache, not linked
+        file2 = next(path for path in base_path2.rglob("*") if path.is_file())
+        _, layer_id, *tree_path = file2.relative_to(base_path2).parts
+        cached_file = cache_location.joinpath(layer_id, "tree", *tree_path)
+        self.assertEqual(cached_file.read_bytes(), file2.read_bytes())
+        self.assertNotEqual(cached_file.stat().st_ino, file2.stat().st_ino)
+        file2.write_text("modified")
+        self.assertNotEqual(b"modified", cached_file.read_bytes())
+
+        # The least recently used layers are evicted first
+        layer_cache.get(layer_ids[0])
+        entries = layer_cache.get_entries()
+        sizes = {path.name: size for _, size, path in entries}
+        layer_cache.max_size = sizes[layer_ids[0]]
+        self.assertEqual(len(layer_ids), len(entries))
+        layer_cache.evict()
+        self.assertEqual([layer_ids[0]], [p.name for p in cache_location.iterdir()])
+
+    def test_pipes_docker_layer_cache_concurrent_copy_and_evict(self):
+        cache_location = Path(tempfile.mkdtemp())
+        layer_cache = docker.LayerCache(location=cache_location, max_size=0)
+        input_tarball = str(self.data_path / "docker-images.tar.gz")
+        extract_target = str(Path(tempfile.mkdtemp()) / "tempdir")
+        images, _ = docker.extract_image_from_tarball(
+            input_tarball, extract_target, verify=False
+        )
+        layer = images[0].layers[0]
+        entry_path = layer_cache.add(layer.layer_id, layer.archive_location)
+
+        # The entries copied by other projects are not evicted
+        with layer_cache.lock_entry(entry_path) as locked:
+            self.assertTrue(locked)
+            layer_cache.evict()
+            self.assertTrue(layer_cache.get(layer.layer_id))
+
+        layer_cache.evict()
+        self.assertIsNone(layer_cache.get(layer.layer_id))
+        with layer_cache.lock_entry(entry_path) as locked:
+            self.assertFalse(locked)
+
+        # The layer is extracted from its archive when the entry was evicted
+        target_path = Path(tempfile.mkdtemp()) / "layer"
+        with mock.patch.object(layer_cache, "add", return_value=entry_path):
+            errors = layer_cache.extract_layer(
+                layer.layer_id, layer.archive_location, target_path
+            )
+        self.assertEqual([], errors)
+        self.assertTrue(list(target_path.rglob("*")))
+
+        # or when the entry cannot be copied
+        target_path = Path(tempfile.mkdtemp()) / "layer"
+        copytree = "scanpipe.pipes.docker.shutil.copytree"
+        with mock.patch(copytree, side_effect=shutil.Error("error")) as mock_copy:
+            errors = layer_cache.extract_layer(
+                layer.layer_id, layer.archive_location, target_path
+            )
+        mock_copy.assert_called_once()
+        self.assertEqual([], errors)
+        self.assertTrue(list(target_path.rglob("*")))
+
+    def test_pipes_docker_create_codebase_resources_with_layer_cache(self):
+        input_tarball = str(self.data_path / "docker-images.tar.gz")
+        cache_location = tempfile.mkdtemp()
+
+        def create_project_resources(name):
+            project = Project.objects.create(name=name)
+            images, _ = docker.extract_image_from_tarball(
+                input_tarball, project.tmp_path / "images", verify=False
+            )
+            docker.extract_layers_from_images(project, images)
+            docker.create_codebase_resources(project, images[0])
+            return project
+
+        with override_settings(
+            SCANCODEIO_LAYER_CACHE=True,
+            SCANCODEIO_LAYER_CACHE_LOCATION=cache_location,
+            SCANCODEIO_SCAN_CACHE=True,
+        ):
+            p1 = create_project_resources("Analysis1")
+            get_resources_info = "scanpipe.pipes.scancode.get_resources_info"
+            with mock.patch(get_resources_info) as mock_get_resources_info:
+                p2 = create_project_resources("Analysis2")
+            mock_get_resources_info.assert_not_called()
+
+        fields = ["path", "rootfs_path", "tag", "type", "sha1", "mime_type"]
+        resources1 = list(p1.codebaseresources.order_by("path").values(*fields))
+        resources2 = list(p2.codebaseresources.order_by("path").values(*fields))
+        self.assertTrue(resources1)
+        self.assertEqual(resources1, resources2)
+
+    def test_pipes_docker_get_layer_cache(self):
+        self.assertIsNone(docker.get_layer_cache())
+
+        with override_settings(SCANCODEIO_LAYER_CACHE=True):
+            self.assertIsNone(docker.get_layer_cache())
+
+        with override_settings(SCANCODEIO_LAYER_CACHE=True, SCANCODEIO_SCAN_CACHE=True):
+            self.assertIsInstance(docker.get_layer_cache(), docker.LayerCache)
+
     def test_pipes_docker_get_tarballs_from_inputs(self):
         p1 = Project.objects.create(name="Analysis")
         _, tar = tempfile.mkstemp(suffix=".tar")
@@ -21,18 +21,24 @@
 # Visit https://github.com/nexB/scancode.io for support and download.
 
 import collections
+import io
 import json
 import shutil
 import tempfile
 from dataclasses import dataclass
 from pathlib import Path
 from unittest import mock
+from unittest import skipIf
 
+from django.apps import apps
 from django.conf import settings
 from django.core.management import call_command
 from django.test import TestCase
 
+import openpyxl
 import xlsxwriter
+from cyclonedx import output as cyclonedx_output
+from cyclonedx.model import bom as cyclonedx_bom
 from licensedcode.cache import get_licensing
 from lxml import etree  # nosec
 from scancode_config import __version__ as scancode_toolkit_version
@@ -41,10 +47,21 @@ from scanpipe import pipes
 from scanpipe.models import CodebaseResource
 from scanpipe.models import Project
 from scanpipe.models import ProjectMessage
+from scanpipe.pipes import cyclonedx
 from scanpipe.pipes import output
 from scanpipe.tests import FIXTURES_REGEN
+from scanpipe.tests import dependency_data1
+from scanpipe.tests import make_resource_file
 from scanpipe.tests import mocked_now
 from scanpipe.tests import package_data1
+from scanpipe.tests import package_data2
+
+try:
+    import pyarrow  # NOQA: F401
+
+    pyarrow_installed = True
+except ModuleNotFoundError:
+    pyarrow_installed = False
 
 
 def make_config_directory(project):
@@ -217,10 +234,148 @@ class ScanPipeOutputPipesTest(TestCase):
 
         # Make sure the output can be generated even if the work_directory was wiped
         shutil.rmtree(project.work_directory)
-        with self.assertNumQueries(8):
+        with self.assertNumQueries(6):
             output_file = output.to_xlsx(project=project)
         self.assertIn(output_file.name, project.output_root)
 
+    def test_scanpipe_pipes_outputs_queryset_to_xlsx_worksheet_values(self):
+        from scanpipe.api.serializers import get_serializer_fields
+
+        fixtures = self.data_path / "asgiref-3.3.0_fixtures.json"
+        call_command("loaddata", fixtures, **{"verbosity": 0})
+        project = Project.objects.get(name="asgiref")
+        ProjectMessage.objects.create(
+            project=project,
+            severity=ProjectMessage.Severity.ERROR,
+            description="Error\r\nDescription",
+            model="Model",
+            details={"key": "value"},
+        )
+        resource1 = make_resource_file(project, dependency_data1["datafile_path"])
+        resource2 = make_resource_file(project, "to/file.txt", status="mapped")
+        pipes.make_relation(
+            resource1, resource2, "path", extra_data={"path_score": "1/1"}
+        )
+        package = project.discoveredpackages.first()
+        pipes.update_or_create_dependency(project, dependency_data1, package)
+
+        model_names = [
+            "discoveredpackage",
+            "discovereddependency",
+            "codebaseresource",
+            "codebaserelation",
+            "projectmessage",
+        ]
+
+        output_dir = Path(tempfile.mkdtemp())
+        instances_file = output_dir / "instances.xlsx"
+        values_file = output_dir / "values.xlsx"
+        with xlsxwriter.Workbook(instances_file) as workbook:
+            for model_name in model_names:
+                queryset = output.get_queryset(project, model_name)
+                output._add_xlsx_worksheet(
+                    workbook=workbook,
+                    worksheet_name=model_name,
+                    rows=queryset,
+                    fields=get_serializer_fields(queryset.model),
+                )
+
+        with xlsxwriter.Workbook(values_file, {"constant_memory": True}) as workbook:
+            for model_name in model_names:
+                queryset = output.get_queryset(project, model_name)
+                output.queryset_to_xlsx_worksheet(queryset, workbook)
+
+        instances_workbook = openpyxl.load_workbook(instances_file, read_only=True)
+        values_workbook = openpyxl.load_workbook(values_file, read_only=True)
+        for model_name in model_names:
+            worksheet_name = output.model_name_to_worksheet_name[model_name]
+            expected = list(instances_workbook[model_name].values)
+            results = list(values_workbook[worksheet_name].values)
+            self.assertEqual(expected, results, msg=model_name)
+
+    def test_scanpipe_pipes_outputs_serializer_computed_fields(self):
+        from scanpipe.api.serializers import get_serializer_fields
+
+        # Each serializer field must be either a database column or a computed
+        # field, to keep the XLSX and Parquet outputs in sync with the serializers.
+        for model_name in output.model_name_to_worksheet_name.keys():
+            model_class = apps.get_model("scanpipe", model_name)
+            columns = [
+                field.name
+                for field in model_class._meta.concrete_fields
+                if not field.is_relation
+            ]
+            computed_fields = [
+                *output.serializer_computed_fields.get(model_name, {}).keys(),
+                *output.serializer_chunk_computed_fields.get(model_name, {}).keys(),
+            ]
+            for field_name in get_serializer_fields(model_class):
+                self.assertIn(field_name, columns + computed_fields, msg=model_name)
+
+    @skipIf(not pyarrow_installed, "The `pyarrow` library is not installed.")
+    def test_scanpipe_pipes_outputs_to_parquet(self):
+        from pyarrow import parquet
+
+        fixtures = self.data_path / "asgiref-3.3.0_fixtures.json"
+        call_command("loaddata", fixtures, **{"verbosity": 0})
+        project = Project.objects.get(name="asgiref")
+        ProjectMessage.objects.create(
+            project=project,
+            severity=ProjectMessage.Severity.ERROR,
+            description="Error",
+            model="Model",
+            details={"key": "value"},
+        )
+
+        output_files = output.to_parquet(project=project)
+        self.assertEqual(5, len(output_files))
+        for output_file in output_files:
+            self.assertIn(output_file.name, project.output_root)
+
+        resources_file = [
+            output_file
+            for output_file in output_files
+            if output_file.name.startswith("codebaseresource")
+        ][0]
+        path = "asgiref-3.3.0-py3-none-any.whl-extract/asgiref-3.3.0.dist-info/LICENSE"
+        table = parquet.read_table(
+            resources_file,
+            columns=["path", "size", "copyrights", "license_detections"],
+            filters=[("path", "=", path)],
+        )
+        self.assertEqual(1, table.num_rows)
+
+        resource = project.codebaseresources.get(path=path)
+        results = table.to_pylist()[0]
+        self.assertEqual(resource.size, results["size"])
+        self.assertEqual(resource.copyrights, results["copyrights"])
+        detection = results["license_detections"][0]
+        expected = resource.license_detections[0]
+        self.assertEqual(expected["identifier"], detection["identifier"])
+        self.assertEqual(
+            expected["matches"][0]["score"], detection["matches"][0]["score"]
+        )
+        self.assertEqual(
+            expected["matches"][0]["rule_url"], detection["matches"][0]["rule_url"]
+        )
+
+        messages_file = [
+            output_file
+            for output_file in output_files
+            if output_file.name.startswith("projectmessage")
+        ][0]
+        results = parquet.read_table(messages_file).to_pylist()
+        self.assertEqual('{"key": "value"}', results[0]["details"])
+        self.assertEqual("error", results[0]["severity"])
+
+        # Values that do not match the declared nested type are stored as JSON
+        resource.update(copyrights=["Copyright (c) as a string"])
+        output_file = output.to_parquet(project=project)[2]
+        table = parquet.read_table(output_file, filters=[("path", "=", path)])
+        results = table.to_pylist()[0]
+        self.assertEqual('["Copyright (c) as a string"]', results["copyrights"])
+        self.assertEqual(resource.holders, results["holders"])
+
     def test_scanpipe_pipes_outputs_to_cyclonedx(self, regen=FIXTURES_REGEN):
         fixtures = self.data_path / "asgiref-3.3.0_fixtures.json"
         call_command("loaddata", fixtures, **{"verbosity": 0})
@@ -246,12 +401,104 @@ class ScanPipeOutputPipesTest(TestCase):
 
         self.assertJSONEqual(results, expected_location.read_text())
 
+    def test_scanpipe_pipes_outputs_to_cyclonedx_streamed_components(self):
+        project = Project.objects.create(name="Analysis")
+        make_resource_file(project, dependency_data1["datafile_path"])
+        package1 = pipes.update_or_create_package(project, package_data1)
+        package2 = pipes.update_or_create_package(project, package_data2)
+        pipes.update_or_create_dependency(project, dependency_data1, package1)
+        dependency_data = {
+            **dependency_data1,
+            "purl": package2.package_url,
+            "dependency_uid": "pkg:deb/debian/adduser@3.119?uuid=fixed",
+        }
+        pipes.update_or_create_dependency(project, dependency_data, package1)
+
+        output_file = output.to_cyclonedx(project=project, chunk_size=1)
+        results_json = json.loads(output_file.read_text())
+        cyclonedx.validate_document(results_json)
+
+        bom = output.get_cyclonedx_bom(project)
+        outputter = cyclonedx_output.get_instance(
+            bom=bom, output_format=cyclonedx_output.OutputFormat.JSON
+        )
+        expected_json = json.loads(outputter.output_as_string())
+        self.assertEqual(expected_json["components"], results_json["components"])
+
+        expected_dependencies = [
+            {
+                "ref": str(project.uuid),
+                "dependsOn": [package1.package_url, package2.package_url],
+            },
+            {
+                "ref": package1.package_url,
+                "dependsOn": [package2.package_url],
+            },
+            {
+                "ref": package2.package_url,
+                "dependsOn": [],
+            },
+        ]
+        self.assertEqual(expected_dependencies, results_json["dependencies"])
+
+        empty_project = Project.objects.create(name="Empty")
+        output_file = output.to_cyclonedx(project=empty_project)
+        results_json = json.loads(output_file.read_text())
+        self.assertNotIn("components", results_json)
+        cyclonedx.validate_document(results_json)
+
+    def test_scanpipe_pipes_outputs_get_cyclonedx_component_data(self):
+        project = Project.objects.create(name="Analysis")
+        package = pipes.update_or_create_package(project, package_data1)
+        component = package.as_cyclonedx()
+
+        bom = cyclonedx_bom.Bom(components=[component])
+        outputter = cyclonedx_output.get_instance(
+            bom=bom, output_format=cyclonedx_output.OutputFormat.JSON
+        )
+        # The private method is part of the cyclonedx-python-lib pinned version.
+        self.assertTrue(hasattr(outputter, "_specialise_component_data"))
+
+        expected = json.loads(outputter.output_as_string())["components"][0]
+        component_data = output.get_cyclonedx_component_data(component, outputter)
+        self.assertEqual(expected, component_data)
+
+    def test_scanpipe_pipes_outputs_write_json_stream(self):
+        data = {
+            "name": "document",
+            "info": {"created": "2000-01-01", "creators": ["a", "b"]},
+            "items": [{"key": "value\nwith newline", "list": [1, 2]}, {}],
+            "empty": [],
+            "omitted": [],
+        }
+        stream_data = {
+            key: iter(value) if isinstance(value, list) else value
+            for key, value in data.items()
+        }
+
+        output_file = io.StringIO()
+        output.write_json_stream(output_file, stream_data, omit_empty=["omitted"])
+        del data["omitted"]
+        self.assertEqual(json.dumps(data, indent=2), output_file.getvalue())
+
+        output_file = io.StringIO()
+        output.write_json_stream(output_file, {})
+        self.assertEqual(json.dumps({}, indent=2), output_file.getvalue())
+
+        data = {"refs": [{"ref": "a", "dependsOn": ["b", "c"]}, {"ref": "b"}]}
+        stream_data = {
+            "refs": iter([{"ref": "a", "dependsOn": iter(["b", "c"])}, {"ref": "b"}])
+        }
+        output_file = io.StringIO()
+        output.write_json_stream(output_file, stream_data, indent=None)
+        self.assertEqual(json.dumps(data), output_file.getvalue())
+
     def test_scanpipe_pipes_outputs_to_spdx(self):
         fixtures = self.data_path / "asgiref-3.3.0_fixtures.json"
         call_command("loaddata", fixtures, **{"verbosity": 0})
         project = Project.objects.get(name="asgiref")
 
-        with self.assertNumQueries(8):
+        with self.assertNumQueries(6):
             output_file = output.to_spdx(project=project, include_files=True)
         self.assertIn(output_file.name, project.output_root)
 
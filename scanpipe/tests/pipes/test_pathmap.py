@@ -20,6 +20,8 @@
 # ScanCode.io is a free software code scanning tool from nexB Inc. and others.
 # Visit https://github.com/nexB/scancode.io for support and download.
 
+import tempfile
+from pathlib import Path
 from typing import NamedTuple
 
 from django.test import TestCase
@@ -162,6 +164,23 @@ class ScanPipePathmapPipesTest(TestCase):
         expected = Match(matched_path_length=2, resource_ids=[3])
         self.assertEqual(expected, match)
 
+    def test_scanpipe_pipes_pathmap_save_and_load_index(self):
+        resource_id_and_paths = (
+            (1, "RouterStub.java"),
+            (3, "samples/JGroups/src/RouterStub.java"),
+        )
+        index = pathmap.build_index(resource_id_and_paths)
+        index_location = Path(tempfile.mkdtemp()) / "pathmap.idx"
+        pathmap.save_index(index, index_location)
+        self.assertEqual(
+            ["pathmap.idx"], [p.name for p in index_location.parent.iterdir()]
+        )
+
+        loaded_index = pathmap.load_index(index_location)
+        match = pathmap.find_paths("src/RouterStub.java", loaded_index)
+        expected = Match(matched_path_length=2, resource_ids=[3])
+        self.assertEqual(expected, match)
+
     def test_scanpipe_pipes_pathmap_find_paths_without_subpath_index(self):
         resource_id_and_paths = (
             (1, "RouterStub.java"),
@@ -273,3 +292,60 @@ class ScanPipePathmapPipesTest(TestCase):
         match = pathmap.find_paths(lookup_path, index)
         expected = Match(matched_path_length=1, resource_ids=[5])
         self.assertEqual(expected, match)
+
+    def test_scanpipe_pipes_pathmap_suffix_index_find_paths_with_subpath_index(self):
+        resource_id_and_paths = (
+            (1, "RouterStub.java"),
+            (2, "samples/screenshot.png"),
+            (3, "samples/JGroups/src/RouterStub.java"),
+            (4, "src/screenshot.png"),
+            (5, "samples/file.class"),
+            (6, "samples/json"),
+        )
+        index = pathmap.build_index(resource_id_and_paths, compact=True)
+        self.assertIsInstance(index, pathmap.SuffixIndex)
+
+        lookups = [
+            ("other/src/RouterStub.java", Match(2, [3])),
+            ("RouterStub.java", Match(1, [1, 3])),
+            ("screenshot.png", Match(1, [2, 4])),
+            ("json/subpath/file.class", Match(1, [5])),
+            ("samples/JGroups/src/File.ext", None),
+            ("samples", None),
+        ]
+        for lookup_path, expected in lookups:
+            self.assertEqual(expected, pathmap.find_paths(lookup_path, index))
+
+    def test_scanpipe_pipes_pathmap_suffix_index_find_paths_without_subpath_index(
+        self,
+    ):
+        resource_id_and_paths = (
+            (1, "org/apache/commons/RouterStub.java"),
+            (2, "org/apache/commons/Food.java"),
+            (3, "org/apache/jakarta/Food.java"),
+            (4, "Food.java"),
+            (5, "org/apache/commons/bar/Food.java"),
+            (6, "org/apache/commons/Food.java"),
+        )
+        index = pathmap.build_index(
+            resource_id_and_paths, with_subpaths=False, compact=True
+        )
+
+        lookups = [
+            ("org/apache/commons/Food.java", Match(4, [2, 6])),
+            ("apache/commons/Food.java", Match(1, [4])),
+            ("other/org/apache/jakarta/Food.java", Match(4, [3])),
+            ("apache/commons/RouterStub.java", None),
+        ]
+        for lookup_path, expected in lookups:
+            self.assertEqual(expected, pathmap.find_paths(lookup_path, index))
+
+    def test_scanpipe_pipes_pathmap_suffix_index_save_and_load_index(self):
+        resource_id_and_paths = ((1, "samples/JGroups/src/RouterStub.java"),)
+        index = pathmap.build_index(resource_id_and_paths, compact=True)
+        index_location = Path(tempfile.mkdtemp()) / "pathmap.sfx"
+        pathmap.save_index(index, index_location)
+
+        loaded_index = pathmap.load_index(index_location, compact=True)
+        match = pathmap.find_paths("src/RouterStub.java", loaded_index)
+        self.assertEqual(Match(matched_path_length=2, resource_ids=[1]), match)
@@ -199,6 +199,36 @@ class ScanPipePipesTest(TestCase):
         self.assertEqual("java_to_class", relation.map_type)
         self.assertEqual({"extra": "data"}, relation.extra_data)
 
+    def test_scanpipe_pipes_relation_writer(self):
+        p1 = Project.objects.create(name="Analysis")
+        from1 = make_resource_file(p1, "from/a.txt")
+        to1 = make_resource_file(p1, "to/a.txt")
+        to2 = make_resource_file(p1, "to/b.txt")
+        pipes.make_relation(from1, to1, map_type="path")
+
+        with self.assertNumQueries(3):
+            with pipes.RelationWriter(p1) as relation_writer:
+                relation_writer.add_relation(from1, to1, map_type="path")
+                relation_writer.add_relation(from1, to1, map_type="sha1")
+                relation_writer.add_relation(from1, to1, map_type="sha1")
+                relation_writer.add_relation(from1, to2, map_type="path")
+                relation_writer.set_status(to1, flag.MAPPED)
+                relation_writer.set_status(to2, flag.MAPPED)
+                relation_writer.set_status(from1, flag.TOO_MANY_MAPS)
+                self.assertEqual(flag.MAPPED, to1.status)
+
+        self.assertEqual(3, relation_writer.relation_count)
+        self.assertEqual(3, relation_writer.status_count)
+        self.assertEqual(3, p1.codebaserelations.count())
+        self.assertEqual(2, p1.codebaseresources.status(flag.MAPPED).count())
+        from1.refresh_from_db()
+        self.assertEqual(flag.TOO_MANY_MAPS, from1.status)
+
+        relation_writer = pipes.RelationWriter(p1, batch_size=1)
+        relation_writer.add_relation(to1, from1, map_type="path")
+        self.assertEqual(4, p1.codebaserelations.count())
+        self.assertEqual({}, relation_writer.relations)
+
 
 class ScanPipePipesTransactionTest(TransactionTestCase):
     """
@@ -326,6 +356,40 @@ class ScanPipePipesTransactionTest(TransactionTestCase):
             get_text_str_diff_ratio(1, 2)
         self.assertEqual("Values must be str", str(error.exception))
 
+    def test_scanpipe_pipes_get_fingerprint_diff_ratio(self):
+        texts = [
+            "",
+            "a",
+            "a\nb\nc",
+            "a\na\nb\n\nd",
+            "b\na\nd\na\na\r\ne",
+        ]
+        for text_a in texts:
+            for text_b in texts:
+                self.assertEqual(
+                    get_text_str_diff_ratio(text_a, text_b),
+                    pipes.get_fingerprint_diff_ratio(
+                        pipes.get_text_lines_fingerprint(text_a),
+                        pipes.get_text_lines_fingerprint(text_b),
+                    ),
+                )
+
+    def test_scanpipe_pipes_get_location_lines_fingerprint_is_cached(self):
+        project1 = Project.objects.create(name="Analysis")
+        input_location = self.data_location / "codebase" / "a.txt"
+        copy_input(input_location, project1.codebase_path)
+        resource1 = make_resource_file(project1, "a.txt")
+        pipes.get_location_lines_fingerprint.cache_clear()
+
+        with mock.patch.object(
+            CodebaseResource,
+            "read_file_content",
+            wraps=CodebaseResource.read_file_content,
+        ) as read_file_content:
+            get_resource_diff_ratio(resource1, resource1)
+            get_resource_diff_ratio(resource1, resource1)
+        read_file_content.assert_called_once_with(resource1.location)
+
     def test_scanpipe_pipes_get_resource_codebase_root(self):
         p1 = Project.objects.create(name="Analysis")
         input_location = self.data_location / "codebase" / "a.txt"
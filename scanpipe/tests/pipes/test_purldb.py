@@ -0,0 +1,96 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.test import override_settings
+
+from scanpipe.pipes import purldb
+
+
+@override_settings(PURLDB_CACHE=True)
+class ScanPipePurlDBTest(TestCase):
+    def setUp(self):
+        caches["purldb"].clear()
+        purldb.response_cache.reset_stats()
+
+    @mock.patch("scanpipe.pipes.purldb.request_post")
+    def test_scanpipe_pipes_purldb_match_resources_cache(self, mock_request_post):
+        result1 = {"package": "http://example.com/api/packages/1/", "sha1": "sha1"}
+        mock_request_post.return_value = {"count": 1, "results": [result1]}
+
+        results = purldb.match_resources(sha1_list=["sha1", "other"])
+        self.assertEqual([result1], results)
+        self.assertEqual(0, purldb.response_cache.hits)
+        self.assertEqual(2, purldb.response_cache.misses)
+
+        # Both the match and the miss are served from the cache.
+        results = purldb.match_resources(sha1_list=["sha1", "other"])
+        self.assertEqual([result1], results)
+        self.assertEqual(1, mock_request_post.call_count)
+        expected = "PurlDB cache: 2 hits, 2 misses (50.0% hit rate)"
+        self.assertEqual(expected, purldb.response_cache.get_stats_message())
+
+        # Only the sha1 values without cached results are sent.
+        mock_request_post.return_value = {"count": 0, "results": []}
+        results = purldb.match_resources(sha1_list=["sha1", "new"])
+        self.assertEqual([result1], results)
+        self.assertEqual(["new"], mock_request_post.call_args.kwargs["data"]["sha1"])
+
+        # The packages lookups are cached separately.
+        results = purldb.match_packages(sha1_list=["sha1"])
+        self.assertEqual([], results)
+        self.assertEqual(3, mock_request_post.call_count)
+
+    @mock.patch("scanpipe.pipes.purldb.request_post")
+    def test_scanpipe_pipes_purldb_match_resources_cache_request_failure(
+        self, mock_request_post
+    ):
+        mock_request_post.return_value = None
+        self.assertEqual([], purldb.match_resources(sha1_list=["sha1"]))
+        self.assertEqual([], purldb.match_resources(sha1_list=["sha1"]))
+        # Failed requests are not cached.
+        self.assertEqual(2, mock_request_post.call_count)
+
+    @mock.patch("scanpipe.pipes.purldb._request_get")
+    def test_scanpipe_pipes_purldb_request_get_cache(self, mock_request_get):
+        package_url = "http://example.com/api/packages/1/"
+        mock_request_get.return_value = {"name": "package"}
+        self.assertEqual({"name": "package"}, purldb.request_get(package_url))
+        self.assertEqual({"name": "package"}, purldb.request_get(package_url))
+        self.assertEqual(1, mock_request_get.call_count)
+
+        mock_request_get.return_value = []
+        self.assertIsNone(purldb.match_directory("fingerprint"))
+        self.assertIsNone(purldb.match_directory("fingerprint"))
+        self.assertEqual(2, mock_request_get.call_count)
+
+        mock_request_get.return_value = None
+        self.assertIsNone(purldb.request_get(f"{package_url}2/"))
+        self.assertIsNone(purldb.request_get(f"{package_url}2/"))
+        self.assertEqual(4, mock_request_get.call_count)
+
+        with override_settings(PURLDB_CACHE=False):
+            purldb.request_get(package_url)
+        self.assertEqual(5, mock_request_get.call_count)
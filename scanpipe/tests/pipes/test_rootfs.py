@@ -30,6 +30,7 @@ from commoncode.archive import extract_tar
 from scanpipe.models import CodebaseResource
 from scanpipe.models import Project
 from scanpipe.pipes import rootfs
+from scanpipe.tests import package_data1
 
 
 class ScanPipeRootfsPipesTest(TestCase):
@@ -48,6 +49,26 @@ class ScanPipeRootfsPipesTest(TestCase):
         self.assertEqual("windows", distro.os)
         self.assertEqual("windows", distro.identifier)
 
+    def test_scanpipe_pipes_rootfs_create_codebase_resources(self):
+        p1 = Project.objects.create(name="Analysis")
+        input_location = str(self.data_location / "windows-container-rootfs.tar")
+        extract_tar(input_location, target_dir=p1.codebase_path)
+        rfs = list(rootfs.RootFs.from_project_codebase(p1))[0]
+        resource_count = len(list(rfs.get_resources(with_dir=True)))
+
+        rootfs.create_codebase_resources(p1, rfs)
+        self.assertEqual(resource_count, p1.codebaseresources.count())
+        resource = p1.codebaseresources.files().first()
+        self.assertTrue(resource.sha1)
+        self.assertTrue(resource.path.endswith(resource.rootfs_path))
+        path_prefix = rootfs.get_rootfs_path_prefix(p1, rfs)
+        self.assertEqual(f"{Path(rfs.location).name}/", path_prefix)
+        self.assertTrue(resource.path.startswith(path_prefix))
+
+        # Existing paths are skipped
+        rootfs.create_codebase_resources(p1, rfs)
+        self.assertEqual(resource_count, p1.codebaseresources.count())
+
     def test_scanpipe_pipes_rootfs_flag_uninteresting_codebase_resources(self):
         p1 = Project.objects.create(name="Analysis")
         resource1 = CodebaseResource.objects.create(project=p1, path="filename.ext")
@@ -72,6 +93,59 @@ class ScanPipeRootfsPipesTest(TestCase):
         codebase_resource = CodebaseResource(sha256="sha256", md5="md5")
         self.assertFalse(rootfs.has_hash_diff(install_file, codebase_resource))
 
+    def test_scanpipe_pipes_rootfs_create_system_package(self):
+        p1 = Project.objects.create(name="Analysis")
+        resource1 = CodebaseResource.objects.create(
+            project=p1, path="rootfs/usr/bin/file", rootfs_path="/usr/bin/file", md5="a"
+        )
+        resource2 = CodebaseResource.objects.create(
+            project=p1, path="rootfs/usr/lib/lib.so", rootfs_path="/usr/lib/lib.so"
+        )
+        # Same rootfs_path in another rootfs of the project
+        CodebaseResource.objects.create(
+            project=p1, path="other/usr/bin/file", rootfs_path="/usr/bin/file"
+        )
+
+        def make_install_file(path, md5):
+            install_file = mock.Mock(spec=["path", "get_path", "md5"], md5=md5)
+            install_file.path = path
+            install_file.get_path.return_value = path
+            return install_file
+
+        package = mock.Mock()
+        package.to_dict.return_value = package_data1
+        package.resources = [
+            make_install_file("/usr/bin/file", md5="b"),
+            make_install_file("/usr/lib/lib.so", md5=""),
+            make_install_file("/usr/share/missing", md5=""),
+        ]
+
+        resources_by_rootfs_path = rootfs.get_resources_by_rootfs_path(p1, "rootfs/")
+        self.assertEqual(2, len(resources_by_rootfs_path))
+        self.assertEqual([resource1], resources_by_rootfs_path["/usr/bin/file"])
+
+        with self.assertNumQueries(6):
+            rootfs._create_system_package(
+                p1, "pkg:deb/debian/adduser", package, resources_by_rootfs_path
+            )
+
+        discovered_package = p1.discoveredpackages.get()
+        self.assertEqual(
+            [resource1, resource2],
+            list(discovered_package.codebase_resources.order_by("path")),
+        )
+        self.assertEqual(["/usr/share/missing"], discovered_package.missing_resources)
+        self.assertEqual(["/usr/bin/file"], discovered_package.modified_resources)
+        resource1.refresh_from_db()
+        self.assertEqual("system-package", resource1.status)
+
+        # Already related resources are skipped
+        rootfs._create_system_package(
+            p1, "pkg:deb/debian/adduser", package, path_prefix="rootfs/"
+        )
+        self.assertEqual(2, discovered_package.codebase_resources.count())
+        self.assertEqual(["/usr/share/missing"], discovered_package.missing_resources)
+
     def test_scanpipe_pipes_rootfs_flag_ignorable_codebase_resources(self):
         p1 = Project.objects.create(name="Analysis")
         resource1 = CodebaseResource.objects.create(
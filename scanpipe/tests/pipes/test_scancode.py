@@ -20,6 +20,8 @@
 # ScanCode.io is a free software code scanning tool from nexB Inc. and others.
 # Visit https://github.com/nexB/scancode.io for support and download.
 
+import concurrent.futures
+import gzip
 import json
 import os
 import sys
@@ -30,6 +32,8 @@ from unittest import mock
 from unittest import skipIf
 
 from django.apps import apps
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
 from django.test import TestCase
 from django.test import override_settings
 
@@ -70,6 +74,57 @@ class ScanPipeScancodePipesTest(TestCase):
         for path in expected:
             self.assertIn(path, results)
 
+    def test_scanpipe_pipes_scancode_extract_archives_in_processes(self):
+        def make_codebase():
+            tempdir = Path(tempfile.mkdtemp())
+            (tempdir / "dir").mkdir()
+            (tempdir / "dir-extract").mkdir()
+            paths = ["a.txt.gz", "dir/b.txt.gz", "dir-extract/c.txt.gz"]
+            for index, path in enumerate(paths):
+                (tempdir / path).write_bytes(gzip.compress(f"content{index}".encode()))
+            return tempdir
+
+        def get_paths(tempdir):
+            return sorted(str(path.relative_to(tempdir)) for path in tempdir.rglob("*"))
+
+        def extract(processes, recurse):
+            tempdir = make_codebase()
+            progress_logger = mock.Mock()
+            with override_settings(SCANCODEIO_EXTRACT_PROCESSES=processes):
+                errors = scancode.extract_archives(
+                    tempdir, recurse=recurse, progress_logger=progress_logger
+                )
+            self.assertEqual([], errors)
+            return get_paths(tempdir), progress_logger.call_count
+
+        for recurse, expected_count in [(False, 2), (True, 3)]:
+            # Same results as the serial extractcode.api.extract_archives
+            tempdir = make_codebase()
+            events = scancode.extractcode_api.extract_archives(
+                str(tempdir), recurse=recurse, all_formats=True
+            )
+            self.assertEqual(expected_count, len([e for e in events if e.done]))
+            expected = (get_paths(tempdir), expected_count)
+            self.assertEqual(expected, extract(processes=2, recurse=recurse))
+            self.assertEqual(expected, extract(processes=0, recurse=recurse))
+
+        # No processes pool is started when only 1 process is allowed
+        executor_class = "concurrent.futures.ProcessPoolExecutor"
+        with mock.patch(executor_class) as mock_executor:
+            extract(processes=1, recurse=True)
+        mock_executor.assert_not_called()
+
+        # The archives paths are logged relative to the extracted location
+        tempdir = make_codebase()
+        progress_logger = mock.Mock()
+        with override_settings(SCANCODEIO_EXTRACT_PROCESSES=0):
+            scancode.extract_archives(tempdir, progress_logger=progress_logger)
+        logged_paths = sorted(
+            call.args[0].split(" in ")[0] for call in progress_logger.call_args_list
+        )
+        expected = ["Extracted a.txt.gz", "Extracted dir/b.txt.gz"]
+        self.assertEqual(expected, logged_paths)
+
     def test_scanpipe_pipes_scancode_extract_archives(self):
         tempdir = Path(tempfile.mkdtemp())
         input_location = str(self.data_location / "archive.zip")
@@ -144,6 +199,24 @@ class ScanPipeScancodePipesTest(TestCase):
         resource_info = scancode.get_resource_info(input_location)
         self.assertEqual(expected, resource_info)
 
+    def test_scanpipe_pipes_scancode_get_resources_info(self):
+        locations = [
+            str(self.data_location / "notice.NOTICE"),
+            str(self.data_location / "codebase"),
+            str(self.data_location / "codebase" / "a.txt"),
+        ]
+        expected = [
+            (location, scancode.get_resource_info(location)) for location in locations
+        ]
+
+        with override_settings(SCANCODEIO_PROCESSES=0):
+            results = list(scancode.get_resources_info(locations))
+        self.assertEqual(expected, results)
+
+        with override_settings(SCANCODEIO_PROCESSES=2):
+            results = list(scancode.get_resources_info(iter(locations), chunk_size=1))
+        self.assertEqual(expected, results)
+
     def test_scanpipe_pipes_scancode_scan_file(self):
         input_location = str(self.data_location / "notice.NOTICE")
         scan_results, scan_errors = scancode.scan_file(input_location)
@@ -290,6 +363,182 @@ class ScanPipeScancodePipesTest(TestCase):
         self.assertEqual("", resource3.detected_license_expression)
         self.assertEqual(["copy"], resource3.copyrights)
 
+    @mock.patch("scanpipe.pipes.scancode._scan_resource")
+    def test_scanpipe_pipes_scancode_scan_for_files_scan_results_batch_size(
+        self, mock_scan_resource
+    ):
+        scan_results = {"detected_license_expression": "mit"}
+        mock_scan_resource.return_value = scan_results, ["ERROR"]
+
+        project1 = Project.objects.create(
+            name="Analysis",
+            settings={"scan_results_batch_size": 2},
+        )
+        for index in range(3):
+            CodebaseResource.objects.create(project=project1, path=f"file{index}")
+
+        with override_settings(SCANCODEIO_PROCESSES=0):
+            scancode.scan_for_files(project1)
+
+        resources = project1.codebaseresources.all()
+        self.assertEqual(3, resources.status("scanned-with-error").count())
+        self.assertEqual(3, resources.filter(detected_license_expression="mit").count())
+        self.assertEqual(3, project1.projectmessages.count())
+        message = project1.projectmessages.first()
+        self.assertEqual("CodebaseResource", message.model)
+        self.assertEqual("ERROR", message.description)
+
+    def test_scanpipe_pipes_scancode_scan_results_writer(self):
+        project1 = Project.objects.create(name="Analysis")
+        resource1 = CodebaseResource.objects.create(project=project1, path="file1")
+        resource2 = CodebaseResource.objects.create(project=project1, path="file2")
+
+        writer = scancode.ScanResultsWriter(
+            scancode.set_scan_package_results, batch_size=2, flush_interval=3600
+        )
+        package_data = [{"type": "pypi", "name": "package"}]
+        writer.add(resource1, {"package_data": package_data}, [])
+        self.assertEqual(0, project1.codebaseresources.status().count())
+        self.assertEqual(0, writer.flush_count)
+
+        writer.add(resource2, {}, ["ERROR"])
+        self.assertEqual(1, writer.flush_count)
+        resource1.refresh_from_db()
+        self.assertEqual("application-package", resource1.status)
+        self.assertEqual(package_data, resource1.package_data)
+        resource2.refresh_from_db()
+        self.assertEqual("scanned-with-error", resource2.status)
+        self.assertEqual(1, project1.projectmessages.count())
+
+        writer.flush()
+        self.assertEqual(1, writer.flush_count)
+
+        writer.flush_interval = 0
+        writer.add(resource2, {}, ["ERROR"])
+        self.assertEqual(2, writer.flush_count)
+        self.assertEqual(2, project1.projectmessages.count())
+
+    def test_scanpipe_pipes_scancode_get_scan_results_writer(self):
+        project1 = Project.objects.create(name="Analysis")
+        set_func = scancode.set_scan_file_results
+        self.assertIsNone(scancode.get_scan_results_writer(project1, set_func))
+
+        project1.settings = {
+            "scan_results_batch_size": 500,
+            "scan_results_flush_interval": 5,
+        }
+        writer = scancode.get_scan_results_writer(project1, set_func)
+        self.assertEqual(500, writer.batch_size)
+        self.assertEqual(5, writer.flush_interval)
+        self.assertEqual(set_func, writer.set_func)
+
+    @mock.patch("scanpipe.pipes.scancode._scan_resource")
+    def test_scanpipe_pipes_scancode_scan_for_files_scan_cache(
+        self, mock_scan_resource
+    ):
+        caches["scan_results"].clear()
+        scan_results = {"detected_license_expression": "mit"}
+        mock_scan_resource.return_value = scan_results, []
+        sha1 = "51d28a27d919ce8690a40f4f335b9d591ceb16e9"
+
+        project1 = Project.objects.create(name="Analysis1")
+        CodebaseResource.objects.create(project=project1, path="file", sha1=sha1)
+        project2 = Project.objects.create(name="Analysis2")
+        CodebaseResource.objects.create(project=project2, path="file", sha1=sha1)
+        CodebaseResource.objects.create(project=project2, path="no_sha1")
+
+        with override_settings(SCANCODEIO_SCAN_CACHE=True, SCANCODEIO_PROCESSES=0):
+            scancode.scan_for_files(project1)
+            self.assertEqual(1, mock_scan_resource.call_count)
+            progress_logger = mock.Mock()
+            scancode.scan_for_files(project2, progress_logger=progress_logger)
+
+        # Only the resource without a sha1 was scanned, the other was a cache hit.
+        self.assertEqual(2, mock_scan_resource.call_count)
+        resources = project2.codebaseresources.all()
+        self.assertEqual(2, resources.status("scanned").count())
+        self.assertEqual(2, resources.filter(detected_license_expression="mit").count())
+        expected = "Scan results cache: 1 hits, 1 misses (50.0% hit rate)"
+        progress_logger.assert_called_with(expected)
+
+    def test_scanpipe_pipes_scancode_scan_results_cache(self):
+        scan_cache = scancode.ScanResultsCache(
+            scancode.scan_file, {"min_license_score": 50}, cache=LocMemCache("", {})
+        )
+        self.assertTrue(
+            scan_cache.key_prefix.startswith("scan_file:min_license_score=50")
+        )
+        resource1 = CodebaseResource(path="file1", sha1="sha1")
+        resource2 = CodebaseResource(path="file2", sha1="sha1")
+        resource3 = CodebaseResource(path="file3", sha1="other")
+
+        scan_cache.set(resource1, {"copyrights": ["copy"]}, ["ERROR"])
+        scan_cache.set(resource3, {}, [])
+        self.assertIsNone(scan_cache.get_key(CodebaseResource(path="no_sha1")))
+        self.assertEqual([scan_cache.get_key(resource3)], list(scan_cache.pending))
+        self.assertEqual({}, scan_cache.cache.get_many([scan_cache.get_key(resource3)]))
+        scan_cache.flush()
+        self.assertEqual({}, scan_cache.pending)
+        on_hit = mock.Mock()
+        misses = list(scan_cache.iter_misses([resource1, resource3], on_hit))
+        self.assertEqual([resource1], misses)
+        on_hit.assert_called_once_with(resource3, {})
+
+        scan_cache.write_batch_size = 1
+        scan_cache.set(resource1, {"copyrights": ["copy"]}, [])
+        misses = list(scan_cache.iter_misses([resource2], on_hit))
+        self.assertEqual([], misses)
+        on_hit.assert_called_with(resource2, {"copyrights": ["copy"]})
+        self.assertEqual(2, scan_cache.hits)
+        self.assertEqual(1, scan_cache.misses)
+        self.assertEqual(66.7, scan_cache.hit_rate)
+
+    def test_scanpipe_pipes_scancode_scan_results_cache_with_path(self):
+        scan_cache = scancode.ScanResultsCache(
+            scancode.scan_for_package_data, cache=LocMemCache("", {}), with_path=True
+        )
+        resource1 = CodebaseResource(path="a/package.json", sha1="sha1")
+        resource2 = CodebaseResource(path="a/notes.json", sha1="sha1")
+        resource3 = CodebaseResource(
+            path="b/package.json", rootfs_path="/package.json", sha1="sha1"
+        )
+        resource4 = CodebaseResource(
+            path="c/package.json", rootfs_path="/package.json", sha1="sha1"
+        )
+        self.assertNotEqual(
+            scan_cache.get_key(resource1), scan_cache.get_key(resource2)
+        )
+        self.assertNotEqual(
+            scan_cache.get_key(resource1), scan_cache.get_key(resource3)
+        )
+        self.assertEqual(scan_cache.get_key(resource3), scan_cache.get_key(resource4))
+
+    def test_scanpipe_pipes_scancode_scan_for_application_packages_scan_cache(self):
+        caches["scan_results"].clear()
+        content = json.dumps({"name": "package", "version": "1.0"})
+
+        def make_project(name, path):
+            project = Project.objects.create(name=name)
+            location = project.codebase_path / path
+            location.write_text(content)
+            resource_info = scancode.get_resource_info(str(location))
+            CodebaseResource.objects.create(project=project, path=path, **resource_info)
+            return project
+
+        # Same content with different names, only the package.json is a datafile.
+        project1 = make_project("Analysis1", "notes.json")
+        project2 = make_project("Analysis2", "package.json")
+        with override_settings(SCANCODEIO_SCAN_CACHE=True, SCANCODEIO_PROCESSES=0):
+            scancode.scan_for_application_packages(project1, assemble=False)
+            scancode.scan_for_application_packages(project2, assemble=False)
+
+        resource1 = project1.codebaseresources.get()
+        resource2 = project2.codebaseresources.get()
+        self.assertEqual(resource1.sha1, resource2.sha1)
+        self.assertEqual([], resource1.package_data)
+        self.assertEqual(1, len(resource2.package_data))
+        self.assertEqual("npm_package_json", resource2.package_data[0]["datasource_id"])
+
     @mock.patch("scanpipe.pipes.scancode.scan_resources")
     def test_scanpipe_pipes_scancode_scan_for_files_scancode_license_score(
         self, mock_scan_resources
@@ -362,6 +611,27 @@ class ScanPipeScancodePipesTest(TestCase):
         with_threading = scan_func.call_args[0][-1]
         self.assertTrue(with_threading)
 
+    def test_scanpipe_pipes_scancode_submit_as_completed(self):
+        consumed = []
+
+        def resources():
+            for index in range(10):
+                consumed.append(index)
+                yield mock.Mock(location=f"location{index}")
+
+        results = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            future_as_completed = scancode.submit_as_completed(
+                executor, str.upper, resources(), max_pending=3
+            )
+            for resource, future in future_as_completed:
+                # The submission window is bounded to `max_pending` in flight.
+                self.assertLessEqual(len(consumed) - len(results), 3)
+                results.append((resource.location, future.result()))
+
+        self.assertEqual(10, len(results))
+        self.assertIn(("location9", "LOCATION9"), results)
+
     @expectedFailure
     def test_scanpipe_pipes_scancode_virtual_codebase(self):
         project = Project.objects.create(name="asgiref")
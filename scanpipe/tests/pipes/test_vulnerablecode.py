@@ -0,0 +1,90 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.test import override_settings
+
+from scanpipe.pipes import vulnerablecode
+
+
+class ScanPipeVulnerableCodeTest(TestCase):
+    purl1 = "pkg:deb/debian/adduser@3.118"
+    purl2 = "pkg:deb/debian/passwd@4.8"
+    vulnerability_data1 = {
+        "purl": purl1,
+        "affected_by_vulnerabilities": [{"vulnerability_id": "VCID-cah8-awtr-aaad"}],
+    }
+
+    @mock.patch("scanpipe.pipes.vulnerablecode.bulk_search_by_purl")
+    def test_scanpipe_pipes_vulnerablecode_lookup_vulnerabilities(
+        self, mock_bulk_search
+    ):
+        mock_bulk_search.return_value = [self.vulnerability_data1]
+        results = vulnerablecode.lookup_vulnerabilities(
+            [self.purl1, self.purl2, self.purl1], chunk_size=1
+        )
+        self.assertEqual({self.purl1: self.vulnerability_data1}, results)
+        # Duplicated PURLs are only looked up once.
+        self.assertEqual(2, mock_bulk_search.call_count)
+
+    @mock.patch("scanpipe.pipes.vulnerablecode.bulk_search_by_purl")
+    def test_scanpipe_pipes_vulnerablecode_lookup_vulnerabilities_cache(
+        self, mock_bulk_search
+    ):
+        caches["vulnerablecode"].clear()
+        mock_bulk_search.return_value = [self.vulnerability_data1]
+        logger = mock.Mock()
+
+        with override_settings(VULNERABLECODE_CACHE=True):
+            vulnerablecode.lookup_vulnerabilities([self.purl1], logger=logger)
+            logger.assert_called_with("VulnerableCode cache: 0 hits, 1 misses")
+            results = vulnerablecode.lookup_vulnerabilities(
+                [self.purl1, self.purl2], logger=logger
+            )
+            logger.assert_called_with("VulnerableCode cache: 1 hits, 1 misses")
+            self.assertEqual([self.purl2], mock_bulk_search.call_args.args[0])
+            self.assertEqual({self.purl1: self.vulnerability_data1}, results)
+
+            # The PURLs without vulnerabilities are cached too.
+            vulnerablecode.lookup_vulnerabilities([self.purl2], logger=logger)
+            logger.assert_called_with("VulnerableCode cache: 1 hits, 0 misses")
+            self.assertEqual(2, mock_bulk_search.call_count)
+
+    @mock.patch("scanpipe.pipes.vulnerablecode.time.sleep")
+    @mock.patch("scanpipe.pipes.vulnerablecode.bulk_search_by_purl")
+    def test_scanpipe_pipes_vulnerablecode_bulk_search_by_purl_with_retries(
+        self, mock_bulk_search, mock_sleep
+    ):
+        mock_bulk_search.side_effect = [None, None, [self.vulnerability_data1]]
+        response_data = vulnerablecode.bulk_search_by_purl_with_retries([self.purl1])
+        self.assertEqual([self.vulnerability_data1], response_data)
+        self.assertEqual([mock.call(1), mock.call(2)], mock_sleep.call_args_list)
+
+        mock_bulk_search.side_effect = None
+        mock_bulk_search.return_value = None
+        with self.assertRaises(Exception) as error:
+            vulnerablecode.bulk_search_by_purl_with_retries([self.purl1])
+        expected = "VulnerableCode bulk search failed for 1 PURLs after 3 retries."
+        self.assertEqual(expected, str(error.exception))
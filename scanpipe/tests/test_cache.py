@@ -0,0 +1,103 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from scanpipe.cache import BulkDatabaseCache
+from scanpipe.cache import ShardedFileBasedCache
+
+
+class ScanPipeCacheTest(TestCase):
+    def test_scanpipe_cache_sharded_filebased_cache_location(self):
+        cache_dir = tempfile.mkdtemp()
+        cache = ShardedFileBasedCache(cache_dir, {})
+        cache.set("key", "value")
+        self.assertEqual("value", cache.get("key"))
+
+        fname = Path(cache._key_to_file("key"))
+        self.assertTrue(fname.exists())
+        self.assertEqual(Path(cache_dir) / fname.name[:2], fname.parent)
+        self.assertEqual([str(fname)], cache._list_cache_files())
+
+        cache.clear()
+        self.assertIsNone(cache.get("key"))
+
+    def test_scanpipe_cache_sharded_filebased_cache_cull_least_recently_used(self):
+        params = {"OPTIONS": {"MAX_ENTRIES": 4, "CULL_FREQUENCY": 2}}
+        cache = ShardedFileBasedCache(tempfile.mkdtemp(), params)
+        self.assertEqual(2, cache.cull_interval)
+
+        for index in range(4):
+            cache.set(f"key{index}", index)
+            os.utime(cache._key_to_file(f"key{index}"), (index, index))
+        # The cache hits make the entries the most recently used.
+        self.assertEqual(0, cache.get("key0"))
+
+        cache.cull()
+        self.assertEqual(2, len(cache._list_cache_files()))
+        self.assertEqual(0, cache.get("key0"))
+        self.assertEqual(3, cache.get("key3"))
+        self.assertIsNone(cache.get("key1"))
+        self.assertIsNone(cache.get("key2"))
+
+    def test_scanpipe_cache_sharded_filebased_cache_amortized_cull(self):
+        params = {"OPTIONS": {"MAX_ENTRIES": 30, "CULL_FREQUENCY": 3}}
+        cache = ShardedFileBasedCache(tempfile.mkdtemp(), params)
+
+        with mock.patch.object(cache, "cull") as mock_cull:
+            cache.set_many({f"key{index}": index for index in range(25)})
+        # Culled on the first write, then every MAX_ENTRIES / CULL_FREQUENCY writes.
+        self.assertEqual(3, mock_cull.call_count)
+
+    def test_scanpipe_cache_bulk_database_cache_set_many(self):
+        call_command("createcachetable", "scanpipe_test_cache")
+        params = {"OPTIONS": {"MAX_ENTRIES": 30, "CULL_FREQUENCY": 3}}
+        cache = BulkDatabaseCache("scanpipe_test_cache", params)
+        cache.batch_size = 2
+
+        data = {f"key{index}": {"index": index} for index in range(5)}
+        # The cull COUNT, then a DELETE and an INSERT in a transaction per batch.
+        with self.assertNumQueries(13):
+            self.assertEqual([], cache.set_many(data))
+        self.assertEqual(data, cache.get_many(list(data)))
+
+        cache.set("key0", "updated")
+        self.assertEqual("updated", cache.get("key0"))
+
+        cache.set_many({"timeout": "value"}, timeout=-1)
+        self.assertIsNone(cache.get("timeout"))
+
+    def test_scanpipe_cache_bulk_database_cache_cull(self):
+        call_command("createcachetable", "scanpipe_test_cache")
+        params = {"OPTIONS": {"MAX_ENTRIES": 4, "CULL_FREQUENCY": 2}}
+        cache = BulkDatabaseCache("scanpipe_test_cache", params)
+        cache.set_many({f"key{index}": index for index in range(6)})
+        self.assertEqual(6, len(cache.get_many([f"key{index}" for index in range(6)])))
+
+        cache.cull()
+        self.assertEqual(3, len(cache.get_many([f"key{index}" for index in range(6)])))
@@ -38,6 +38,7 @@ from scanpipe.models import CodebaseResource
 from scanpipe.models import DiscoveredPackage
 from scanpipe.models import Project
 from scanpipe.models import Run
+from scanpipe.tests import package_data1
 
 scanpipe_app = apps.get_app_config("scanpipe")
 
@@ -443,7 +444,8 @@ class ScanPipeManagementCommandTest(TestCase):
         options.extend(["--format", "WRONG"])
         message = (
             "Error: argument --format: invalid choice: 'WRONG' "
-            "(choose from 'json', 'csv', 'xlsx', 'spdx', 'cyclonedx', 'attribution')"
+            "(choose from 'json', 'csv', 'xlsx', 'spdx', 'cyclonedx', 'attribution', "
+            "'parquet')"
         )
         with self.assertRaisesMessage(CommandError, message):
             call_command("output", *options, stdout=out)
@@ -451,7 +453,7 @@ class ScanPipeManagementCommandTest(TestCase):
         out = StringIO()
         options = ["--project", project.name, "--no-color"]
         options.extend(["--format", "xlsx", "--print"])
-        message = "--print is not compatible with xlsx and csv formats."
+        message = "--print is not compatible with xlsx, csv, and parquet formats."
         with self.assertRaisesMessage(CommandError, message):
             call_command("output", *options, stdout=out)
 
@@ -542,6 +544,54 @@ class ScanPipeManagementCommandTest(TestCase):
         self.assertEqual(1, len(Project.get_root_content(project.input_path)))
         self.assertEqual(0, len(Project.get_root_content(project.codebase_path)))
 
+    @mock.patch("scanpipe.pipes.vulnerablecode.is_available")
+    @mock.patch("scanpipe.pipes.vulnerablecode.is_configured")
+    @mock.patch("scanpipe.pipes.vulnerablecode.bulk_search_by_purl")
+    def test_scanpipe_management_command_refresh_vulnerabilities(
+        self, mock_bulk_search_by_purl, mock_is_configured, mock_is_available
+    ):
+        mock_is_configured.return_value = False
+        expected = "VulnerableCode is not configured."
+        with self.assertRaisesMessage(CommandError, expected):
+            call_command("refresh-vulnerabilities")
+
+        mock_is_configured.return_value = True
+        mock_is_available.return_value = True
+        project1 = Project.objects.create(name="project1")
+        package1 = DiscoveredPackage.create_from_data(project1, package_data1)
+        project2 = Project.objects.create(name="project2")
+        package2 = DiscoveredPackage.create_from_data(project2, package_data1)
+        project3 = Project.objects.create(name="project3", is_archived=True)
+        package3 = DiscoveredPackage.create_from_data(project3, package_data1)
+
+        affected_by = [{"vulnerability_id": "VCID-cah8-awtr-aaad"}]
+        mock_bulk_search_by_purl.return_value = [
+            {"purl": package1.package_url, "affected_by_vulnerabilities": affected_by}
+        ]
+
+        out = StringIO()
+        call_command("refresh-vulnerabilities", stdout=out)
+        self.assertIn("Looking up vulnerabilities for 1 unique PURLs.", out.getvalue())
+        self.assertIn("2 discovered packages updated", out.getvalue())
+        self.assertIn("Vulnerabilities refreshed.", out.getvalue())
+        mock_bulk_search_by_purl.assert_called_once_with([package1.package_url])
+
+        for package in [package1, package2, package3]:
+            package.refresh_from_db()
+        self.assertEqual(affected_by, package1.affected_by_vulnerabilities)
+        self.assertEqual(affected_by, package2.affected_by_vulnerabilities)
+        self.assertEqual([], package3.affected_by_vulnerabilities)
+
+        # The vulnerabilities are removed once the PURL is not affected anymore.
+        mock_bulk_search_by_purl.return_value = []
+        out = StringIO()
+        call_command("refresh-vulnerabilities", "--project", "project1", stdout=out)
+        self.assertIn("1 discovered packages updated", out.getvalue())
+        package1.refresh_from_db()
+        package2.refresh_from_db()
+        self.assertEqual([], package1.affected_by_vulnerabilities)
+        self.assertEqual(affected_by, package2.affected_by_vulnerabilities)
+
     def test_scanpipe_management_command_create_user(self):
         out = StringIO()
 
@@ -1417,6 +1417,23 @@ class ScanPipeModelsTest(TestCase):
         results = qs.less_common("holders", limit=2)
         self.assertQuerySetEqual([resource2], results)
 
+    def test_scanpipe_codebase_resource_queryset_keyset_paginated(self):
+        resources = [
+            make_resource_file(self.project1, path=f"file{index}") for index in range(5)
+        ]
+        qs = self.project1.codebaseresources.no_status()
+
+        pages = []
+        for page in qs.keyset_paginated(per_page=2):
+            pages.append([resource.path for resource in page])
+            # Updated resources do not shift the following pages.
+            for resource in page:
+                resource.update(status="scanned")
+
+        expected = [["file0", "file1"], ["file2", "file3"], ["file4"]]
+        self.assertEqual(expected, pages)
+        self.assertEqual(len(resources), self.project1.codebaseresources.count())
+
     def test_scanpipe_codebase_resource_queryset_path_pattern(self):
         make_resource_file(self.project1, path="example")
         make_resource_file(self.project1, path="example.xml")